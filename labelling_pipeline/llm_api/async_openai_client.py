@@ -0,0 +1,196 @@
+import asyncio
+import os
+import random
+import time
+import httpx
+from dotenv import load_dotenv
+from json_utils import count_tokens
+
+# 환경 변수 로드
+load_dotenv(dotenv_path="../pipeline/.env", override=True)
+
+# OpenAI 호환 엔드포인트 (로컬 부하 테스트 시 가짜 서버 주소로 변경)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+
+# 요청/토큰 속도 제한 (계정 한도보다 약간 낮게 설정)
+OPENAI_MAX_RPM = int(os.getenv("OPENAI_MAX_RPM", "500"))
+OPENAI_MAX_TPM = int(os.getenv("OPENAI_MAX_TPM", "30000"))
+
+# 동시에 보낼 수 있는 요청 수와 재시도 설정
+OPENAI_MAX_IN_FLIGHT = int(os.getenv("OPENAI_MAX_IN_FLIGHT", "16"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "5"))
+OPENAI_BACKOFF_BASE = float(os.getenv("OPENAI_BACKOFF_BASE", "1.0"))
+OPENAI_BACKOFF_MAX = float(os.getenv("OPENAI_BACKOFF_MAX", "30.0"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+
+# 재시도 대상 상태 코드 (속도 제한 및 서버 오류)
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class OpenAIRequestError(Exception):
+    """재시도 후에도 실패했거나 재시도할 수 없는 OpenAI 요청 오류"""
+
+
+class TokenBucket:
+    """
+    초당 rate만큼 채워지고 최대 capacity까지 쌓이는 토큰 버킷.
+    acquire(amount)는 토큰이 충분해질 때까지 비동기로 기다린다.
+    """
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = max(1.0, capacity)
+        self.rate = max(rate, 1e-6)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, amount: float = 1.0):
+        # 한 번에 capacity보다 많이 요청하면 영원히 기다리게 되므로 capacity로 제한
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+class AsyncOpenAIClient:
+    """
+    Chat Completions API 비동기 클라이언트.
+    - 분당 요청 수/토큰 수 토큰 버킷
+    - 429/5xx 및 네트워크 오류 시 지터가 있는 지수 백오프 재시도 (Retry-After 우선)
+    - 최대 동시 요청 수 제한
+    """
+
+    def __init__(
+        self,
+        api_key=None,
+        base_url=OPENAI_BASE_URL,
+        max_rpm=OPENAI_MAX_RPM,
+        max_tpm=OPENAI_MAX_TPM,
+        max_in_flight=OPENAI_MAX_IN_FLIGHT,
+        max_retries=OPENAI_MAX_RETRIES,
+    ):
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.request_bucket = TokenBucket(max_rpm, max_rpm / 60)
+        self.token_bucket = TokenBucket(max_tpm, max_tpm / 60)
+        self.max_in_flight = max(1, max_in_flight)
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=5.0),
+            limits=httpx.Limits(
+                max_connections=self.max_in_flight,
+                max_keepalive_connections=self.max_in_flight,
+            ),
+        )
+        self.in_flight = 0
+        self.retries = 0
+        self.requests = 0
+
+    def _backoff(self, attempt, retry_after=None):
+        """Retry-After가 있으면 그 값을, 없으면 full jitter 지수 백오프 시간을 반환한다."""
+        if retry_after:
+            try:
+                return min(float(retry_after), OPENAI_BACKOFF_MAX)
+            except ValueError:
+                pass
+        return random.uniform(0, min(OPENAI_BACKOFF_MAX, OPENAI_BACKOFF_BASE * 2**attempt))
+
+    async def _post(self, path, payload, estimated_tokens):
+        """
+        속도 제한/동시 요청 수 제한을 지키며 POST하고, 재시도 가능한 오류는 백오프 후 다시 보낸다.
+        """
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+
+        for attempt in range(self.max_retries + 1):
+            await self.request_bucket.acquire(1)
+            await self.token_bucket.acquire(estimated_tokens)
+
+            async with self._semaphore:
+                self.in_flight += 1
+                self.requests += 1
+                try:
+                    response = await self._client.post(
+                        f"{self.base_url}{path}", json=payload, headers=headers
+                    )
+                    error = None
+                except httpx.TransportError as e:
+                    response, error = None, e
+                finally:
+                    self.in_flight -= 1
+
+            if response is not None and response.status_code < 400:
+                return response.json()
+
+            retryable = error is not None or response.status_code in RETRYABLE_STATUS_CODES
+            detail = str(error) if error is not None else f"{response.status_code} {response.text[:200]}"
+            if not retryable or attempt == self.max_retries:
+                raise OpenAIRequestError(f"OpenAI 요청 실패: {detail}")
+
+            delay = self._backoff(
+                attempt, response.headers.get("retry-after") if response is not None else None
+            )
+            self.retries += 1
+            print(f"[WARN] OpenAI 요청 재시도 {attempt + 1}/{self.max_retries} ({detail}), {delay:.2f}초 대기")
+            await asyncio.sleep(delay)
+
+    async def create_chat_completion(self, messages, model="gpt-4", max_tokens=100, temperature=0.5):
+        """
+        Chat Completions를 호출하고 응답 JSON(dict)을 반환한다.
+        """
+        payload = {
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+        }
+        # 토큰 한도는 입력 추정치 + 최대 출력 토큰으로 미리 차감
+        estimated_tokens = sum(count_tokens(m["content"], model) for m in messages) + max_tokens
+        return await self._post("/chat/completions", payload, estimated_tokens)
+
+    async def create_embeddings(self, texts, model="text-embedding-ada-002"):
+        """
+        Embeddings를 호출하고 입력 순서대로 벡터(list[float]) 리스트를 반환한다.
+        """
+        payload = {"model": model, "input": list(texts)}
+        estimated_tokens = sum(count_tokens(text) for text in texts)
+        response = await self._post("/embeddings", payload, estimated_tokens)
+        return [item["embedding"] for item in sorted(response["data"], key=lambda d: d["index"])]
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+        }
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+# 프로세스(이벤트 루프)당 하나의 클라이언트를 공유
+_async_client = None
+
+
+def get_async_client() -> AsyncOpenAIClient:
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncOpenAIClient()
+    return _async_client
+
+
+async def close_async_client():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
@@ -0,0 +1,129 @@
+import re
+import threading
+
+# 대분류 판단 우선순위 (determine_major_category 프롬프트의 규칙 순서)
+PRIORITY_CATEGORIES = ("자료와 가능성", "도형과 측정", "변화와 관계")
+DEFAULT_CATEGORY = "수와 연산"
+
+# 대분류별 (정규식, 가중치). 같은 패턴은 여러 번 나와도 한 번만 센다.
+CATEGORY_PATTERNS = {
+    "자료와 가능성": [
+        (r"그래프", 3),
+        # 화살표/우표/투표/대표/곱셈표 등 다른 낱말의 일부는 제외
+        (r"(?<![가-힣])표(를|에|에서|는|의|로|와|입니다|를 보고|를 완성)", 3),
+        (r"그림그래프|막대그래프|꺾은선그래프|띠그래프|원그래프", 3),
+        (r"평균", 2),
+        (r"가능성|확률|일이 일어날", 3),
+        (r"자료|조사(한|하였|했)", 2),
+    ],
+    "도형과 측정": [
+        (r"\d+\s*\$?\s*(mm|cm|km|m|㎜|㎝|㎞|㎡|㎠|㎤|cm²|m²|cm³|mL|ml|L|kg|g|t)(?![a-zA-Z])", 3),
+        (r"\$\s*(mm|cm|km|m|mL|ml|L|kg|g|t)(\^\{?[23]\}?)?\s*\$", 3),
+        (r"센티미터|밀리미터|킬로미터|미터|리터|밀리리터|킬로그램|(?<!프로)그램|제곱센티미터|세제곱", 3),
+        (r"삼각형|사각형|오각형|육각형|다각형|평행사변형|사다리꼴|마름모|직육면체|정육면체|각기둥|각뿔|원기둥|원뿔|전개도", 3),
+        # "5000원의", "천 원을" 같은 금액과 공원/회원/병원 등 다른 낱말의 일부는 제외
+        (r"(?<![가-힣0-9])(?<![0-9만천백십] )원(의|을)|반원|동심원|사분원|원주|반지름|지름|중심", 2),
+        # 수직선(수와 연산의 눈금 문제)은 제외
+        (r"선분|(?<!수)직선|반직선|수직(?!선)|평행|꼭짓점|모서리|대각선", 3),
+        (r"각도|직각|예각|둔각|\d+\s*°", 3),
+        # 들이는 낱말 첫머리일 때만 ("학생들이" 같은 복수 주어 제외, "2 L들이", "물통의 들이는"은 포함)
+        (r"넓이|둘레|부피|(?<![가-힣])들이|무게|길이", 3),
+        (r"대칭|합동|돌리|뒤집|밀기", 2),
+        (r"\d+\s*시\s*\d+\s*분|\d+\s*초|시각|걸린 시간", 2),
+    ],
+    "변화와 관계": [
+        (r"규칙", 3),
+        (r"배열", 2),
+        (r"비례|비율|백분율|%|비례배분|비례식", 3),
+        (r"\d+\s*:\s*\d+", 2),
+        (r"대응|관계를|관계식", 3),
+        (r"비교하", 1),
+    ],
+    "수와 연산": [
+        (r"\d+\s*[+\-×÷*/]\s*\d+", 2),
+        (r"\\times|\\div|\$\s*[+\-]\s*\$", 2),
+        (r"\\frac", 2),
+        (r"덧셈|뺄셈|곱셈|나눗셈|더하|빼|곱하|나누|몫|나머지", 2),
+        (r"분수|분모|분자|소수|약분|통분", 2),
+        (r"약수|배수|공약수|공배수|자연수|짝수|홀수", 2),
+        (r"어림|반올림|올림|버림|자리 수|자릿값", 2),
+        (r"계산", 1),
+    ],
+}
+
+_COMPILED_PATTERNS = {
+    category: [(re.compile(pattern), weight) for pattern, weight in patterns]
+    for category, patterns in CATEGORY_PATTERNS.items()
+}
+
+
+def score_categories(text):
+    """대분류별 규칙 점수 {대분류: 점수}"""
+    return {
+        category: sum(weight for pattern, weight in patterns if pattern.search(text))
+        for category, patterns in _COMPILED_PATTERNS.items()
+    }
+
+
+def classify_by_rules(text, scores=None):
+    """
+    프롬프트 규칙 순서대로 대분류를 고르고 (대분류, 신뢰도)를 반환한다.
+
+    - 자료와 가능성 / 도형과 측정 / 변화와 관계: 우선순위가 가장 높은 신호 있는 대분류를 고른다.
+      신뢰도는 그 점수가 세 대분류 점수 합에서 차지하는 비율이다 (다른 신호와 섞일수록 낮음).
+    - 세 대분류 신호가 모두 없으면 수와 연산이며, 사칙연산 신호가 있을 때만 신뢰도 1.
+    """
+    scores = scores or score_categories(text)
+    priority_total = sum(scores[category] for category in PRIORITY_CATEGORIES)
+    for category in PRIORITY_CATEGORIES:
+        if scores[category]:
+            return category, scores[category] / priority_total
+    return DEFAULT_CATEGORY, 1.0 if scores[DEFAULT_CATEGORY] else 0.0
+
+
+class CategoryPrefilter:
+    """
+    규칙 점수가 충분히 확실한 문제는 대분류 LLM 호출 없이 결정하는 전처리 필터.
+
+    classify()는 신뢰도가 min_confidence 이상이고 점수가 min_score 이상이면 대분류를,
+    아니면 None을 반환한다 (None이면 기존 LLM 경로 사용).
+    model(text) -> (대분류, 신뢰도)를 주면 규칙이 확실하지 않을 때 한 번 더 확인한다
+    (예: 캐시된 GPT 라벨로 학습한 가벼운 분류기).
+    결정/위임 횟수를 stats()로 제공한다.
+    """
+
+    def __init__(self, min_confidence=0.8, min_score=3, model=None):
+        self.min_confidence = min_confidence
+        self.min_score = min_score
+        self.model = model
+        self.decided = 0
+        self.deferred = 0
+        self.decided_by_category = {}
+        self._lock = threading.Lock()
+
+    def classify(self, text):
+        scores = score_categories(text)
+        category, confidence = classify_by_rules(text, scores)
+        confident = confidence >= self.min_confidence and scores[category] >= self.min_score
+        if not confident and self.model is not None:
+            category, confidence = self.model(text)
+            confident = confidence >= self.min_confidence
+        with self._lock:
+            if confident:
+                self.decided += 1
+                self.decided_by_category[category] = self.decided_by_category.get(category, 0) + 1
+            else:
+                self.deferred += 1
+        return category if confident else None
+
+    def stats(self):
+        with self._lock:
+            total = self.decided + self.deferred
+            return {
+                "decided": self.decided,
+                "deferred": self.deferred,
+                "skip_rate": round(self.decided / total, 4) if total else 0.0,
+                "decided_by_category": dict(self.decided_by_category),
+                "min_confidence": self.min_confidence,
+                "min_score": self.min_score,
+            }
@@ -0,0 +1,77 @@
+"""
+규칙 기반 대분류 전처리 필터의 건너뛰기 비율과 GPT 대분류와의 일치율을 측정한다.
+
+    python category_prefilter_eval.py --backend none              # 말뭉치 전체 건너뛰기 비율만
+    python category_prefilter_eval.py --backend real --limit 500  # GPT와 일치율 (응답은 캐시에 기록)
+    python category_prefilter_eval.py --backend cached --limit 500
+
+규칙이 결정한 문제에 대해서만 GPT 대분류(개념 추출 -> 대분류 결정)를 구해 비교한다.
+"""
+import argparse
+import collections
+from concurrent.futures import ThreadPoolExecutor
+from category_prefilter import CategoryPrefilter
+from corpus_utils import DATA_ROOT, load_corpus
+from label_eval import configure_backend
+from openai_utils import determine_major_category, extract_math_concepts
+
+
+def gpt_major_category(text):
+    return determine_major_category(extract_math_concepts(text))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="대분류 규칙 전처리 필터 평가")
+    parser.add_argument("--data-root", default=DATA_ROOT)
+    parser.add_argument("--limit", type=int, help="무작위 표본 크기 (기본: 전체)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--min-confidence", type=float, default=0.8)
+    parser.add_argument("--backend", default="none", choices=["none", "real", "cached"])
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    prefilter = CategoryPrefilter(min_confidence=args.min_confidence)
+    problems = load_corpus(args.data_root, limit=args.limit, seed=args.seed)
+    decided = []
+    for problem in problems:
+        text = problem["question_text"]
+        if problem["figure_text"]:
+            text += "\n" + problem["figure_text"]
+        category = prefilter.classify(text)
+        if category is not None:
+            decided.append((text, category))
+
+    stats = prefilter.stats()
+    print(
+        f"[EVAL] skip rate: {stats['skip_rate']:.2%} ({stats['decided']}/{len(problems)}), "
+        f"by category {stats['decided_by_category']}"
+    )
+    if args.backend == "none" or not decided:
+        return
+
+    configure_backend(args.backend)
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        gpt_categories = list(pool.map(gpt_major_category, [text for text, _ in decided]))
+
+    compared = [(rule, gpt) for (_, rule), gpt in zip(decided, gpt_categories) if gpt]
+    if not compared:
+        print("[ERROR] GPT 대분류를 구한 문제가 없습니다.")
+        return
+
+    agree = sum(1 for rule, gpt in compared if rule == gpt)
+    print(f"[EVAL] agreement with GPT: {agree / len(compared):.2%} over {len(compared)} decided problems")
+    per_category = collections.defaultdict(lambda: [0, 0])
+    confusion = collections.Counter()
+    for rule, gpt in compared:
+        per_category[rule][0] += rule == gpt
+        per_category[rule][1] += 1
+        if rule != gpt:
+            confusion[(rule, gpt)] += 1
+    for category, (hits, total) in sorted(per_category.items()):
+        print(f"[EVAL]   {category}: {hits / total:.2%} ({hits}/{total})")
+    for (rule, gpt), count in confusion.most_common(5):
+        print(f"[EVAL]   rule {rule} -> gpt {gpt}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+3회 호출 경로와 단일 호출 경로를 formatted_y 문제 표본으로 비교하는 벤치마크.
+
+    python classify_benchmark.py --limit 50 --seed 42
+
+문제별 지연 시간, 토큰 사용량(추정 비용), 대분류/최하위 분류 일치율을 출력한다.
+LLM 응답 캐시는 기본으로 끈다. 캐시 응답이 하나라도 재생되면 지연 시간/비용은 출력하지 않고
+일치율만 출력한다 (--cache-mode cache_only로 오프라인 재생).
+"""
+import argparse
+import csv
+import statistics
+import time
+import openai_utils
+from corpus_utils import DATA_ROOT, load_corpus
+from llm_main import roadmap_registry
+from problem_processor import process_math_problem
+
+
+def _leaf_set(leaf_label):
+    if not leaf_label:
+        return set()
+    return {label.strip() for label in leaf_label.split(",") if label.strip()}
+
+
+def run_mode(problem, mode, summary_map, leaf_names_map):
+    """한 문제를 지정한 모드로 분류하고 (결과, 지연 시간, 토큰 사용량)을 반환한다."""
+    before = dict(openai_utils.TOKEN_USAGE)
+    start_time = time.perf_counter()
+    major_category, leaf_label, _, _ = process_math_problem(
+        problem_text=problem["question_text"],
+        category_map=summary_map,
+        figure_text=problem["figure_text"],
+        mode=mode,
+        leaf_names_map=leaf_names_map,
+    )
+    latency = time.perf_counter() - start_time
+    usage = {key: openai_utils.TOKEN_USAGE[key] - before[key] for key in before}
+    return major_category, leaf_label, latency, usage
+
+
+def summarize(name, latencies, usages, prompt_price, completion_price):
+    prompt_tokens = sum(u["prompt_tokens"] for u in usages)
+    completion_tokens = sum(u["completion_tokens"] for u in usages)
+    cost = prompt_tokens / 1000 * prompt_price + completion_tokens / 1000 * completion_price
+    print(
+        f"[BENCH] {name}: mean latency {statistics.mean(latencies):.2f}s, "
+        f"median {statistics.median(latencies):.2f}s, "
+        f"calls {sum(u['calls'] for u in usages)}, "
+        f"tokens {prompt_tokens}+{completion_tokens}, est. cost ${cost:.4f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="3회 호출 vs 단일 호출 분류 벤치마크")
+    parser.add_argument("--data-root", default=DATA_ROOT)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--prompt-price", type=float, default=0.03, help="1K 입력 토큰당 USD")
+    parser.add_argument("--completion-price", type=float, default=0.06, help="1K 출력 토큰당 USD")
+    parser.add_argument("--output", help="문제별 결과를 저장할 CSV 경로")
+    parser.add_argument(
+        "--cache-mode",
+        default="off",
+        choices=["off", "read_write", "cache_only"],
+        help="LLM 응답 캐시 모드 (기본 off, cache_only: API 호출 없이 캐시된 응답만 재생해 일치율만 측정)",
+    )
+    args = parser.parse_args()
+    openai_utils.configure_llm_cache(args.cache_mode)
+
+    problems = load_corpus(args.data_root, limit=args.limit, seed=args.seed)
+    summary_map = roadmap_registry.summary_map()
+    leaf_names_map = roadmap_registry.leaf_names_map()
+
+    rows = []
+    for idx, problem in enumerate(problems, 1):
+        print(f"[INFO] ({idx}/{len(problems)}) {problem['source']}")
+        three = run_mode(problem, "three_call", summary_map, leaf_names_map)
+        single = run_mode(problem, "single_call", summary_map, leaf_names_map)
+        rows.append(
+            {
+                "source": problem["source"],
+                "three_major": three[0],
+                "three_leaf": three[1],
+                "three_latency": round(three[2], 3),
+                "three_tokens": three[3]["prompt_tokens"] + three[3]["completion_tokens"],
+                "single_major": single[0],
+                "single_leaf": single[1],
+                "single_latency": round(single[2], 3),
+                "single_tokens": single[3]["prompt_tokens"] + single[3]["completion_tokens"],
+                "major_agree": three[0] == single[0],
+                "leaf_agree": bool(_leaf_set(three[1]) & _leaf_set(single[1])),
+                "_three": three,
+                "_single": single,
+            }
+        )
+
+    if not rows:
+        print("[ERROR] 평가할 문제가 없습니다.")
+        return
+
+    cache_hits = openai_utils.llm_cache.stats()["hits"] if openai_utils.llm_cache is not None else 0
+    if cache_hits:
+        # 캐시에서 재생한 응답은 지연 시간과 토큰 비용이 0에 가까워 비교가 의미 없음
+        print(f"[WARN] 캐시 응답 {cache_hits}건을 재생해 지연 시간/비용은 출력하지 않습니다 (--cache-mode off로 측정)")
+    else:
+        summarize("three_call", [r["_three"][2] for r in rows], [r["_three"][3] for r in rows],
+                  args.prompt_price, args.completion_price)
+        summarize("single_call", [r["_single"][2] for r in rows], [r["_single"][3] for r in rows],
+                  args.prompt_price, args.completion_price)
+    print(
+        f"[BENCH] agreement: major {sum(r['major_agree'] for r in rows) / len(rows):.2%}, "
+        f"leaf (overlap) {sum(r['leaf_agree'] for r in rows) / len(rows):.2%} over {len(rows)} problems"
+    )
+    if openai_utils.llm_cache is not None:
+        print(f"[BENCH] llm cache: {openai_utils.llm_cache.stats()}")
+
+    if args.output:
+        fieldnames = [key for key in rows[0] if not key.startswith("_")]
+        with open(args.output, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"[INFO] 결과 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import glob
+import os
+import random
+import re
+
+# formatted_y 말뭉치 기본 위치 (저장소 루트의 Data/images)
+DATA_ROOT = os.getenv(
+    "FORMATTED_Y_ROOT",
+    os.path.normpath(
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Data", "images")
+    ),
+)
+
+SECTION_HEADER = re.compile(r"^\[(\w+)\]\s*$")
+
+
+def parse_formatted_y(file_path):
+    """
+    formatted_y 텍스트 파일을 섹션별로 파싱한다.
+    [bboxs], [question_text], [figure_text] 등 각 섹션의 첫 문단만 사용한다
+    (일부 파일은 문제 뒤에 빈 줄과 메모가 붙어 있음).
+    """
+    sections = {}
+    current = None
+    with open(file_path, "r", encoding="utf-8") as f:
+        for raw_line in f:
+            line = raw_line.rstrip("\n")
+            header = SECTION_HEADER.match(line.strip())
+            if header:
+                current = header.group(1)
+                sections[current] = []
+                continue
+            if current is None:
+                continue
+            if not line.strip():
+                # 내용이 시작된 뒤의 빈 줄에서 섹션을 닫는다
+                if sections[current]:
+                    current = None
+                continue
+            sections[current].append(line.strip())
+    return {name: "\n".join(lines) for name, lines in sections.items()}
+
+
+def iter_corpus_files(data_root=DATA_ROOT, splits=("training", "validation")):
+    """Data/images/{split}/formatted_y*/**/*.txt 경로를 정렬된 순서로 반환한다."""
+    for split in splits:
+        pattern = os.path.join(data_root, split, "formatted_y*", "**", "*.txt")
+        for path in sorted(glob.glob(pattern, recursive=True)):
+            yield path
+
+
+def load_corpus(data_root=DATA_ROOT, limit=None, seed=None, splits=("training", "validation")):
+    """
+    문제 텍스트가 있는 파일만 모아 dict 리스트로 반환한다.
+    limit이 주어지면 seed로 고정된 무작위 표본을 뽑는다.
+    """
+    paths = list(iter_corpus_files(data_root, splits))
+    if limit is not None and limit < len(paths):
+        paths = random.Random(seed).sample(paths, limit)
+
+    corpus = []
+    for path in paths:
+        try:
+            sections = parse_formatted_y(path)
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"[WARN] 파일 읽기 실패: {path} - {e}")
+            continue
+        question_text = sections.get("question_text", "")
+        if not question_text:
+            continue
+        # 그림이 없는 문제는 [figure_text] 섹션에 문자열 "null"이 들어 있음
+        figure_text = (sections.get("figure_text") or "").strip()
+        if figure_text.lower() == "null":
+            figure_text = ""
+        corpus.append(
+            {
+                "path": path,
+                "file_name": os.path.basename(path),
+                "source": os.path.relpath(path, data_root).replace(os.sep, "/"),
+                "question_text": question_text,
+                "figure_text": figure_text or None,
+            }
+        )
+    return corpus
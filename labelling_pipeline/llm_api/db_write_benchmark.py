@@ -0,0 +1,75 @@
+"""
+라벨링 결과 저장 방식별 초당 INSERT 수를 비교하는 벤치마크.
+
+    python db_write_benchmark.py --file-name sample.png --rows 1000
+
+- before: 행마다 psycopg2.connect -> SELECT -> INSERT -> commit -> close (기존 save_to_db)
+- after : LabellingResultWriter (커넥션 풀 + 배치당 한 번의 SELECT + execute_values)
+
+--file-name은 upload_filerecord에 이미 있는 파일 이름이어야 한다.
+벤치마크가 넣은 행은 leaf_label 표식으로 구분해 끝나면 삭제한다.
+"""
+import argparse
+import time
+from datetime import datetime
+import psycopg2
+from db_writer import LabellingResultWriter
+from llm_main import DB_CONFIG
+
+BENCH_LEAF_LABEL = "__db_write_benchmark__"
+
+
+def legacy_save(file_name, category_label, leaf_label):
+    """기존 save_to_db와 같은 방식 (행마다 새 연결)"""
+    conn = psycopg2.connect(**DB_CONFIG)
+    cur = conn.cursor()
+    cur.execute("SELECT id FROM upload_filerecord WHERE file_name = %s;", (file_name,))
+    file_record_id = cur.fetchone()[0]
+    cur.execute(
+        "INSERT INTO upload_labellingresult (file_record_id, category_label, leaf_label, processed_at) "
+        "VALUES (%s, %s, %s, %s);",
+        (file_record_id, category_label, leaf_label, datetime.now()),
+    )
+    conn.commit()
+    cur.close()
+    conn.close()
+
+
+def cleanup():
+    with psycopg2.connect(**DB_CONFIG) as conn, conn.cursor() as cur:
+        cur.execute("DELETE FROM upload_labellingresult WHERE leaf_label = %s;", (BENCH_LEAF_LABEL,))
+        return cur.rowcount
+
+
+def main():
+    parser = argparse.ArgumentParser(description="라벨링 결과 저장 벤치마크")
+    parser.add_argument("--file-name", required=True, help="upload_filerecord에 있는 파일 이름")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--legacy-rows", type=int, default=100, help="기존 방식으로 넣을 행 수")
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+
+    try:
+        start_time = time.perf_counter()
+        for _ in range(args.legacy_rows):
+            legacy_save(args.file_name, "수와 연산", BENCH_LEAF_LABEL)
+        legacy_elapsed = time.perf_counter() - start_time
+        legacy_rate = args.legacy_rows / legacy_elapsed
+        print(f"[BENCH] before (connect per row): {args.legacy_rows} rows in {legacy_elapsed:.2f}s ({legacy_rate:.1f} inserts/s)")
+
+        writer = LabellingResultWriter(DB_CONFIG, batch_size=args.batch_size, flush_interval=0)
+        start_time = time.perf_counter()
+        for _ in range(args.rows):
+            writer.add(args.file_name, "수와 연산", BENCH_LEAF_LABEL)
+        writer.close()
+        pooled_elapsed = time.perf_counter() - start_time
+        pooled_rate = args.rows / pooled_elapsed
+        print(f"[BENCH] after (pooled batches): {args.rows} rows in {pooled_elapsed:.2f}s ({pooled_rate:.1f} inserts/s)")
+        print(f"[BENCH] writer stats: {writer.stats()}")
+        print(f"[BENCH] speedup: x{pooled_rate / legacy_rate:.1f}")
+    finally:
+        print(f"[INFO] 벤치마크 행 {cleanup()}건 삭제")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from psycopg2 import pool
+from psycopg2.extras import execute_values
+
+
+class LabellingResultWriter:
+    """
+    upload_labellingresult 행을 모아 한 번에 저장하는 writer.
+
+    - 커넥션은 ThreadedConnectionPool에서 빌려 쓰고 돌려준다.
+    - add()는 버퍼에만 넣고, 백그라운드 스레드가 batch_size개가 모이거나 flush_interval초가 지나면
+      execute_values로 한 번에 INSERT한다 (호출한 쪽은 DB를 기다리지 않음).
+    - upload_filerecord id는 배치당 한 번의 쿼리로 조회한다.
+    - 저장에 실패한 행(DB 연결 실패 포함)은 버퍼 앞쪽에 되돌려 다시 시도하고, max_attempts번 실패하면 버린다.
+    - FileRecord가 없는 행은 [ERROR]로 출력하고 최근 이름을 stats()에 남긴다.
+    - stats()로 저장 건수와 초당 INSERT 수를 제공한다.
+    """
+
+    def __init__(
+        self,
+        db_config,
+        batch_size=200,
+        flush_interval=2.0,
+        min_connections=1,
+        max_connections=4,
+        max_attempts=3,
+    ):
+        self.db_config = db_config
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.min_connections = min_connections
+        self.max_connections = max_connections
+        self.max_attempts = max(1, max_attempts)
+        self._pool = None
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()  # batch_size가 차면 백그라운드 스레드를 깨움
+        self._thread = None
+
+        self.inserted = 0
+        self.failed = 0
+        self.retried = 0
+        self.missing_file_records = 0
+        self.recent_missing_file_names = deque(maxlen=20)
+        self.batches = 0
+        self.flush_seconds = 0.0
+        self.created_at = time.time()
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = pool.ThreadedConnectionPool(
+                self.min_connections, self.max_connections, **self.db_config
+            )
+        return self._pool
+
+    def start(self):
+        """
+        버퍼를 비우는 백그라운드 스레드를 시작한다.
+        batch_size가 차면 바로, 아니면 flush_interval마다 저장한다 (0 이하면 batch_size가 찰 때만).
+        """
+        with self._lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="labelling-result-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        timeout = self.flush_interval if self.flush_interval > 0 else None
+        while not self._stop.is_set():
+            self._wake.wait(timeout)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[ERROR] 라벨링 결과 주기적 저장 실패: {e}")
+
+    def add(self, file_name, category_label, leaf_label, processed_at=None):
+        """행을 버퍼에 추가한다. 저장은 백그라운드 스레드가 한다."""
+        with self._lock:
+            # 마지막 값은 저장 시도 횟수
+            self._buffer.append((file_name, category_label, leaf_label, processed_at or datetime.now(), 0))
+            if len(self._buffer) >= self.batch_size:
+                self._wake.set()
+
+    def flush(self):
+        """버퍼의 행을 한 번에 저장하고 저장한 행 수를 반환한다."""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._buffer = self._buffer, []
+            if not rows:
+                return 0
+
+            start_time = time.perf_counter()
+            connection_pool, conn = None, None
+            try:
+                # 풀 생성/커넥션 대여 실패(DB 연결 불가, PoolError)도 재시도 대상
+                connection_pool = self._get_pool()
+                conn = connection_pool.getconn()
+                with conn, conn.cursor() as cur:
+                    # FileRecord id를 배치당 한 번에 조회
+                    file_names = list({row[0] for row in rows})
+                    cur.execute(
+                        "SELECT file_name, id FROM upload_filerecord WHERE file_name = ANY(%s);",
+                        (file_names,),
+                    )
+                    file_record_ids = dict(cur.fetchall())
+
+                    values, missing = [], []
+                    for file_name, category_label, leaf_label, processed_at, _ in rows:
+                        file_record_id = file_record_ids.get(file_name)
+                        if file_record_id is None:
+                            missing.append(file_name)
+                            continue
+                        values.append((file_record_id, category_label, leaf_label, processed_at))
+
+                    if values:
+                        execute_values(
+                            cur,
+                            "INSERT INTO upload_labellingresult "
+                            "(file_record_id, category_label, leaf_label, processed_at) VALUES %s",
+                            values,
+                            page_size=self.batch_size,
+                        )
+            except Exception:
+                self._requeue(rows)
+                raise
+            finally:
+                if conn is not None:
+                    connection_pool.putconn(conn)
+
+            if missing:
+                print(f"[ERROR] FileRecord를 찾을 수 없어 저장하지 못한 파일 {len(missing)}건: {missing}")
+                self.missing_file_records += len(missing)
+                self.recent_missing_file_names.extend(missing)
+            self.inserted += len(values)
+            self.batches += 1
+            self.flush_seconds += time.perf_counter() - start_time
+            print(f"[INFO] 라벨링 결과 {len(values)}건 저장 ({len(rows) - len(values)}건 건너뜀)")
+            return len(values)
+
+    def _requeue(self, rows):
+        """저장에 실패한 행을 버퍼 앞쪽에 되돌린다. max_attempts번 실패한 행은 버리고 failed로 센다."""
+        retry = [row[:-1] + (row[-1] + 1,) for row in rows if row[-1] + 1 < self.max_attempts]
+        dropped = len(rows) - len(retry)
+        with self._lock:
+            self._buffer[:0] = retry
+        self.retried += len(retry)
+        self.failed += dropped
+        if dropped:
+            print(f"[ERROR] 라벨링 결과 {dropped}건을 {self.max_attempts}번 저장하지 못해 버립니다")
+
+    def close(self):
+        """백그라운드 스레드를 멈추고, 남은 행을 저장한 뒤 커넥션 풀을 닫는다."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        try:
+            self.flush()
+        finally:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._buffer)
+        elapsed = time.time() - self.created_at
+        return {
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "retried": self.retried,
+            "missing_file_records": self.missing_file_records,
+            "recent_missing_file_names": list(self.recent_missing_file_names),
+            "pending": pending,
+            "batches": self.batches,
+            # 생성 이후 벽시계 기준 처리량
+            "inserts_per_sec": round(self.inserted / elapsed, 2) if elapsed > 0 else 0.0,
+            # DB에서 보낸 시간 기준 처리량 (flush 한 번의 비용 비교용)
+            "inserts_per_flush_sec": round(self.inserted / self.flush_seconds, 1) if self.flush_seconds else 0.0,
+        }
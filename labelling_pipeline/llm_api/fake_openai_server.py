@@ -0,0 +1,132 @@
+"""
+부하 테스트용 가짜 OpenAI Chat Completions 서버.
+
+    uvicorn fake_openai_server:app --port 18010
+    OPENAI_BASE_URL=http://127.0.0.1:18010/v1 uvicorn llm_api:app --port 8002
+
+프롬프트 종류(개념 / 대분류 / 최하위 분류 / 단일 호출 JSON)에 맞는 고정 응답을
+지연 시간 후 돌려주고, 일정 비율로 429를 반환해 재시도 경로를 시험할 수 있다.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+# 응답 지연 (초)과 429 응답 비율
+FAKE_OPENAI_LATENCY = float(os.getenv("FAKE_OPENAI_LATENCY", "0.5"))
+FAKE_OPENAI_429_RATE = float(os.getenv("FAKE_OPENAI_429_RATE", "0.0"))
+
+FAKE_CONCEPT = "세 자리 수의 덧셈"
+FAKE_MAJOR_CATEGORY = "수와 연산"
+FAKE_EMBEDDING_DIM = 1536
+
+
+def _single_call_answer(prompt):
+    """단일 호출 프롬프트의 '[수와 연산]' 목록에서 첫 번째 최하위 분류를 고른다."""
+    leaf_label = FAKE_CONCEPT
+    lines = prompt.splitlines()
+    if f"[{FAKE_MAJOR_CATEGORY}]" in lines:
+        for line in lines[lines.index(f"[{FAKE_MAJOR_CATEGORY}]") + 1 :]:
+            if line.startswith("- "):
+                leaf_label = line[2:].strip()
+                break
+    return json.dumps(
+        {
+            "concepts": [FAKE_CONCEPT],
+            "major_category": FAKE_MAJOR_CATEGORY,
+            "leaf_labels": [leaf_label],
+        },
+        ensure_ascii=False,
+    )
+
+
+def fake_answer(prompt):
+    """openai_utils의 프롬프트 빌더 문구로 요청 종류를 구분해 응답을 만든다."""
+    if "JSON 형식으로만 답하세요" in prompt:
+        return _single_call_answer(prompt)
+    if "최하위 분류(학습 주제)" in prompt:
+        return FAKE_CONCEPT
+    if "대분류를 '수와 연산'" in prompt:
+        return FAKE_MAJOR_CATEGORY
+    return FAKE_CONCEPT
+
+
+def fake_embedding(text, dim=FAKE_EMBEDDING_DIM):
+    """
+    글자 2-gram을 해시해 더한 벡터. 글자가 많이 겹치는 텍스트일수록 코사인 유사도가 높다.
+    """
+    vector = [0.0] * dim
+    text = text.replace(" ", "")
+    for i in range(max(1, len(text) - 1)):
+        bigram = text[i : i + 2].encode("utf-8")
+        vector[int(hashlib.md5(bigram).hexdigest(), 16) % dim] += 1.0
+    return vector
+
+
+def create_app(latency=FAKE_OPENAI_LATENCY, rate_limit_ratio=FAKE_OPENAI_429_RATE):
+    app = FastAPI()
+    app.state.requests = 0
+    app.state.rate_limited = 0
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(payload: dict):
+        app.state.requests += 1
+        if random.random() < rate_limit_ratio:
+            app.state.rate_limited += 1
+            return JSONResponse(
+                status_code=429,
+                content={"error": {"message": "Rate limit reached", "type": "requests"}},
+                headers={"retry-after": "0.2"},
+            )
+
+        await asyncio.sleep(latency)
+        prompt = payload["messages"][-1]["content"]
+        content = fake_answer(prompt)
+        prompt_tokens = sum(len(m["content"]) for m in payload["messages"])
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "model": payload.get("model", "gpt-4"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(content),
+                "total_tokens": prompt_tokens + len(content),
+            },
+        }
+
+    @app.post("/v1/embeddings")
+    async def embeddings(payload: dict):
+        app.state.requests += 1
+        await asyncio.sleep(latency / 5)
+        texts = payload["input"]
+        if isinstance(texts, str):
+            texts = [texts]
+        total_tokens = sum(len(text) for text in texts)
+        return {
+            "object": "list",
+            "model": payload.get("model", "text-embedding-ada-002"),
+            "data": [
+                {"object": "embedding", "index": idx, "embedding": fake_embedding(text)}
+                for idx, text in enumerate(texts)
+            ],
+            "usage": {"prompt_tokens": total_tokens, "total_tokens": total_tokens},
+        }
+
+    @app.get("/stats")
+    async def stats():
+        return {"requests": app.state.requests, "rate_limited": app.state.rate_limited}
+
+    return app
+
+
+app = create_app()
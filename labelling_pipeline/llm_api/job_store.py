@@ -0,0 +1,187 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+# 작업/항목 상태
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+ITEM_PENDING = "pending"
+ITEM_DONE = "done"
+ITEM_ERROR = "error"
+
+
+class JobStore:
+    """
+    일괄 처리 작업과 항목별 결과를 저장하는 SQLite 저장소.
+
+    항목 결과는 처리되는 즉시 기록되므로, 작업자가 재시작되면 pending 항목만 다시 처리하고
+    이미 끝난 항목은 다시 LLM을 호출하지 않는다.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                resumed_at REAL,
+                finished_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS job_items (
+                job_id TEXT NOT NULL,
+                item_index INTEGER NOT NULL,
+                file_name TEXT NOT NULL,
+                processed_data TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                latency REAL,
+                updated_at REAL,
+                PRIMARY KEY (job_id, item_index)
+            );
+            CREATE INDEX IF NOT EXISTS idx_job_items_status ON job_items (job_id, status);
+            """
+        )
+        # resumed_at 컬럼이 없던 기존 DB
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "resumed_at" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN resumed_at REAL")
+
+    def create_job(self, problems):
+        """[(file_name, processed_data), ...]로 작업을 만들고 job_id를 반환한다."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, status, total, created_at) VALUES (?, ?, ?, ?)",
+                (job_id, JOB_RUNNING, len(problems), now),
+            )
+            self._conn.executemany(
+                "INSERT INTO job_items (job_id, item_index, file_name, processed_data, status) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (job_id, idx, file_name, json.dumps(processed_data, ensure_ascii=False), ITEM_PENDING)
+                    for idx, (file_name, processed_data) in enumerate(problems)
+                ],
+            )
+        return job_id
+
+    def mark_started(self, job_id):
+        """처음 시작한 시각(started_at)은 유지하고, 이번에 시작(재개)한 시각(resumed_at)을 기록한다."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET started_at = COALESCE(started_at, ?), resumed_at = ? WHERE job_id = ?",
+                (now, now, job_id),
+            )
+
+    def pending_items(self, job_id):
+        """아직 처리되지 않은 항목을 [(item_index, file_name, processed_data), ...]로 반환한다."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT item_index, file_name, processed_data FROM job_items "
+                "WHERE job_id = ? AND status = ? ORDER BY item_index",
+                (job_id, ITEM_PENDING),
+            ).fetchall()
+        return [(idx, file_name, json.loads(data)) for idx, file_name, data in rows]
+
+    def record_result(self, job_id, item_index, result=None, error=None, latency=None):
+        """항목 하나의 결과(또는 오류)를 기록한다."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE job_items SET status = ?, result = ?, error = ?, latency = ?, updated_at = ? "
+                "WHERE job_id = ? AND item_index = ?",
+                (
+                    ITEM_ERROR if error is not None else ITEM_DONE,
+                    json.dumps(result, ensure_ascii=False) if result is not None else None,
+                    error,
+                    latency,
+                    time.time(),
+                    job_id,
+                    item_index,
+                ),
+            )
+
+    def mark_completed(self, job_id):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ? WHERE job_id = ?",
+                (JOB_COMPLETED, time.time(), job_id),
+            )
+
+    def unfinished_jobs(self):
+        """완료되지 않은 작업 id 목록 (재시작 시 이어서 처리)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id FROM jobs WHERE status = ? ORDER BY created_at", (JOB_RUNNING,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def job_status(self, job_id, offset=0, limit=100):
+        """진행률, 처리량, 항목별 결과(offset/limit 범위)를 반환한다. 작업이 없으면 None."""
+        with self._lock:
+            job = self._conn.execute(
+                "SELECT status, total, created_at, started_at, resumed_at, finished_at FROM jobs WHERE job_id = ?",
+                (job_id,),
+            ).fetchone()
+            if job is None:
+                return None
+            status, total, created_at, started_at, resumed_at, finished_at = job
+            resumed_at = resumed_at or started_at
+            counts = dict(
+                self._conn.execute(
+                    "SELECT status, COUNT(*) FROM job_items WHERE job_id = ? GROUP BY status",
+                    (job_id,),
+                ).fetchall()
+            )
+            # 처리량은 재개 이후 처리한 항목만으로 계산 (재시작 전 중단 시간 제외)
+            resumed_processed, last_update = self._conn.execute(
+                "SELECT COUNT(*), MAX(updated_at) FROM job_items "
+                "WHERE job_id = ? AND status != ? AND updated_at >= ?",
+                (job_id, ITEM_PENDING, resumed_at or 0),
+            ).fetchone()
+            items = self._conn.execute(
+                "SELECT item_index, file_name, status, result, error, latency FROM job_items "
+                "WHERE job_id = ? ORDER BY item_index LIMIT ? OFFSET ?",
+                (job_id, limit, offset),
+            ).fetchall()
+
+        processed = counts.get(ITEM_DONE, 0) + counts.get(ITEM_ERROR, 0)
+        elapsed = (last_update - resumed_at) if (last_update and resumed_at) else 0.0
+        return {
+            "job_id": job_id,
+            "status": status,
+            "total": total,
+            "done": counts.get(ITEM_DONE, 0),
+            "errors": counts.get(ITEM_ERROR, 0),
+            "pending": counts.get(ITEM_PENDING, 0),
+            "progress": round(processed / total, 4) if total else 1.0,
+            "items_per_sec": round(resumed_processed / elapsed, 2) if elapsed > 0 else 0.0,
+            "created_at": created_at,
+            "started_at": started_at,
+            "resumed_at": resumed_at,
+            "finished_at": finished_at,
+            "items": [
+                {
+                    "index": idx,
+                    "file_name": file_name,
+                    "status": item_status,
+                    "result": json.loads(result) if result else None,
+                    "error": error,
+                    "latency": latency,
+                }
+                for idx, file_name, item_status, result, error, latency in items
+            ],
+        }
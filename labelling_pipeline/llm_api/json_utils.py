@@ -13,3 +13,35 @@ def summarize_json_hierarchy(data, level=1):
             else:
                 summary += f"{indent}- {value}\n"
     return summary
+
+
+# 계층 구조에서 자식이 없는 최하위 분류 이름만 순서대로 추출
+def collect_leaf_names(data):
+    leaves = []
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if isinstance(value, dict) and "name" in value:
+                if value.get("children"):
+                    leaves.extend(collect_leaf_names(value["children"]))
+                else:
+                    leaves.append(value["name"])
+            elif isinstance(value, dict):
+                leaves.extend(collect_leaf_names(value))
+            elif isinstance(value, str):
+                leaves.append(value)
+    return leaves
+
+
+# 프롬프트 토큰 수 계산 (tiktoken이 없으면 글자 수 기반 근사치)
+def count_tokens(text, model="gpt-4"):
+    try:
+        import tiktoken
+
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+        return len(encoding.encode(text))
+    except ImportError:
+        # 한글은 대략 1글자당 1토큰 안팎이므로 글자 수로 근사
+        return len(text)
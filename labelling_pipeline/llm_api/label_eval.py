@@ -0,0 +1,238 @@
+"""
+formatted_y 말뭉치 전체(또는 표본)를 process_math_problem으로 라벨링하는 오프라인 평가 실행기.
+
+    python label_eval.py --backend stub --workers 8 --output results.parquet
+    python label_eval.py --backend real --limit 500 --output real.csv     # 응답을 캐시에 기록
+    python label_eval.py --backend cached --limit 500 --output replay.csv # 기록된 응답만 재생
+
+backend
+- real  : OpenAI API 호출 (응답을 LLM 캐시에 기록해 이후 cached 재생에 사용)
+- cached: LLM 캐시에 있는 응답만 재생 (API 호출 없음, 없으면 해당 단계 실패로 기록)
+- stub  : 키워드 규칙으로 응답을 만드는 결정적 stub (API/캐시 없이 파이프라인 처리량 측정)
+
+문제별 단계 시간(대분류/최하위 분류)과 전체 지연 시간을 CSV 또는 Parquet으로 저장하고
+p50/p95/p99와 지연 시간 히스토그램을 출력한다.
+"""
+import argparse
+import csv
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+import openai_utils
+from category_prefilter import classify_by_rules
+from corpus_utils import DATA_ROOT, load_corpus
+from json_utils import count_tokens
+from llm_main import ROADMAP_FILES, roadmap_registry
+from problem_processor import process_math_problem
+from roadmap_registry import RoadmapRegistry
+
+# 히스토그램 구간 경계 (초)
+HISTOGRAM_EDGES = (0.1, 0.25, 0.5, 1, 2, 4, 8, 16)
+
+LIST_ITEM = re.compile(r"^\s*-\s+(.+?)\s*$")
+
+
+class StubBackend:
+    """
+    openai_utils.set_completion_backend에 넘기는 결정적 응답 함수.
+    같은 프롬프트에는 항상 같은 응답을 돌려주며, latency초만큼 기다려 API 지연을 흉내낸다.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    @staticmethod
+    def _major_category(text):
+        return classify_by_rules(text)[0]
+
+    @staticmethod
+    def _closest(text, candidates):
+        """글자가 가장 많이 겹치는 후보 (동점이면 앞의 후보)"""
+        chars = set(text)
+        return max(candidates, key=lambda name: len(chars & set(name)), default=None)
+
+    def __call__(self, prompt, model, max_tokens, temperature):
+        if self.latency:
+            time.sleep(self.latency)
+
+        if "JSON 형식으로만 답하세요" in prompt:
+            problem_text = prompt.split("\n\n", 1)[0]
+            major_category = self._major_category(problem_text)
+            section = prompt.split(f"[{major_category}]\n", 1)[-1].split("\n\n", 1)[0]
+            leaves = [m.group(1) for m in map(LIST_ITEM.match, section.splitlines()) if m]
+            leaf_label = self._closest(problem_text, leaves) or ""
+            content = (
+                f'{{"concepts": [], "major_category": "{major_category}", "leaf_labels": ["{leaf_label}"]}}'
+            )
+        elif "최하위 분류(학습 주제)" in prompt:
+            concept = prompt.split("\n\n", 1)[0].split("\n", 1)[-1]
+            hierarchy = prompt.split("\n\n")[2]
+            leaves = [m.group(1) for m in map(LIST_ITEM.match, hierarchy.splitlines()) if m]
+            content = self._closest(concept, leaves) or ""
+        elif "최하위 분류 목록에서" in prompt:
+            # 후보 목록 재질의
+            concept = prompt.split("\n\n", 1)[0].split("\n", 1)[-1]
+            leaves = [m.group(1) for m in map(LIST_ITEM.match, prompt.splitlines()) if m]
+            content = self._closest(concept, leaves) or ""
+        elif "대분류를 '수와 연산'" in prompt:
+            content = self._major_category(prompt.split("\n\n", 1)[0])
+        else:
+            # 개념 추출: 문제 텍스트 첫 줄을 그대로 개념으로 사용
+            problem_text = prompt.split("\n", 1)[-1].split("\n\n", 1)[0]
+            content = problem_text.splitlines()[0] if problem_text else ""
+
+        usage = {"prompt_tokens": count_tokens(prompt), "completion_tokens": count_tokens(content)}
+        return content, usage
+
+
+def configure_backend(backend, stub_latency=0.0):
+    """평가 backend에 맞게 openai_utils의 응답 경로(캐시/stub)를 설정한다."""
+    if backend == "stub":
+        openai_utils.configure_llm_cache("off")
+        openai_utils.set_completion_backend(StubBackend(stub_latency))
+    elif backend == "cached":
+        openai_utils.configure_llm_cache("cache_only")
+        openai_utils.set_completion_backend(None)
+    else:
+        openai_utils.configure_llm_cache("read_write")
+        openai_utils.set_completion_backend(None)
+
+
+def evaluate_problem(problem, category_map, leaf_names_map, mode, leaf_resolvers=None):
+    """문제 하나를 분류하고 결과 행(dict)을 반환한다. 예외는 error 열에 기록한다."""
+    row = {
+        "source": problem["source"],
+        "file_name": problem["file_name"],
+        "has_figure_text": bool(problem["figure_text"]),
+        "major_category": None,
+        "leaf_label": None,
+        "category_time": None,
+        "leaf_time": None,
+        "total_latency": None,
+        "error": None,
+    }
+    start_time = time.perf_counter()
+    try:
+        major_category, leaf_label, category_time, leaf_time = process_math_problem(
+            problem_text=problem["question_text"],
+            category_map=category_map,
+            figure_text=problem["figure_text"],
+            mode=mode,
+            leaf_names_map=leaf_names_map,
+            leaf_resolvers=leaf_resolvers,
+        )
+        row.update(
+            major_category=major_category,
+            leaf_label=leaf_label,
+            category_time=round(category_time, 4),
+            leaf_time=round(leaf_time, 4),
+        )
+        if not major_category or not leaf_label:
+            row["error"] = "분류 결과 없음"
+    except Exception as e:
+        row["error"] = str(e)
+    row["total_latency"] = round(time.perf_counter() - start_time, 4)
+    return row
+
+
+def percentile(values, q):
+    """최근접 순위 방식 백분위수"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered) + 0.5)) - 1))]
+
+
+def print_latency_report(rows):
+    for column in ("category_time", "leaf_time", "total_latency"):
+        values = [r[column] for r in rows if r[column] is not None]
+        print(
+            f"[EVAL] {column}: p50 {percentile(values, 50):.3f}s, "
+            f"p95 {percentile(values, 95):.3f}s, p99 {percentile(values, 99):.3f}s"
+        )
+
+    latencies = [r["total_latency"] for r in rows]
+    lower = 0.0
+    for edge in (*HISTOGRAM_EDGES, float("inf")):
+        count = sum(1 for value in latencies if lower <= value < edge)
+        label = f"{lower:g}-{edge:g}s" if edge != float("inf") else f">={lower:g}s"
+        print(f"[EVAL]   {label:>10} {count:6d} {'#' * round(50 * count / len(latencies))}")
+        lower = edge
+
+
+def write_results(rows, output_path):
+    """확장자가 .parquet이면 Parquet(pandas + pyarrow 필요), 아니면 CSV로 저장한다."""
+    if output_path.endswith(".parquet"):
+        import pandas as pd
+
+        pd.DataFrame(rows).to_parquet(output_path, index=False)
+    else:
+        with open(output_path, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    print(f"[INFO] 결과 저장: {output_path} ({len(rows)}행)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="formatted_y 오프라인 라벨링 평가")
+    parser.add_argument("--data-root", default=DATA_ROOT)
+    parser.add_argument("--splits", default="training,validation")
+    parser.add_argument("--limit", type=int, help="무작위 표본 크기 (기본: 전체)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--backend", default="stub", choices=["real", "cached", "stub"])
+    parser.add_argument("--stub-latency", type=float, default=0.0, help="stub 응답 지연 (초)")
+    parser.add_argument("--mode", default="three_call", choices=["three_call", "single_call"])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--roadmap-dir", help="로드맵 JSON 디렉토리 (기본: llm_main.ROADMAP_FILES 경로)")
+    parser.add_argument("--output", default="label_eval_results.csv", help=".csv 또는 .parquet")
+    args = parser.parse_args()
+
+    registry = roadmap_registry
+    if args.roadmap_dir:
+        registry = RoadmapRegistry(
+            {
+                category: os.path.join(args.roadmap_dir, os.path.basename(path))
+                for category, path in ROADMAP_FILES.items()
+            }
+        )
+    category_map = registry.summary_map()
+    leaf_names_map = registry.leaf_names_map()
+    leaf_resolvers = registry.leaf_resolver_map()
+
+    configure_backend(args.backend, args.stub_latency)
+    problems = load_corpus(
+        args.data_root, limit=args.limit, seed=args.seed, splits=tuple(args.splits.split(","))
+    )
+    print(f"[INFO] {len(problems)}개 문제 평가 시작 (backend={args.backend}, workers={args.workers})")
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        rows = list(
+            pool.map(
+                lambda problem: evaluate_problem(
+                    problem, category_map, leaf_names_map, args.mode, leaf_resolvers
+                ),
+                problems,
+            )
+        )
+    elapsed = time.perf_counter() - start_time
+
+    if not rows:
+        print("[ERROR] 평가할 문제가 없습니다.")
+        return
+
+    errors = sum(1 for r in rows if r["error"])
+    print(
+        f"[EVAL] {len(rows)} problems in {elapsed:.1f}s ({len(rows) / elapsed:.1f} problems/s), "
+        f"errors {errors} ({errors / len(rows):.1%})"
+    )
+    print_latency_report(rows)
+    if openai_utils.llm_cache is not None:
+        print(f"[EVAL] llm cache: {openai_utils.llm_cache.stats()}")
+    write_results(rows, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import re
+import unicodedata
+
+# 한글 음절(가-힣)을 초성/중성/종성 자모로 분해하기 위한 표
+_CHOSEONG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+_JUNGSEONG = "ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ"
+_JONGSEONG = ("",) + tuple("ㄱㄲㄳㄴㄵㄶㄷㄹㄺㄻㄼㄽㄾㄿㅀㅁㅂㅄㅅㅆㅇㅈㅊㅋㅌㅍㅎ")
+_HANGUL_BASE = 0xAC00
+_HANGUL_LAST = 0xD7A3
+
+# 이름 비교 시 무시하는 문자 (공백, 문장 부호, 따옴표 등)
+_IGNORED = re.compile(r"[\s\.,·:;'\"`“”‘’()\[\]{}<>!?~\-_/]+")
+# LLM 출력에서 여러 분류를 나누는 구분자
+_SEPARATORS = re.compile(r"[,，、\n]|\s및\s")
+
+# 프로세스 내 최하위 분류 매핑 결과 집계
+RESOLUTION_STATS = {"resolved": 0, "fuzzy": 0, "retried": 0, "retry_resolved": 0, "unresolved": 0}
+
+
+def normalize_name(text):
+    """NFC 정규화 후 공백과 문장 부호를 지운 비교용 문자열"""
+    return _IGNORED.sub("", unicodedata.normalize("NFC", text)).lower()
+
+
+def to_jamo(text):
+    """한글 음절을 자모열로 분해한다 (예: '덧셈' -> 'ㄷㅓㅅㅅㅔㅁ'). 그 밖의 문자는 그대로 둔다."""
+    chars = []
+    for char in text:
+        code = ord(char)
+        if _HANGUL_BASE <= code <= _HANGUL_LAST:
+            offset = code - _HANGUL_BASE
+            chars.append(_CHOSEONG[offset // 588])
+            chars.append(_JUNGSEONG[(offset % 588) // 28])
+            chars.append(_JONGSEONG[offset % 28])
+        else:
+            chars.append(char)
+    return "".join(chars)
+
+
+def bounded_edit_distance(a, b, max_distance):
+    """
+    a, b의 편집 거리. max_distance를 넘는 것이 확실해지면 바로 max_distance + 1을 반환한다.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, char_b in enumerate(b, 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            )
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+class ResolvedLeaf:
+    """LLM 출력 조각 하나를 로드맵 최하위 분류로 매핑한 결과"""
+
+    __slots__ = ("leaf_id", "name", "distance")
+
+    def __init__(self, leaf_id, name, distance):
+        self.leaf_id = leaf_id
+        self.name = name
+        self.distance = distance
+
+    def __repr__(self):
+        return f"ResolvedLeaf({self.leaf_id}, {self.name!r}, distance={self.distance})"
+
+
+class LeafResolver:
+    """
+    대분류 하나의 최하위 분류 이름 색인.
+
+    - 정규화한 이름 -> leaf_id 해시 조회 (정확히 일치하거나 공백/문장 부호만 다른 경우)
+    - 자모 길이별 버킷에서 자모 편집 거리로 가까운 이름 검색 (오타, 조사/어미 차이)
+    leaf_id는 roadmap_registry의 최하위 분류 순번(leaf_index)과 같다.
+    """
+
+    def __init__(self, leaf_names, max_distance_ratio=0.1):
+        self.leaf_names = list(leaf_names)
+        self.max_distance_ratio = max_distance_ratio
+        self._exact = {}
+        self._jamo = []
+        self._by_length = {}
+        for leaf_id, name in enumerate(self.leaf_names):
+            normalized = normalize_name(name)
+            self._exact.setdefault(normalized, leaf_id)
+            jamo = to_jamo(normalized)
+            self._jamo.append(jamo)
+            self._by_length.setdefault(len(jamo), []).append(leaf_id)
+
+    def _max_distance(self, jamo):
+        # 짧은 이름은 1, 그 밖에는 최소 2 (조사 '의' 하나가 자모 2개) - '덧셈'/'곱셈'(3)은 구분되도록
+        return max(1 if len(jamo) < 8 else 2, int(len(jamo) * self.max_distance_ratio))
+
+    def resolve_one(self, text):
+        """이름 하나를 ResolvedLeaf로 매핑한다. 허용 거리 안에 후보가 없으면 None."""
+        normalized = normalize_name(text)
+        if not normalized:
+            return None
+        leaf_id = self._exact.get(normalized)
+        if leaf_id is not None:
+            return ResolvedLeaf(leaf_id, self.leaf_names[leaf_id], 0)
+
+        jamo = to_jamo(normalized)
+        max_distance = self._max_distance(jamo)
+        best = None
+        for length in range(len(jamo) - max_distance, len(jamo) + max_distance + 1):
+            for leaf_id in self._by_length.get(length, ()):
+                limit = best.distance - 1 if best else max_distance
+                distance = bounded_edit_distance(jamo, self._jamo[leaf_id], limit)
+                if distance <= limit:
+                    best = ResolvedLeaf(leaf_id, self.leaf_names[leaf_id], distance)
+        return best
+
+    def resolve(self, llm_output, max_labels=2):
+        """
+        콤마 등으로 구분된 LLM 출력을 (매핑된 ResolvedLeaf 목록, 매핑하지 못한 조각 목록)으로 나눈다.
+        """
+        resolved, unresolved, seen = [], [], set()
+        for part in _SEPARATORS.split(llm_output or ""):
+            if not normalize_name(part):
+                continue
+            leaf = self.resolve_one(part)
+            if leaf is None:
+                unresolved.append(part.strip())
+            elif leaf.leaf_id not in seen:
+                seen.add(leaf.leaf_id)
+                resolved.append(leaf)
+        return resolved[:max_labels], unresolved
+
+    def nearest(self, text, n=8):
+        """자모 편집 거리가 가까운 최하위 분류 이름 n개 (재질의 후보 목록용)"""
+        jamo = to_jamo(normalize_name(text))
+        ranked = sorted(
+            range(len(self.leaf_names)),
+            key=lambda leaf_id: bounded_edit_distance(jamo, self._jamo[leaf_id], len(jamo) + len(self._jamo[leaf_id])),
+        )
+        return [self.leaf_names[leaf_id] for leaf_id in ranked[:n]]
+
+
+def canonical_leaf_labels(resolver, llm_output, stats=RESOLUTION_STATS):
+    """
+    LLM 출력을 로드맵 이름으로 바꾼 "이름, 이름" 문자열을 반환한다.
+    하나도 매핑하지 못하면 None (매핑하지 못한 나머지 조각은 버린다).
+    """
+    resolved, unresolved = resolver.resolve(llm_output)
+    if not resolved:
+        return None
+    if unresolved:
+        print(f"[WARN] 로드맵에 없는 최하위 분류를 제외합니다: {unresolved}")
+    stats["resolved"] += 1
+    if any(leaf.distance for leaf in resolved):
+        stats["fuzzy"] += 1
+    return ", ".join(leaf.name for leaf in resolved)
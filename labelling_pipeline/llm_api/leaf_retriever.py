@@ -0,0 +1,183 @@
+import asyncio
+import os
+import pickle
+import threading
+import time
+import numpy as np
+import openai
+from async_openai_client import get_async_client
+
+# 임베딩 모델 (Preprocessing/vectors의 벡터와 같은 모델, 1536차원)
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-ada-002")
+
+# 노드 이름별 벡터 pickle이 저장된 디렉토리 (Preprocessing/neo4j_test.ipynb의 save_vector_to_file 형식)
+LEAF_VECTOR_DIR = os.getenv(
+    "LEAF_VECTOR_DIR",
+    os.path.normpath(
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Preprocessing", "vectors")
+    ),
+)
+
+# 대분류별 최하위 분류 임베딩 행렬(.npz)을 저장하는 디렉토리
+LEAF_EMBEDDING_DIR = os.getenv(
+    "LEAF_EMBEDDING_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "leaf_embeddings"),
+)
+
+# 임베딩 API 한 번에 보낼 텍스트 수
+EMBEDDING_BATCH_SIZE = 256
+
+# 요청 경로에서 행렬을 다시 만들 때 임베딩 API로 계산할 수 있는 최대 이름 수 (0이면 제한 없음)
+# 넘으면 RuntimeError를 내고 호출한 쪽은 전체 로드맵으로 진행한다. warm_up()에는 적용하지 않는다.
+# 참고: Preprocessing/vectors의 pickle은 대분류 이름별 벡터뿐이라 최하위 분류는 거의 모두 API로 계산된다.
+LEAF_EMBED_BUDGET = int(os.getenv("LEAF_EMBED_BUDGET", "200"))
+
+
+def embed_texts(texts, model=EMBEDDING_MODEL):
+    """OpenAI Embedding API로 텍스트 리스트를 임베딩한다 (동기)."""
+    vectors = []
+    for start in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+        response = openai.Embedding.create(model=model, input=texts[start : start + EMBEDDING_BATCH_SIZE])
+        data = sorted(response["data"], key=lambda d: d["index"])
+        vectors.extend(item["embedding"] for item in data)
+    return vectors
+
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class LeafRetriever:
+    """
+    최하위 분류 이름 임베딩 행렬에서 코사인 유사도로 상위 k개 후보를 고른다.
+
+    대분류별 행렬은 다음 순서로 채운다.
+    1. LEAF_EMBEDDING_DIR/{대분류}.npz (이전에 만든 행렬, 이름이 같은 행만 재사용)
+    2. LEAF_VECTOR_DIR/{이름}.pkl (노드 이름별 벡터 pickle)
+    3. 남은 이름은 임베딩 API로 한 번에 계산한 뒤 .npz로 저장
+    로드맵의 최하위 분류 목록이 바뀌면 바뀐 이름만 다시 계산한다.
+    요청 경로의 재계산은 embed_budget개 이름까지만 허용하고, 비동기 메서드는 스레드에서 실행한다.
+    """
+
+    def __init__(
+        self,
+        roadmap_registry,
+        vector_dir=LEAF_VECTOR_DIR,
+        embedding_dir=LEAF_EMBEDDING_DIR,
+        model=EMBEDDING_MODEL,
+        embed_fn=embed_texts,
+        embed_budget=LEAF_EMBED_BUDGET,
+    ):
+        self.roadmap_registry = roadmap_registry
+        self.vector_dir = vector_dir
+        self.embedding_dir = embedding_dir
+        self.model = model
+        self.embed_fn = embed_fn
+        self.embed_budget = embed_budget
+        self._matrices = {}
+        self._lock = threading.Lock()
+
+    def _load_pickled_vector(self, name):
+        path = os.path.join(self.vector_dir, f"{name}.pkl")
+        if not os.path.isfile(path):
+            return None
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    def _build_matrix(self, category, leaf_names, budget=None):
+        start_time = time.perf_counter()
+        matrix_path = os.path.join(self.embedding_dir, f"{category}.npz")
+        vectors = {}
+        if os.path.isfile(matrix_path):
+            saved = np.load(matrix_path, allow_pickle=False)
+            if str(saved["model"]) == self.model:
+                vectors.update(zip(saved["names"].tolist(), saved["matrix"]))
+
+        reused = len(vectors)
+        pickled = 0
+        for name in leaf_names:
+            if name not in vectors:
+                vector = self._load_pickled_vector(name)
+                if vector is not None:
+                    vectors[name] = np.asarray(vector, dtype=np.float32)
+                    pickled += 1
+
+        missing = [name for name in leaf_names if name not in vectors]
+        if missing and budget and len(missing) > budget:
+            raise RuntimeError(
+                f"'{category}' 최하위 분류 {len(missing)}개를 임베딩해야 해 예산({budget}개)을 넘었습니다"
+            )
+        if missing:
+            print(f"[INFO] '{category}' 최하위 분류 {len(missing)}개 임베딩 계산 중...")
+            vectors.update(zip(missing, np.asarray(self.embed_fn(missing), dtype=np.float32)))
+
+        matrix = np.stack([vectors[name] for name in leaf_names]).astype(np.float32)
+        if missing:
+            os.makedirs(self.embedding_dir, exist_ok=True)
+            np.savez(matrix_path, names=np.array(leaf_names), matrix=matrix, model=np.array(self.model))
+        print(
+            f"[INFO] '{category}' 임베딩 행렬 {len(leaf_names)}개 준비 "
+            f"(재사용 {reused}, pickle {pickled}, API {len(missing)}, {time.perf_counter() - start_time:.2f}s)"
+        )
+        return _normalize_rows(matrix)
+
+    def _get_matrix(self, category, budget=None):
+        """대분류의 (정규화된 임베딩 행렬, 최하위 분류 이름 목록). 로드맵이 바뀌면 다시 만든다."""
+        leaf_names = self.roadmap_registry.leaf_names(category)
+        with self._lock:
+            cached = self._matrices.get(category)
+            if cached is None or cached[1] is not leaf_names:
+                cached = (self._build_matrix(category, leaf_names, budget), leaf_names)
+                self._matrices[category] = cached
+            return cached
+
+    def warm_up(self):
+        """모든 대분류의 행렬을 예산 제한 없이 미리 만든다 (서버 시작 시 첫 요청 지연 방지)."""
+        for category in self.roadmap_registry.categories():
+            self._get_matrix(category)
+
+    def top_k(self, category, query_vector, k=10):
+        """질의 벡터와 코사인 유사도가 높은 최하위 분류 이름 k개를 유사도 순으로 반환한다."""
+        matrix, leaf_names = self._get_matrix(category, self.embed_budget)
+        if k >= len(leaf_names):
+            return list(leaf_names)
+        query = np.asarray(query_vector, dtype=np.float32)
+        scores = matrix @ (query / (np.linalg.norm(query) or 1.0))
+        top = np.argpartition(-scores, k)[:k]
+        return [leaf_names[i] for i in top[np.argsort(-scores[top])]]
+
+    def embed_query(self, text):
+        return self.embed_fn([text])[0]
+
+    async def aembed_query(self, text):
+        return (await get_async_client().create_embeddings([text], model=self.model))[0]
+
+    def shortlist(self, category, query_text, k=10):
+        """질의 텍스트를 임베딩해 대분류 내 상위 k개 최하위 분류를 반환한다."""
+        return self.top_k(category, self.embed_query(query_text), k)
+
+    def _top_k_map(self, query_vector, k):
+        return {
+            category: self.top_k(category, query_vector, k)
+            for category in self.roadmap_registry.categories()
+        }
+
+    def shortlist_map(self, query_text, k=10):
+        """질의 텍스트를 한 번만 임베딩해 모든 대분류의 상위 k개 후보를 {대분류: 이름 목록}으로 반환한다."""
+        return self._top_k_map(self.embed_query(query_text), k)
+
+    # 로드맵이 바뀐 뒤에는 top_k가 행렬을 다시 만들며 동기 임베딩 API를 부르므로 스레드에서 실행한다.
+    async def ashortlist(self, category, query_text, k=10):
+        query_vector = await self.aembed_query(query_text)
+        return await asyncio.to_thread(self.top_k, category, query_vector, k)
+
+    async def ashortlist_map(self, query_text, k=10):
+        query_vector = await self.aembed_query(query_text)
+        return await asyncio.to_thread(self._top_k_map, query_vector, k)
+
+
+def format_leaf_candidates(leaf_names):
+    """후보 최하위 분류 목록을 계층 구조 요약과 같은 형식의 텍스트로 만든다."""
+    return "".join(f"  - {name}\n" for name in leaf_names)
@@ -0,0 +1,136 @@
+"""
+최하위 분류 프롬프트에 대분류 로드맵 전체를 넣는 방식과 임베딩 상위 k개 후보만 넣는 방식을 비교하는 벤치마크.
+
+    python leaf_shortlist_benchmark.py --limit 50 --top-k 10 --labels labels.csv
+
+문제마다 개념/대분류는 한 번만 추출하고, 최하위 분류 단계만 두 방식으로 실행한다.
+- 프롬프트 토큰 수 (최하위 분류 프롬프트 기준) 감소율
+- 정답 라벨 CSV(source, leaf_label)가 있으면 두 방식의 정확도, 없으면 전체 로드맵 결과와의 일치율
+- 기준 라벨이 상위 k개 후보에 포함된 비율 (recall@k)
+"""
+import argparse
+import csv
+import statistics
+import time
+from corpus_utils import DATA_ROOT, load_corpus
+from json_utils import count_tokens
+from leaf_retriever import LeafRetriever, format_leaf_candidates
+from llm_main import roadmap_registry
+from openai_utils import (
+    build_leaf_category_prompt,
+    determine_major_category,
+    extract_leaf_category_within_major_category,
+    extract_math_concepts,
+)
+
+
+def _leaf_set(leaf_label):
+    if not leaf_label:
+        return set()
+    return {label.strip() for label in leaf_label.split(",") if label.strip()}
+
+
+def load_labels(path):
+    """source 열과 leaf_label 열이 있는 CSV를 {source: 최하위 분류 집합}으로 읽는다."""
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        return {row["source"]: _leaf_set(row["leaf_label"]) for row in csv.DictReader(f)}
+
+
+def run_leaf_stage(math_concept, major_category, json_summary):
+    """최하위 분류 단계 하나를 실행하고 (결과, 프롬프트 토큰 수, 지연 시간)을 반환한다."""
+    prompt_tokens = count_tokens(build_leaf_category_prompt(math_concept, major_category, json_summary))
+    start_time = time.perf_counter()
+    leaf_label = extract_leaf_category_within_major_category(math_concept, major_category, json_summary)
+    return leaf_label, prompt_tokens, time.perf_counter() - start_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="최하위 분류 후보 검색(top-k) 벤치마크")
+    parser.add_argument("--data-root", default=DATA_ROOT)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--labels", help="정답 라벨 CSV (source, leaf_label)")
+    parser.add_argument("--output", help="문제별 결과를 저장할 CSV 경로")
+    args = parser.parse_args()
+
+    labels = load_labels(args.labels) if args.labels else {}
+    problems = load_corpus(args.data_root, limit=args.limit, seed=args.seed)
+    if labels:
+        problems = [p for p in problems if p["source"] in labels]
+    summary_map = roadmap_registry.summary_map()
+    retriever = LeafRetriever(roadmap_registry)
+    retriever.warm_up()
+
+    rows = []
+    for idx, problem in enumerate(problems, 1):
+        print(f"[INFO] ({idx}/{len(problems)}) {problem['source']}")
+        combined_text = problem["question_text"]
+        if problem["figure_text"]:
+            combined_text += "\n" + problem["figure_text"]
+
+        math_concept = extract_math_concepts(combined_text)
+        major_category = determine_major_category(math_concept)
+        if major_category not in summary_map:
+            print(f"[WARN] 알 수 없는 대분류, 건너뜁니다: {major_category}")
+            continue
+
+        candidates = retriever.shortlist(major_category, math_concept, args.top_k)
+        full = run_leaf_stage(math_concept, major_category, summary_map[major_category])
+        short = run_leaf_stage(math_concept, major_category, format_leaf_candidates(candidates))
+
+        reference = labels.get(problem["source"]) or _leaf_set(full[0])
+        rows.append(
+            {
+                "source": problem["source"],
+                "major_category": major_category,
+                "full_leaf": full[0],
+                "full_prompt_tokens": full[1],
+                "full_latency": round(full[2], 3),
+                "topk_leaf": short[0],
+                "topk_prompt_tokens": short[1],
+                "topk_latency": round(short[2], 3),
+                "full_correct": bool(_leaf_set(full[0]) & reference) if labels else None,
+                "topk_correct": bool(_leaf_set(short[0]) & reference),
+                "reference_in_topk": bool(reference & set(candidates)),
+            }
+        )
+
+    if not rows:
+        print("[ERROR] 평가할 문제가 없습니다.")
+        return
+
+    full_tokens = sum(r["full_prompt_tokens"] for r in rows)
+    topk_tokens = sum(r["topk_prompt_tokens"] for r in rows)
+    print(
+        f"[BENCH] leaf prompt tokens: full {full_tokens} -> top-{args.top_k} {topk_tokens} "
+        f"({1 - topk_tokens / full_tokens:.1%} reduction)"
+    )
+    print(
+        f"[BENCH] leaf latency: full median {statistics.median(r['full_latency'] for r in rows):.2f}s, "
+        f"top-{args.top_k} median {statistics.median(r['topk_latency'] for r in rows):.2f}s"
+    )
+    if labels:
+        print(
+            f"[BENCH] accuracy: full {sum(r['full_correct'] for r in rows) / len(rows):.2%}, "
+            f"top-{args.top_k} {sum(r['topk_correct'] for r in rows) / len(rows):.2%}"
+        )
+    else:
+        print(
+            f"[BENCH] agreement with full roadmap: {sum(r['topk_correct'] for r in rows) / len(rows):.2%}"
+        )
+    print(
+        f"[BENCH] recall@{args.top_k}: {sum(r['reference_in_topk'] for r in rows) / len(rows):.2%} "
+        f"over {len(rows)} problems"
+    )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"[INFO] 결과 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,52 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from llm_main import process_multiple_problems
-from typing import Optional
+from job_store import JobStore
+from llm_main import aprocess_multiple_problems, category_prefilter, leaf_retriever, result_writer
+from async_openai_client import close_async_client, get_async_client
+from fastapi.concurrency import run_in_threadpool
+import openai_utils
+from leaf_resolver import RESOLUTION_STATS
+from typing import List, Optional
 import os
 import uvicorn
 
+# 일괄 처리 작업 설정 (작업당 동시에 처리할 문제 수, 작업 상태 저장 파일)
+LLM_JOB_CONCURRENCY = int(os.getenv("LLM_JOB_CONCURRENCY", "16"))
+LLM_JOB_DB_PATH = os.getenv(
+    "LLM_JOB_DB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "jobs.sqlite3"),
+)
+
+job_store = JobStore(LLM_JOB_DB_PATH)
+# 실행 중인 작업 태스크 {job_id: asyncio.Task}
+job_tasks = {}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 최하위 분류 임베딩 행렬을 미리 만들어 첫 요청이 기다리지 않도록 함
+    if leaf_retriever is not None:
+        await run_in_threadpool(leaf_retriever.warm_up)
+    # 재시작 전에 끝나지 않은 작업은 남은 항목만 이어서 처리
+    for job_id in job_store.unfinished_jobs():
+        print(f"[INFO] 미완료 작업 재개: {job_id}")
+        start_job(job_id)
+    yield
+    # 실행 중인 작업 중단 (처리되지 않은 항목은 pending으로 남아 다음 시작 때 재개)
+    for task in job_tasks.values():
+        task.cancel()
+    await asyncio.gather(*job_tasks.values(), return_exceptions=True)
+    # 공유 OpenAI 클라이언트의 연결 풀 정리
+    await close_async_client()
+    # 남은 라벨링 결과를 저장하고 DB 커넥션 풀 정리
+    await run_in_threadpool(result_writer.close)
+
+
 # FastAPI 애플리케이션 생성
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 
 # API에서 사용할 입력 데이터 모델 정의
@@ -15,6 +55,71 @@ class ProblemData(BaseModel):
     processed_data: dict
 
 
+class BulkProblemData(BaseModel):
+    problems: List[ProblemData]
+
+
+async def run_job(job_id):
+    """작업의 pending 항목을 LLM_JOB_CONCURRENCY개의 작업자가 큐에서 꺼내 처리하고 결과를 하나씩 기록한다."""
+    await asyncio.to_thread(job_store.mark_started, job_id)
+    pending = await asyncio.to_thread(job_store.pending_items, job_id)
+    queue = asyncio.Queue()
+    for item in pending:
+        queue.put_nowait(item)
+
+    async def _one(item_index, file_name, processed_data):
+        start_time = time.perf_counter()
+        try:
+            _, category, leaf_category, category_time, leaf_time = (
+                await aprocess_multiple_problems(file_name, processed_data)
+            )
+            result = {
+                "category": category,
+                "leaf_category": leaf_category,
+                "category_time": category_time,
+                "leaf_time": leaf_time,
+            }
+            # 분류 함수는 실패하면 예외 대신 None을 반환하므로 오류로 기록
+            if category is None:
+                error = "대분류 분류 실패"
+            elif leaf_category is None:
+                error = "최하위 분류 실패"
+            else:
+                error = None
+        except Exception as e:
+            result, error = None, str(e)
+        await asyncio.to_thread(
+            job_store.record_result,
+            job_id,
+            item_index,
+            result,
+            error,
+            time.perf_counter() - start_time,
+        )
+
+    async def _worker():
+        while True:
+            try:
+                item = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await _one(*item)
+
+    workers = [asyncio.create_task(_worker()) for _ in range(min(LLM_JOB_CONCURRENCY, len(pending)))]
+    try:
+        await asyncio.gather(*workers)
+        await asyncio.to_thread(job_store.mark_completed, job_id)
+        print(f"[INFO] 작업 완료: {job_id} ({len(pending)}개 처리)")
+    finally:
+        for worker in workers:
+            worker.cancel()
+        job_tasks.pop(job_id, None)
+
+
+def start_job(job_id):
+    job_tasks[job_id] = asyncio.create_task(run_job(job_id))
+
+
 # LLM API 엔드포인트 정의
 @app.post("/process_problem")
 async def process_problem(problem: ProblemData):
@@ -22,9 +127,9 @@ async def process_problem(problem: ProblemData):
     문제 텍스트를 처리하여 라벨링하고 PostgreSQL에 저장
     """
     try:
-        # LLM을 통해 문제 처리 및 라벨링
+        # LLM을 통해 문제 처리 및 라벨링 (비동기 클라이언트로 여러 요청을 동시에 처리)
         file_name, category, leaf_category, category_time, leaf_time = (
-            process_multiple_problems(problem.file_name, problem.processed_data)
+            await aprocess_multiple_problems(problem.file_name, problem.processed_data)
         )
 
         # 처리 결과 반환
@@ -38,3 +143,61 @@ async def process_problem(problem: ProblemData):
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"문제 처리 실패: {e}")
+
+
+@app.post("/process_problems")
+async def process_problems(bulk: BulkProblemData):
+    """
+    여러 문제를 일괄 처리하는 작업을 만들고 job_id를 바로 반환
+    진행 상황은 GET /process_problems/{job_id}로 확인
+    """
+    if not bulk.problems:
+        raise HTTPException(status_code=400, detail="처리할 문제가 없습니다.")
+    job_id = await asyncio.to_thread(
+        job_store.create_job, [(p.file_name, p.processed_data) for p in bulk.problems]
+    )
+    start_job(job_id)
+    return {"job_id": job_id, "total": len(bulk.problems)}
+
+
+@app.get("/process_problems/{job_id}")
+async def process_problems_status(job_id: str, offset: int = 0, limit: int = 100):
+    """작업 진행률, 처리량(items/sec), 항목별 결과와 오류 (offset/limit로 나눠 조회)"""
+    status = await asyncio.to_thread(job_store.job_status, job_id, offset, limit)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"작업을 찾을 수 없습니다: {job_id}")
+    return status
+
+
+@app.get("/openai_client/stats")
+async def openai_client_stats():
+    """OpenAI 클라이언트 요청 수, 재시도 횟수, 진행 중 요청 수"""
+    return get_async_client().stats()
+
+
+@app.get("/llm_cache/stats")
+async def llm_cache_stats():
+    """LLM 응답 캐시 hit/miss, 적중률, 아낀 토큰 수"""
+    if openai_utils.llm_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **(await run_in_threadpool(openai_utils.llm_cache.stats))}
+
+
+@app.get("/db_writer/stats")
+async def db_writer_stats():
+    """라벨링 결과 저장 건수, 대기 중인 행 수, 초당 INSERT 수"""
+    return result_writer.stats()
+
+
+@app.get("/category_prefilter/stats")
+async def category_prefilter_stats():
+    """규칙으로 대분류를 결정한 비율 (대분류 LLM 호출을 건너뛴 비율)"""
+    if category_prefilter is None:
+        return {"enabled": False}
+    return {"enabled": True, **category_prefilter.stats()}
+
+
+@app.get("/leaf_resolver/stats")
+async def leaf_resolver_stats():
+    """최하위 분류 출력의 로드맵 매핑 결과 (정규화/근사 일치/재질의/실패 횟수)"""
+    return dict(RESOLUTION_STATS)
@@ -0,0 +1,153 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+# 캐시 동작 방식
+# - off        : 캐시를 사용하지 않음
+# - read_write : 캐시에 있으면 재사용하고, 없으면 API를 호출해 저장 (기본값)
+# - cache_only : 캐시에 있는 응답만 재생하고, 없으면 API를 호출하지 않고 LLMCacheMissError
+CACHE_MODES = ("off", "read_write", "cache_only")
+
+
+class LLMCacheMissError(Exception):
+    """cache_only 모드에서 캐시에 없는 프롬프트를 요청한 경우"""
+
+
+def normalize_prompt(prompt: str) -> str:
+    """유니코드 정규화(NFC) 후 공백을 하나로 합쳐, 띄어쓰기/줄바꿈 차이만 있는 프롬프트를 같은 키로 만든다."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", prompt)).strip()
+
+
+def make_cache_key(prompt: str, model: str, temperature: float, max_tokens: int, prompt_version: str) -> str:
+    """정규화한 프롬프트 + 모델 + 온도 + 최대 토큰 + 프롬프트 템플릿 버전의 sha256"""
+    raw = "\x1f".join(
+        [prompt_version, model, f"{float(temperature):.3f}", str(max_tokens), normalize_prompt(prompt)]
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    프롬프트 키로 LLM 응답 텍스트를 저장하는 SQLite 캐시.
+
+    - ttl_seconds가 지난 항목은 miss로 처리하고 지운다 (0이면 만료 없음).
+    - max_entries를 넘으면 가장 오래 사용되지 않은 항목부터 지운다 (LRU).
+    - hit/miss 횟수와 재사용으로 아낀 토큰 수를 stats()로 제공한다.
+    """
+
+    def __init__(self, db_path: str, max_entries: int = 200_000, ttl_seconds: float = 0, mode: str = "read_write"):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"알 수 없는 LLM 캐시 모드: {mode} (가능한 값: {', '.join(CACHE_MODES)})")
+        self.db_path = db_path
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = max(0.0, ttl_seconds)
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.saved_tokens = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                cache_key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                response TEXT NOT NULL,
+                prompt_tokens INTEGER NOT NULL,
+                completion_tokens INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache (last_access)"
+        )
+
+    def get(self, cache_key: str):
+        """캐시된 응답 텍스트를 반환한다. 없거나 만료되었으면 None."""
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT response, prompt_tokens, completion_tokens, created_at "
+                "FROM llm_cache WHERE cache_key = ?",
+                (cache_key,),
+            ).fetchone()
+
+            if row is not None and self.ttl_seconds and now - row[3] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_cache WHERE cache_key = ?", (cache_key,))
+                self.expired += 1
+                row = None
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE llm_cache SET last_access = ? WHERE cache_key = ?", (now, cache_key)
+            )
+            self.hits += 1
+            self.saved_tokens += row[1] + row[2]
+            return row[0]
+
+    def put(self, cache_key: str, model: str, prompt_version: str, response: str, usage=None):
+        """응답을 저장하고, 용량을 넘으면 LRU 순서로 오래된 항목을 지운다."""
+        usage = usage or {}
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache "
+                "(cache_key, model, prompt_version, response, prompt_tokens, completion_tokens, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    cache_key,
+                    model,
+                    prompt_version,
+                    response,
+                    usage.get("prompt_tokens", 0),
+                    usage.get("completion_tokens", 0),
+                    now,
+                    now,
+                ),
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE rowid IN "
+                    "(SELECT rowid FROM llm_cache ORDER BY last_access LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+    def purge_expired(self) -> int:
+        """TTL이 지난 항목을 한꺼번에 지우고 삭제 개수를 반환한다."""
+        if not self.ttl_seconds:
+            return 0
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+            ).rowcount
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                "mode": self.mode,
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "saved_tokens": self.saved_tokens,
+            }
@@ -0,0 +1,118 @@
+"""
+가짜 OpenAI 서버를 띄우고 aprocess_math_problem의 처리량(problems/sec)을 측정하는 부하 테스트.
+
+    python llm_load_test.py --problems 200 --concurrency 50 --latency 0.5 --rate-limit-ratio 0.05
+
+- before: 한 번에 한 문제씩 처리 (동기 핸들러가 이벤트 루프를 막던 기존 방식과 같은 직렬 처리)
+- after : concurrency개 문제를 동시에 처리 (공유 AsyncOpenAIClient의 속도 제한/재시도 적용)
+"""
+import argparse
+import asyncio
+import os
+import threading
+import time
+
+FAKE_HOST = "127.0.0.1"
+FAKE_PORT = 18010
+
+# async_openai_client가 import 시점에 설정을 읽으므로 먼저 가짜 서버 주소로 설정
+os.environ.setdefault("OPENAI_BASE_URL", f"http://{FAKE_HOST}:{FAKE_PORT}/v1")
+os.environ.setdefault("OPENAI_API_KEY", "fake-key")
+# 기본 한도(실제 계정 기준)로는 속도 제한이 처리량을 결정하므로, 별도 지정이 없으면 넉넉하게 설정
+os.environ.setdefault("OPENAI_MAX_RPM", "100000")
+os.environ.setdefault("OPENAI_MAX_TPM", "100000000")
+# 같은 문제를 반복해서 보내므로 응답 캐시를 끄고 API 경로만 측정
+os.environ.setdefault("LLM_CACHE_MODE", "off")
+
+import uvicorn  # noqa: E402
+import async_openai_client  # noqa: E402
+from fake_openai_server import create_app  # noqa: E402
+from problem_processor import aprocess_math_problem  # noqa: E402
+
+# 로드맵 파일 없이도 실행되도록 작은 요약/최하위 분류 목록을 사용
+CATEGORY_MAP = {
+    "수와 연산": "- 세 자리 수의 덧셈\n- 세 자리 수의 뺄셈",
+    "변화와 관계": "- 규칙 찾기",
+    "도형과 측정": "- 길이 재기",
+    "자료와 가능성": "- 막대그래프",
+}
+LEAF_NAMES_MAP = {
+    "수와 연산": ["세 자리 수의 덧셈", "세 자리 수의 뺄셈"],
+    "변화와 관계": ["규칙 찾기"],
+    "도형과 측정": ["길이 재기"],
+    "자료와 가능성": ["막대그래프"],
+}
+PROBLEM_TEXT = "345 + 278을 계산하세요."
+
+
+def start_fake_server(app) -> uvicorn.Server:
+    """uvicorn 서버를 백그라운드 스레드에서 실행한다."""
+    server = uvicorn.Server(
+        uvicorn.Config(app, host=FAKE_HOST, port=FAKE_PORT, log_level="warning", backlog=2048)
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def run_load(name, num_problems, concurrency, mode):
+    """num_problems개 문제를 concurrency개씩 동시에 분류하고 처리량을 출력한다."""
+    client = async_openai_client.get_async_client()
+    retries_before = client.retries
+    semaphore = asyncio.Semaphore(concurrency)
+    errors = 0
+
+    async def _one():
+        nonlocal errors
+        async with semaphore:
+            major_category, leaf_label, _, _ = await aprocess_math_problem(
+                PROBLEM_TEXT, CATEGORY_MAP, mode=mode, leaf_names_map=LEAF_NAMES_MAP
+            )
+            if not major_category or not leaf_label:
+                errors += 1
+
+    start_time = time.perf_counter()
+    await asyncio.gather(*(_one() for _ in range(num_problems)))
+    elapsed = time.perf_counter() - start_time
+    pps = num_problems / elapsed if elapsed > 0 else 0.0
+    print(
+        f"[BENCH] {name}: {num_problems} problems in {elapsed:.2f}s "
+        f"({pps:.2f} problems/s, retries={client.retries - retries_before}, errors={errors})"
+    )
+    return pps
+
+
+async def main_async(args):
+    try:
+        before = await run_load("before (serial)", args.serial_problems, 1, args.mode)
+        after = await run_load(
+            f"after (concurrency={args.concurrency})", args.problems, args.concurrency, args.mode
+        )
+        print(f"[BENCH] speedup: x{after / before:.2f}" if before else "[BENCH] speedup: n/a")
+        print(f"[BENCH] client stats: {async_openai_client.get_async_client().stats()}")
+    finally:
+        await async_openai_client.close_async_client()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="비동기 LLM 분류 부하 테스트 (가짜 OpenAI 서버)")
+    parser.add_argument("--problems", type=int, default=200)
+    parser.add_argument("--serial-problems", type=int, default=10, help="직렬 기준선에 사용할 문제 수")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.5, help="가짜 OpenAI 응답 지연 (초)")
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.0, help="429 응답 비율")
+    parser.add_argument("--mode", default="three_call", choices=["three_call", "single_call"])
+    args = parser.parse_args()
+
+    app = create_app(latency=args.latency, rate_limit_ratio=args.rate_limit_ratio)
+    server = start_fake_server(app)
+    try:
+        asyncio.run(main_async(args))
+        print(f"[BENCH] fake server: {app.state.requests} requests, {app.state.rate_limited} rate limited")
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
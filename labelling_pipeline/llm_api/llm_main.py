@@ -1,6 +1,8 @@
-import psycopg2
-from datetime import datetime
-from problem_processor import process_math_problem
+from db_writer import LabellingResultWriter
+from problem_processor import process_math_problem, aprocess_math_problem
+from roadmap_registry import RoadmapRegistry
+from leaf_retriever import LeafRetriever
+from category_prefilter import CategoryPrefilter
 from dotenv import load_dotenv
 import os
 import json
@@ -23,6 +25,18 @@ DB_CONFIG = {
     "port": POSTGRES_PORT,
 }
 
+# 라벨링 결과 일괄 저장 설정 (배치 크기, 최대 대기 시간, 커넥션 풀 크기)
+DB_WRITE_BATCH_SIZE = int(os.getenv("DB_WRITE_BATCH_SIZE", "200"))
+DB_WRITE_FLUSH_INTERVAL = float(os.getenv("DB_WRITE_FLUSH_INTERVAL", "2.0"))
+DB_POOL_MAX_CONNECTIONS = int(os.getenv("DB_POOL_MAX_CONNECTIONS", "4"))
+
+result_writer = LabellingResultWriter(
+    DB_CONFIG,
+    batch_size=DB_WRITE_BATCH_SIZE,
+    flush_interval=DB_WRITE_FLUSH_INTERVAL,
+    max_connections=DB_POOL_MAX_CONNECTIONS,
+)
+
 # 로드맵 파일 경로 설정
 ROADMAP_FILES = {
     "수와 연산": r"D:/programming/python/chunjae/finalproject/kst_pipeline/Preprocessing/roadmap/01_num_cal.json",
@@ -32,58 +46,47 @@ ROADMAP_FILES = {
 }
 
 
-def load_roadmap(category):
-    """로드맵 JSON 파일 로드"""
-    file_path = ROADMAP_FILES.get(category)
-    if not file_path:
-        raise ValueError(f"로드맵 파일 경로를 찾을 수 없습니다: {category}")
-    with open(file_path, "r", encoding="utf-8") as f:
-        return json.load(f)
+# 분류 방식: "three_call"(기본) 또는 "single_call"
+LLM_CLASSIFY_MODE = os.getenv("LLM_CLASSIFY_MODE", "three_call")
 
+# 로드맵은 프로세스당 한 번만 파싱하고, 파일이 바뀌면 자동으로 다시 읽음
+roadmap_registry = RoadmapRegistry(ROADMAP_FILES)
 
-def save_to_db(file_name, category_label, leaf_label):
-    """결과를 PostgreSQL에 저장 (psycopg2 사용)"""
-    try:
-        print(
-            f"[DEBUG] 데이터베이스에 저장 중... (파일: {file_name}, 대분류: {category_label}, 최하위분류: {leaf_label})"
-        )
+# 최하위 분류 후보 수 (0이면 임베딩 검색 없이 대분류 로드맵 전체를 프롬프트에 넣음)
+LLM_LEAF_TOP_K = int(os.getenv("LLM_LEAF_TOP_K", "0"))
+leaf_retriever = LeafRetriever(roadmap_registry) if LLM_LEAF_TOP_K > 0 else None
 
-        # PostgreSQL 연결
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
+# 최하위 분류 출력을 로드맵 이름으로 정규화 (맞지 않으면 후보 목록 안에서 한 번 재질의)
+LLM_RESOLVE_LEAF_LABELS = os.getenv("LLM_RESOLVE_LEAF_LABELS", "true").lower() == "true"
 
-        # FileRecord 찾기
-        cur.execute(
-            "SELECT id FROM upload_filerecord WHERE file_name = %s;", (file_name,)
-        )
-        file_record = cur.fetchone()
-
-        # LabellingResult 생성
-        file_record_id = file_record[0]
-        cur.execute(
-            """ 
-            INSERT INTO upload_labellingresult (file_record_id, category_label, leaf_label, processed_at)
-            VALUES (%s, %s, %s, %s);
-        """,
-            (file_record_id, category_label, leaf_label, datetime.now()),
-        )
+# 규칙으로 확실한 문제는 대분류 LLM 호출을 건너뜀 (신뢰도 기준값으로 조절)
+LLM_CATEGORY_PREFILTER = os.getenv("LLM_CATEGORY_PREFILTER", "false").lower() == "true"
+LLM_CATEGORY_PREFILTER_MIN_CONFIDENCE = float(os.getenv("LLM_CATEGORY_PREFILTER_MIN_CONFIDENCE", "0.8"))
+category_prefilter = (
+    CategoryPrefilter(min_confidence=LLM_CATEGORY_PREFILTER_MIN_CONFIDENCE)
+    if LLM_CATEGORY_PREFILTER
+    else None
+)
 
-        conn.commit()
 
-        print(
-            f"[INFO] 저장 성공: {file_name}, 라벨링 결과: {category_label}, {leaf_label}"
-        )
-
-        cur.close()
-        conn.close()
-
-    except Exception as e:
-        print(f"[ERROR] 저장 실패: {e}")
-        raise e  # 에러를 상위 호출 함수로 전달
+def load_roadmap(category):
+    """로드맵 JSON 데이터 반환 (레지스트리에 캐시된 파싱 결과)"""
+    return roadmap_registry.get(category).data
 
 
-def process_multiple_problems(file_name, processed_data):
-    """문제 처리 및 결과 출력"""
+def save_to_db(file_name, category_label, leaf_label):
+    """
+    결과를 PostgreSQL에 저장 (result_writer 버퍼에 추가)
+    커넥션 풀을 사용해 배치 크기나 대기 시간이 차면 한 번에 INSERT합니다.
+    """
+    print(
+        f"[DEBUG] 저장 대기열에 추가 (파일: {file_name}, 대분류: {category_label}, 최하위분류: {leaf_label})"
+    )
+    result_writer.start()
+    result_writer.add(file_name, category_label, leaf_label)
+
+
+def _get_question_text(processed_data):
     if not processed_data or "text" not in processed_data:
         raise ValueError("전처리된 데이터에 문제 텍스트가 없습니다.")
 
@@ -93,16 +96,32 @@ def process_multiple_problems(file_name, processed_data):
         raise ValueError("문제 텍스트가 비어있습니다.")
 
     print(f"문제 텍스트: {question_text}")
+    return question_text
+
+
+def process_multiple_problems(file_name, processed_data):
+    """문제 처리 및 결과 출력"""
+    question_text = _get_question_text(processed_data)
 
     try:
-        # 로드맵 파일 로드
-        category_map = {category: load_roadmap(category) for category in ROADMAP_FILES}
+        # 대분류별 계층 구조 요약 (레지스트리에서 미리 계산된 텍스트)
+        category_map = roadmap_registry.summary_map()
 
         # 문제 처리
         category, leaf_category, category_time, leaf_time = process_math_problem(
             problem_text=question_text,
             category_map=category_map,
             model="gpt-4o",  # 기본 모델을 "gpt-4o"로 설정
+            mode=LLM_CLASSIFY_MODE,
+            leaf_names_map=(
+                roadmap_registry.leaf_names_map()
+                if LLM_CLASSIFY_MODE == "single_call"
+                else None
+            ),
+            leaf_retriever=leaf_retriever,
+            top_k=LLM_LEAF_TOP_K,
+            category_prefilter=category_prefilter,
+            leaf_resolvers=roadmap_registry.leaf_resolver_map() if LLM_RESOLVE_LEAF_LABELS else None,
         )
 
         # 처리 결과 출력
@@ -121,3 +140,31 @@ def process_multiple_problems(file_name, processed_data):
     except Exception as e:
         print(f"[ERROR] 문제 처리 실패: {e}")
         raise e  # 예외를 상위 호출 함수로 전달
+
+
+async def aprocess_multiple_problems(file_name, processed_data):
+    """process_multiple_problems의 비동기 버전 (API 서버에서 여러 요청을 동시에 처리)"""
+    question_text = _get_question_text(processed_data)
+
+    try:
+        category, leaf_category, category_time, leaf_time = await aprocess_math_problem(
+            problem_text=question_text,
+            category_map=roadmap_registry.summary_map(),
+            model="gpt-4o",
+            mode=LLM_CLASSIFY_MODE,
+            leaf_names_map=(
+                roadmap_registry.leaf_names_map()
+                if LLM_CLASSIFY_MODE == "single_call"
+                else None
+            ),
+            leaf_retriever=leaf_retriever,
+            top_k=LLM_LEAF_TOP_K,
+            category_prefilter=category_prefilter,
+            leaf_resolvers=roadmap_registry.leaf_resolver_map() if LLM_RESOLVE_LEAF_LABELS else None,
+        )
+        print(f"[DEBUG] 처리 결과: {file_name} -> {category} / {leaf_category}")
+        return file_name, category, leaf_category, category_time, leaf_time
+
+    except Exception as e:
+        print(f"[ERROR] 문제 처리 실패: {e}")
+        raise e
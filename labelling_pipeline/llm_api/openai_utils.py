@@ -1,6 +1,10 @@
 import openai
 from dotenv import load_dotenv
+import asyncio
+import json
 import os
+from async_openai_client import get_async_client
+from llm_cache import LLMCacheMissError, LLMResponseCache, make_cache_key
 
 # 환경 변수 로드
 load_dotenv(dotenv_path="../pipeline/.env", override=True)
@@ -8,29 +12,162 @@ load_dotenv(dotenv_path="../pipeline/.env", override=True)
 # OpenAI API 키 설정
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
+# 대분류 목록
+MAJOR_CATEGORIES = ["수와 연산", "변화와 관계", "도형과 측정", "자료와 가능성"]
 
-def extract_math_concepts(problem_text):
+# 프로세스 내 누적 토큰 사용량 (비용/벤치마크 집계용)
+TOKEN_USAGE = {"calls": 0, "cached_calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+# 프롬프트 템플릿 버전: 아래 build_*_prompt 문구를 바꾸면 올려서 이전 캐시 응답을 무효화
+PROMPT_TEMPLATE_VERSION = "v1"
+
+# LLM 응답 캐시 설정 (모드: off / read_write / cache_only)
+LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "read_write")
+LLM_CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "llm_cache.sqlite3"),
+)
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "200000"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+
+llm_cache = None
+
+
+def configure_llm_cache(mode=LLM_CACHE_MODE, db_path=LLM_CACHE_PATH):
     """
-    문제에서 수학적 개념을 추출합니다.
+    LLM 응답 캐시를 (다시) 설정합니다. 평가 스크립트에서 cache_only 재생 모드로 바꿀 때 사용합니다.
+    """
+    global llm_cache
+    llm_cache = None
+    if mode != "off":
+        llm_cache = LLMResponseCache(db_path, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SECONDS, mode)
+    return llm_cache
+
+
+configure_llm_cache()
+
+# API 대신 응답을 만드는 함수 (오프라인 평가용 stub). fn(prompt, model, max_tokens, temperature) -> (텍스트, usage)
+completion_backend = None
+
+
+def set_completion_backend(fn):
+    """
+    chat_completion/achat_completion이 API와 캐시 대신 fn을 호출하도록 설정합니다 (None이면 해제).
+    """
+    global completion_backend
+    completion_backend = fn
+
+
+def build_messages(prompt):
+    return [
+        {"role": "system", "content": "You are a helpful assistant."},
+        {"role": "user", "content": prompt},
+    ]
+
+
+def _record_usage(usage):
+    usage = usage or {}
+    TOKEN_USAGE["calls"] += 1
+    TOKEN_USAGE["prompt_tokens"] += usage.get("prompt_tokens", 0)
+    TOKEN_USAGE["completion_tokens"] += usage.get("completion_tokens", 0)
+
+
+def _cache_lookup(prompt, model, max_tokens, temperature):
+    """
+    캐시 키와 캐시된 응답을 반환합니다 (캐시를 쓰지 않으면 (None, None)).
+    cache_only 모드에서 캐시에 없으면 API를 호출하지 않도록 LLMCacheMissError를 발생시킵니다.
+    """
+    if llm_cache is None:
+        return None, None
+    cache_key = make_cache_key(prompt, model, temperature, max_tokens, PROMPT_TEMPLATE_VERSION)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        TOKEN_USAGE["cached_calls"] += 1
+        return cache_key, cached
+    if llm_cache.mode == "cache_only":
+        raise LLMCacheMissError("cache_only 모드: 캐시에 없는 프롬프트입니다.")
+    return cache_key, None
+
+
+def _cache_store(cache_key, model, content, usage):
+    if cache_key is not None:
+        llm_cache.put(cache_key, model, PROMPT_TEMPLATE_VERSION, content, usage)
+
+
+def chat_completion(prompt, model="gpt-4", max_tokens=100, temperature=0.5):
+    """
+    ChatCompletion을 호출하고 응답 텍스트를 반환합니다. 토큰 사용량을 TOKEN_USAGE에 누적합니다.
+    같은 프롬프트/모델/온도/템플릿 버전의 응답이 캐시에 있으면 API를 호출하지 않습니다.
+    """
+    if completion_backend is not None:
+        content, usage = completion_backend(prompt, model, max_tokens, temperature)
+        _record_usage(usage)
+        return content
+
+    cache_key, cached = _cache_lookup(prompt, model, max_tokens, temperature)
+    if cached is not None:
+        return cached
+
+    response = openai.ChatCompletion.create(
+        model=model,
+        messages=build_messages(prompt),
+        max_tokens=max_tokens,
+        temperature=temperature,
+    )
+    usage = response.get("usage")
+    _record_usage(usage)
+    content = response.choices[0].message["content"].strip()
+    _cache_store(cache_key, model, content, usage)
+    return content
+
+
+async def achat_completion(prompt, model="gpt-4", max_tokens=100, temperature=0.5):
+    """
+    chat_completion의 비동기 버전입니다.
+    공유 AsyncOpenAIClient(속도 제한, 재시도, 동시 요청 수 제한)를 사용합니다.
     """
-    prompt = (
+    if completion_backend is not None:
+        content, usage = completion_backend(prompt, model, max_tokens, temperature)
+        _record_usage(usage)
+        return content
+
+    # SQLite 캐시 조회/저장은 이벤트 루프를 막지 않도록 스레드에서 실행
+    cache_key, cached = await asyncio.to_thread(_cache_lookup, prompt, model, max_tokens, temperature)
+    if cached is not None:
+        return cached
+
+    response = await get_async_client().create_chat_completion(
+        messages=build_messages(prompt),
+        model=model,
+        max_tokens=max_tokens,
+        temperature=temperature,
+    )
+    usage = response.get("usage")
+    _record_usage(usage)
+    content = response["choices"][0]["message"]["content"].strip()
+    if cache_key is not None:
+        await asyncio.to_thread(_cache_store, cache_key, model, content, usage)
+    return content
+
+
+def build_concept_prompt(problem_text):
+    """수학적 개념 추출 프롬프트"""
+    return (
         "다음은 한국 초등학교 수학 문제입니다:\n"
         f"{problem_text}\n\n"
         "문제를 분석하여 해결하는 데 필요할 것으로 예상되는 주요 초등 수학적 개념을 추출하세요.\n"
         "길이, 들이, 넓이, 무게, 부피 등의 단위나 도형 및 선분, 직선, 규칙이나 배열, 표나 그래프가 문제에 나오는 경우 해당 개념은 반드시 추출하는 개념에 포함하세요.\n"
         "추출된 주요 개념의 명칭만 작성하세요."
     )
+
+
+def extract_math_concepts(problem_text):
+    """
+    문제에서 수학적 개념을 추출합니다.
+    """
+    prompt = build_concept_prompt(problem_text)
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant."},
-                {"role": "user", "content": prompt},
-            ],
-            max_tokens=100,
-            temperature=0.5,
-        )
-        math_concept = response.choices[0].message["content"].strip()
+        math_concept = chat_completion(prompt)
         print(f"[INFO] 추출된 수학적 개념: {math_concept}")
         return math_concept
     except Exception as e:
@@ -38,11 +175,9 @@ def extract_math_concepts(problem_text):
         return None
 
 
-def determine_major_category(math_concept):
-    """
-    수학적 개념을 분석하여 적합한 대분류를 결정합니다.
-    """
-    prompt = (
+def build_major_category_prompt(math_concept):
+    """대분류 결정 프롬프트"""
+    return (
         f"다음은 추출된 수학적 개념입니다:\n{math_concept}\n\n"
         "이 개념과 가장 유사한 대분류를 '수와 연산', '변화와 관계', '도형과 측정', '자료와 가능성' 중에서 선택하세요. "
         "단, 다음 규칙을 따라 우선적으로 선택하세요:\n"
@@ -53,17 +188,15 @@ def determine_major_category(math_concept):
         "어디에도 속하지 않는 경우 '수와 연산'으로 분류하세요."
         "대분류명만 문장 부호를 제외하고 작성하세요."
     )
+
+
+def determine_major_category(math_concept):
+    """
+    수학적 개념을 분석하여 적합한 대분류를 결정합니다.
+    """
+    prompt = build_major_category_prompt(math_concept)
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant."},
-                {"role": "user", "content": prompt},
-            ],
-            max_tokens=100,
-            temperature=0.5,
-        )
-        major_category = response.choices[0].message["content"].strip()
+        major_category = chat_completion(prompt)
         print(f"[INFO] 결정된 대분류: {major_category}")
         return major_category
     except Exception as e:
@@ -71,13 +204,9 @@ def determine_major_category(math_concept):
         return None
 
 
-def extract_leaf_category_within_major_category(
-    math_concept, major_category, json_summary
-):
-    """
-    JSON 데이터 요약을 기반으로, 특정 대분류 내에서 최하위 분류를 추출합니다.
-    """
-    prompt = (
+def build_leaf_category_prompt(math_concept, major_category, json_summary):
+    """최하위 분류 추출 프롬프트"""
+    return (
         f"다음은 추출된 수학적 개념입니다:\n{math_concept}\n\n"
         f"대분류: {major_category}\n\n"
         "다음은 학습 주제의 계층 구조입니다. 이 계층 구조에서 해당 대분류에 속하는 내용만 사용하여 최하위 분류를 추출하세요:\n"
@@ -87,19 +216,200 @@ def extract_leaf_category_within_major_category(
         "최하위 분류가 불가피하게 여러 개 필요한 경우 최대 2개까지만 콤마로 구분하여 추출하세요.\n\n"
         "최하위 분류명만 문장 부호를 제외하고 작성하세요."
     )
+
+
+def extract_leaf_category_within_major_category(
+    math_concept, major_category, json_summary
+):
+    """
+    JSON 데이터 요약을 기반으로, 특정 대분류 내에서 최하위 분류를 추출합니다.
+    """
+    prompt = build_leaf_category_prompt(math_concept, major_category, json_summary)
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant."},
-                {"role": "user", "content": prompt},
-            ],
-            max_tokens=100,
-            temperature=0.5,
+        leaf_category = chat_completion(prompt)
+        print(f"[INFO] 대분류 '{major_category}' 내 최하위 분류: {leaf_category}")
+        return leaf_category
+    except Exception as e:
+        print(f"[ERROR] 최하위 분류 추출 실패: {e}")
+        return None
+
+
+def build_leaf_retry_prompt(math_concept, major_category, candidates):
+    """로드맵에 없는 최하위 분류가 나왔을 때 후보 목록 안에서만 다시 고르게 하는 프롬프트"""
+    candidate_lines = "\n".join(f"- {name}" for name in candidates)
+    return (
+        f"다음은 추출된 수학적 개념입니다:\n{math_concept}\n\n"
+        f"대분류: {major_category}\n\n"
+        "아래 최하위 분류 목록에서 개념과 가장 유사한 것을 가능한 한 1개, 불가피한 경우 최대 2개까지 "
+        "목록의 이름 그대로 콤마로 구분하여 고르세요:\n"
+        f"{candidate_lines}\n\n"
+        "최하위 분류명만 작성하세요."
+    )
+
+
+def choose_leaf_from_candidates(math_concept, major_category, candidates):
+    """
+    후보 목록 안에서 최하위 분류를 다시 고릅니다 (짧은 프롬프트, 온도 0).
+    """
+    try:
+        return chat_completion(
+            build_leaf_retry_prompt(math_concept, major_category, candidates),
+            max_tokens=60,
+            temperature=0,
+        )
+    except Exception as e:
+        print(f"[ERROR] 최하위 분류 재질의 실패: {e}")
+        return None
+
+
+def _parse_json_object(text):
+    """응답에서 JSON 객체 부분만 잘라 파싱합니다 (```json 코드 블록 등 허용)."""
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end <= start:
+        raise ValueError(f"JSON 객체를 찾을 수 없습니다: {text}")
+    return json.loads(text[start : end + 1])
+
+
+def validate_classification(result, leaf_names_map):
+    """
+    단일 호출 분류 결과를 검증/정규화합니다.
+    대분류는 4개 중 하나여야 하고, 최하위 분류는 해당 대분류 로드맵의 이름(최대 2개)이어야 합니다.
+    유효하지 않으면 ValueError를 발생시킵니다.
+    """
+    major_category = str(result.get("major_category", "")).strip()
+    if major_category not in MAJOR_CATEGORIES:
+        raise ValueError(f"알 수 없는 대분류: {major_category}")
+
+    leaf_labels = result.get("leaf_labels", [])
+    if isinstance(leaf_labels, str):
+        leaf_labels = leaf_labels.split(",")
+    leaf_labels = [str(label).strip() for label in leaf_labels if str(label).strip()][:2]
+
+    allowed = set(leaf_names_map.get(major_category, []))
+    invalid = [label for label in leaf_labels if label not in allowed]
+    if not leaf_labels or invalid:
+        raise ValueError(f"'{major_category}'에 없는 최하위 분류: {invalid or leaf_labels}")
+
+    concepts = result.get("concepts", [])
+    if isinstance(concepts, str):
+        concepts = [c.strip() for c in concepts.split(",") if c.strip()]
+
+    return {
+        "concepts": concepts,
+        "major_category": major_category,
+        "leaf_labels": leaf_labels,
+    }
+
+
+def build_single_call_prompt(problem_text, leaf_names_map):
+    """단일 호출 분류 프롬프트"""
+    leaf_lines = "\n".join(
+        f"[{category}]\n" + "\n".join(f"- {name}" for name in leaf_names_map.get(category, []))
+        for category in MAJOR_CATEGORIES
+    )
+    return (
+        "다음은 한국 초등학교 수학 문제입니다:\n"
+        f"{problem_text}\n\n"
+        "1. 문제를 해결하는 데 필요한 주요 초등 수학적 개념을 추출하세요. "
+        "길이, 들이, 넓이, 무게, 부피 등의 단위나 도형 및 선분, 직선, 규칙이나 배열, 표나 그래프가 문제에 나오는 경우 해당 개념은 반드시 포함하세요.\n"
+        "2. 추출한 개념과 가장 유사한 대분류를 '수와 연산', '변화와 관계', '도형과 측정', '자료와 가능성' 중에서 선택하세요. "
+        "단, 다음 규칙을 따라 우선적으로 선택하세요:\n"
+        "- 그래프나 표와 관련된 문제는 '자료와 가능성'\n"
+        "- 길이, 넓이, 들이, 무게 등의 단위, 도형, 각도, 선분 및 직선은 '도형과 측정'\n"
+        "- 비례, 대응, 비교, 배열, 규칙은 '변화와 관계'\n"
+        "- 사칙연산(덧셈, 뺄셈, 곱셈, 나눗셈)은 '수와 연산'\n"
+        "어디에도 속하지 않는 경우 '수와 연산'으로 분류하세요.\n"
+        "3. 선택한 대분류의 아래 최하위 분류 목록에서 가장 유사한 것을 가능한 한 1개, 불가피한 경우 최대 2개까지 목록의 이름 그대로 고르세요.\n\n"
+        f"{leaf_lines}\n\n"
+        '다음 JSON 형식으로만 답하세요: {"concepts": ["개념", ...], "major_category": "대분류", "leaf_labels": ["최하위 분류", ...]}'
+    )
+
+
+def classify_problem_single_call(problem_text, leaf_names_map):
+    """
+    수학적 개념, 대분류, 최하위 분류를 한 번의 호출로 추출합니다.
+    최하위 분류는 leaf_names_map({대분류: 최하위 분류 이름 목록})에 있는 이름으로만 선택하게 하고,
+    응답 JSON을 검증하여 dict를 반환합니다. 실패 시 None을 반환합니다.
+    """
+    prompt = build_single_call_prompt(problem_text, leaf_names_map)
+    try:
+        content = chat_completion(prompt, max_tokens=200, temperature=0.5)
+        result = validate_classification(_parse_json_object(content), leaf_names_map)
+        print(
+            f"[INFO] 단일 호출 분류 결과: {result['major_category']} / {', '.join(result['leaf_labels'])}"
+        )
+        return result
+    except Exception as e:
+        print(f"[ERROR] 단일 호출 분류 실패: {e}")
+        return None
+
+
+# ---------------------------------------------------------------------------
+# 비동기 버전: FastAPI 핸들러에서 이벤트 루프를 막지 않고 여러 문제를 동시에 처리
+# ---------------------------------------------------------------------------
+async def aextract_math_concepts(problem_text):
+    """extract_math_concepts의 비동기 버전"""
+    try:
+        math_concept = await achat_completion(build_concept_prompt(problem_text))
+        print(f"[INFO] 추출된 수학적 개념: {math_concept}")
+        return math_concept
+    except Exception as e:
+        print(f"[ERROR] 수학적 개념 추출 실패: {e}")
+        return None
+
+
+async def adetermine_major_category(math_concept):
+    """determine_major_category의 비동기 버전"""
+    try:
+        major_category = await achat_completion(build_major_category_prompt(math_concept))
+        print(f"[INFO] 결정된 대분류: {major_category}")
+        return major_category
+    except Exception as e:
+        print(f"[ERROR] 대분류 결정 실패: {e}")
+        return None
+
+
+async def aextract_leaf_category_within_major_category(
+    math_concept, major_category, json_summary
+):
+    """extract_leaf_category_within_major_category의 비동기 버전"""
+    try:
+        leaf_category = await achat_completion(
+            build_leaf_category_prompt(math_concept, major_category, json_summary)
         )
-        leaf_category = response.choices[0].message["content"].strip()
         print(f"[INFO] 대분류 '{major_category}' 내 최하위 분류: {leaf_category}")
         return leaf_category
     except Exception as e:
         print(f"[ERROR] 최하위 분류 추출 실패: {e}")
         return None
+
+
+async def aclassify_problem_single_call(problem_text, leaf_names_map):
+    """classify_problem_single_call의 비동기 버전"""
+    try:
+        content = await achat_completion(
+            build_single_call_prompt(problem_text, leaf_names_map),
+            max_tokens=200,
+            temperature=0.5,
+        )
+        result = validate_classification(_parse_json_object(content), leaf_names_map)
+        print(
+            f"[INFO] 단일 호출 분류 결과: {result['major_category']} / {', '.join(result['leaf_labels'])}"
+        )
+        return result
+    except Exception as e:
+        print(f"[ERROR] 단일 호출 분류 실패: {e}")
+        return None
+
+
+async def achoose_leaf_from_candidates(math_concept, major_category, candidates):
+    """choose_leaf_from_candidates의 비동기 버전"""
+    try:
+        return await achat_completion(
+            build_leaf_retry_prompt(math_concept, major_category, candidates),
+            max_tokens=60,
+            temperature=0,
+        )
+    except Exception as e:
+        print(f"[ERROR] 최하위 분류 재질의 실패: {e}")
+        return None
@@ -3,34 +3,113 @@ from openai_utils import (
     extract_math_concepts,
     determine_major_category,
     extract_leaf_category_within_major_category,
+    classify_problem_single_call,
+    aextract_math_concepts,
+    adetermine_major_category,
+    aextract_leaf_category_within_major_category,
+    aclassify_problem_single_call,
+    choose_leaf_from_candidates,
+    achoose_leaf_from_candidates,
 )
+from leaf_retriever import format_leaf_candidates
+from leaf_resolver import RESOLUTION_STATS, canonical_leaf_labels
 
+# 재질의 시 보여줄 후보 수
+LEAF_RETRY_CANDIDATES = 10
 
-def process_math_problem(problem_text, category_map, figure_text=None, model="gpt-4"):
-    """
-    문제를 분석하여 대분류 및 최하위 분류를 추출합니다.
-    figure_text가 주어지면 해당 텍스트도 함께 고려하여 분석합니다.
 
-    Parameters:
-    - problem_text (str): 수학 문제 텍스트
-    - category_map (dict): 대분류와 로컬 JSON 데이터 매핑
-    - figure_text (str, optional): 문제와 관련된 그림 설명 텍스트
-    - model (str): GPT 모델 이름 (기본값: "gpt-4")
+def _combine_text(problem_text, figure_text):
+    """문제 텍스트와 figure_text를 합친 분석용 텍스트"""
+    return problem_text + "\n" + figure_text if figure_text else problem_text
 
-    Returns:
-    - tuple: (대분류, 최하위 분류, 대분류 추출 시간, 최하위 분류 추출 시간)
+
+def _single_call_tuple(result, start_time):
+    """단일 호출 결과를 반환 튜플로 바꾼다. 검증 실패(None)면 None."""
+    if not result:
+        # 검증 실패 시 기존 3회 호출 경로로 대체
+        print("[WARN] 단일 호출 분류 실패, 3회 호출 경로로 대체합니다.")
+        return None
+    return result["major_category"], ", ".join(result["leaf_labels"]), time.time() - start_time, 0
+
+
+def _canonicalize_leaf(resolver, leaf_output):
     """
-    # Step 1: 문제 분석을 통해 주요 개념 및 대분류 추출
-    start_time = time.time()
+    최하위 분류 출력을 로드맵 이름으로 바꾼다.
+    Returns: (정규화한 출력 또는 None, 재질의 후보 목록 또는 None)
+    """
+    if not leaf_output or resolver is None:
+        return leaf_output, None
+    canonical = canonical_leaf_labels(resolver, leaf_output)
+    if canonical is not None:
+        return canonical, None
+    RESOLUTION_STATS["retried"] += 1
+    return None, resolver.nearest(leaf_output, LEAF_RETRY_CANDIDATES)
+
+
+def _resolve_retry(resolver, leaf_output, retry_output):
+    """재질의 결과를 로드맵 이름으로 바꾼다. 실패하면 원래 출력을 그대로 사용한다."""
+    canonical = canonical_leaf_labels(resolver, retry_output) if retry_output else None
+    if canonical is None:
+        RESOLUTION_STATS["unresolved"] += 1
+        print(f"[WARN] 로드맵에서 최하위 분류를 찾지 못했습니다: {leaf_output}")
+        return leaf_output
+    RESOLUTION_STATS["retry_resolved"] += 1
+    return canonical
+
+
+def _log_leaf_result(major_category, leaf_category_data):
+    if leaf_category_data:
+        print(f"[INFO] 최하위 분류: {leaf_category_data}")
+    else:
+        print(f"[ERROR] '{major_category}' 대분류 내 최하위 분류 데이터를 찾을 수 없습니다.")
+
+
+def _log_missing_roadmap(major_category):
+    print(f"[ERROR] '{major_category}' 대분류에 해당하는 로드맵 데이터를 찾을 수 없습니다.")
 
+
+def _log_retriever_failure(error, fallback="전체 로드맵"):
+    print(f"[WARN] 최하위 분류 후보 검색 실패, {fallback}을 사용합니다: {error}")
+
+
+def _classification_steps(
+    problem_text,
+    category_map,
+    figure_text,
+    mode,
+    leaf_names_map,
+    use_retriever,
+    top_k,
+    category_prefilter,
+    leaf_resolvers,
+):
+    """
+    분류 결정 로직 (동기/비동기 공통). LLM·임베딩 호출이 필요할 때마다 (호출 이름, 인자)를 yield하고,
+    호출한 쪽이 결과를 send하거나 예외를 throw한다. 반환값은 process_math_problem과 같다.
+    호출 이름: shortlist_map, single_call, concepts, major, shortlist, leaf, choose
+    """
     # 문제 텍스트와 figure_text를 합쳐서 분석
-    combined_text = problem_text
-    if figure_text:
-        combined_text += "\n" + figure_text
+    combined_text = _combine_text(problem_text, figure_text)
+
+    if mode == "single_call" and leaf_names_map:
+        start_time = time.time()
+        candidates_map = leaf_names_map
+        if use_retriever:
+            try:
+                candidates_map = yield "shortlist_map", (combined_text, top_k)
+            except Exception as e:
+                _log_retriever_failure(e, "전체 목록")
 
-    # 수학적 개념 추출
-    math_concept = extract_math_concepts(combined_text)
-    major_category = determine_major_category(math_concept)
+        result = _single_call_tuple((yield "single_call", (combined_text, candidates_map)), start_time)
+        if result:
+            return result
+
+    # Step 1: 문제 분석을 통해 주요 개념 및 대분류 추출
+    start_time = time.time()
+    major_category = category_prefilter.classify(combined_text) if category_prefilter else None
+    math_concept = yield "concepts", (combined_text,)
+    if major_category is None:
+        major_category = yield "major", (math_concept,)
     category_time = time.time() - start_time
     print(f"[INFO] 추출된 대분류: {major_category}")
 
@@ -43,26 +122,135 @@ def process_math_problem(problem_text, category_map, figure_text=None, model="gp
             # 로드맵 데이터에서 대분류에 해당하는 데이터 가져오기
             start_leaf_time = time.time()
             json_data = category_map.get(major_category)
+            if json_data and use_retriever:
+                try:
+                    json_data = format_leaf_candidates((yield "shortlist", (major_category, math_concept, top_k)))
+                except Exception as e:
+                    _log_retriever_failure(e)
 
             if json_data:
-                # 최하위 분류 추출
-                leaf_category_data = extract_leaf_category_within_major_category(
-                    math_concept, major_category, json_data
-                )
+                # 최하위 분류 추출 후 로드맵 이름으로 정규화 (맞지 않으면 후보 목록으로 한 번 재질의)
+                leaf_category_data = yield "leaf", (math_concept, major_category, json_data)
+                resolver = (leaf_resolvers or {}).get(major_category)
+                canonical, candidates = _canonicalize_leaf(resolver, leaf_category_data)
+                if candidates is not None:
+                    retry = yield "choose", (math_concept, major_category, candidates)
+                    canonical = _resolve_retry(resolver, leaf_category_data, retry)
+                leaf_category_data = canonical
                 leaf_time = time.time() - start_leaf_time
-
-                if leaf_category_data:
-                    print(f"[INFO] 최하위 분류: {leaf_category_data}")
-                else:
-                    print(
-                        f"[ERROR] '{major_category}' 대분류 내 최하위 분류 데이터를 찾을 수 없습니다."
-                    )
+                _log_leaf_result(major_category, leaf_category_data)
             else:
-                print(
-                    f"[ERROR] '{major_category}' 대분류에 해당하는 로드맵 데이터를 찾을 수 없습니다."
-                )
+                _log_missing_roadmap(major_category)
         except Exception as e:
             print(f"[ERROR] 최하위 분류 추출 중 오류 발생: {e}")
 
     # Step 3: 결과 반환
     return major_category, leaf_category_data, category_time, leaf_time
+
+
+def process_math_problem(
+    problem_text,
+    category_map,
+    figure_text=None,
+    model="gpt-4",
+    mode="three_call",
+    leaf_names_map=None,
+    leaf_retriever=None,
+    top_k=10,
+    category_prefilter=None,
+    leaf_resolvers=None,
+):
+    """
+    문제를 분석하여 대분류 및 최하위 분류를 추출합니다.
+    figure_text가 주어지면 해당 텍스트도 함께 고려하여 분석합니다.
+
+    Parameters:
+    - problem_text (str): 수학 문제 텍스트
+    - category_map (dict): 대분류와 로드맵 계층 구조 요약 텍스트 매핑
+    - figure_text (str, optional): 문제와 관련된 그림 설명 텍스트
+    - model (str): GPT 모델 이름 (기본값: "gpt-4")
+    - mode (str): "three_call"(개념 -> 대분류 -> 최하위 분류 3회 호출) 또는
+      "single_call"(한 번의 호출로 JSON 결과를 받아 로드맵 이름으로 검증)
+    - leaf_names_map (dict, optional): 대분류별 최하위 분류 이름 목록 (single_call에 필요)
+    - leaf_retriever (LeafRetriever, optional): 주어지면 임베딩 유사도 상위 top_k개 최하위 분류만
+      프롬프트에 넣습니다 (실패 시 전체 로드맵 사용)
+    - top_k (int): 대분류별 후보 최하위 분류 수
+    - category_prefilter (CategoryPrefilter, optional): 규칙으로 확실한 문제는 대분류 LLM 호출을 건너뜁니다
+    - leaf_resolvers (dict, optional): {대분류: LeafResolver}. 주어지면 최하위 분류 출력을 로드맵 이름으로
+      정규화하고, 하나도 맞지 않으면 가까운 후보 목록 안에서만 한 번 다시 고르게 합니다
+
+    Returns:
+    - tuple: (대분류, 최하위 분류, 대분류 추출 시간, 최하위 분류 추출 시간)
+      single_call 모드에서는 호출 시간을 대분류 추출 시간에 기록하고 최하위 분류 시간은 0입니다.
+    """
+    calls = {
+        "single_call": classify_problem_single_call,
+        "concepts": extract_math_concepts,
+        "major": determine_major_category,
+        "leaf": extract_leaf_category_within_major_category,
+        "choose": choose_leaf_from_candidates,
+    }
+    if leaf_retriever is not None:
+        calls["shortlist_map"] = leaf_retriever.shortlist_map
+        calls["shortlist"] = leaf_retriever.shortlist
+
+    steps = _classification_steps(
+        problem_text, category_map, figure_text, mode, leaf_names_map,
+        leaf_retriever is not None, top_k, category_prefilter, leaf_resolvers,
+    )
+    try:
+        name, args = next(steps)
+        while True:
+            try:
+                value = calls[name](*args)
+            except Exception as e:
+                name, args = steps.throw(e)
+            else:
+                name, args = steps.send(value)
+    except StopIteration as done:
+        return done.value
+
+
+async def aprocess_math_problem(
+    problem_text,
+    category_map,
+    figure_text=None,
+    model="gpt-4",
+    mode="three_call",
+    leaf_names_map=None,
+    leaf_retriever=None,
+    top_k=10,
+    category_prefilter=None,
+    leaf_resolvers=None,
+):
+    """
+    process_math_problem의 비동기 버전입니다.
+    OpenAI 호출을 공유 비동기 클라이언트로 보내므로 한 프로세스에서 여러 문제를 동시에 처리할 수 있습니다.
+    인자, 반환값과 오류 처리는 process_math_problem과 같습니다 (결정 로직은 _classification_steps 공유).
+    """
+    calls = {
+        "single_call": aclassify_problem_single_call,
+        "concepts": aextract_math_concepts,
+        "major": adetermine_major_category,
+        "leaf": aextract_leaf_category_within_major_category,
+        "choose": achoose_leaf_from_candidates,
+    }
+    if leaf_retriever is not None:
+        calls["shortlist_map"] = leaf_retriever.ashortlist_map
+        calls["shortlist"] = leaf_retriever.ashortlist
+
+    steps = _classification_steps(
+        problem_text, category_map, figure_text, mode, leaf_names_map,
+        leaf_retriever is not None, top_k, category_prefilter, leaf_resolvers,
+    )
+    try:
+        name, args = next(steps)
+        while True:
+            try:
+                value = await calls[name](*args)
+            except Exception as e:
+                name, args = steps.throw(e)
+            else:
+                name, args = steps.send(value)
+    except StopIteration as done:
+        return done.value
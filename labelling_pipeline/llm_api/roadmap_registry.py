@@ -0,0 +1,104 @@
+import json
+import os
+import threading
+import time
+from json_utils import summarize_json_hierarchy, collect_leaf_names, count_tokens
+from leaf_resolver import LeafResolver
+
+
+class RoadmapEntry:
+    """파싱된 로드맵 하나와 프롬프트용으로 미리 계산한 값들"""
+
+    def __init__(self, category, file_path, data, mtime):
+        self.category = category
+        self.file_path = file_path
+        self.data = data
+        self.mtime = mtime
+        # 프롬프트에 들어가는 계층 구조 요약 텍스트
+        self.summary = summarize_json_hierarchy(data)
+        # 최하위 분류 이름 목록과 이름 -> 순번 인덱스
+        self.leaf_names = collect_leaf_names(data)
+        self.leaf_index = {name: idx for idx, name in enumerate(self.leaf_names)}
+        # LLM 출력 -> 최하위 분류 매핑용 색인 (정규화 해시 + 자모 편집 거리)
+        self.leaf_resolver = LeafResolver(self.leaf_names)
+        # 요약 텍스트의 토큰 수
+        self.token_count = count_tokens(self.summary)
+
+
+class RoadmapRegistry:
+    """
+    대분류별 로드맵 JSON을 프로세스 내에서 한 번만 파싱해 보관한다.
+    파일 수정 시각(mtime)이 바뀌면 다음 조회 때 다시 읽는다.
+    mtime 확인은 check_interval초에 한 번만 수행한다.
+    """
+
+    def __init__(self, roadmap_files, check_interval=5.0):
+        self.roadmap_files = dict(roadmap_files)
+        self.check_interval = check_interval
+        self._entries = {}
+        self._last_checked = {}
+        self._lock = threading.Lock()
+
+    def _load(self, category, file_path, mtime):
+        with open(file_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        entry = RoadmapEntry(category, file_path, data, mtime)
+        print(
+            f"[INFO] 로드맵 로드: {category} (최하위 분류 {len(entry.leaf_names)}개, "
+            f"요약 {entry.token_count} 토큰)"
+        )
+        return entry
+
+    def get(self, category):
+        """대분류의 RoadmapEntry를 반환한다. 파일이 바뀌었으면 다시 파싱한다."""
+        file_path = self.roadmap_files.get(category)
+        if not file_path:
+            raise ValueError(f"로드맵 파일 경로를 찾을 수 없습니다: {category}")
+
+        with self._lock:
+            entry = self._entries.get(category)
+            now = time.monotonic()
+            if entry and now - self._last_checked.get(category, 0) < self.check_interval:
+                return entry
+
+            mtime = os.path.getmtime(file_path)
+            self._last_checked[category] = now
+            if entry is None or entry.mtime != mtime:
+                if entry is not None:
+                    print(f"[INFO] 로드맵 파일 변경 감지, 다시 로드합니다: {file_path}")
+                entry = self._load(category, file_path, mtime)
+                self._entries[category] = entry
+            return entry
+
+    def categories(self):
+        return list(self.roadmap_files)
+
+    def data_map(self):
+        """{대분류: 원본 JSON 데이터}"""
+        return {category: self.get(category).data for category in self.roadmap_files}
+
+    def summary_map(self):
+        """{대분류: 계층 구조 요약 텍스트} (최하위 분류 프롬프트용)"""
+        return {category: self.get(category).summary for category in self.roadmap_files}
+
+    def leaf_names_map(self):
+        """{대분류: 최하위 분류 이름 목록}"""
+        return {category: self.get(category).leaf_names for category in self.roadmap_files}
+
+    def leaf_resolver_map(self):
+        """{대분류: LeafResolver}"""
+        return {category: self.get(category).leaf_resolver for category in self.roadmap_files}
+
+    def leaf_names(self, category):
+        return self.get(category).leaf_names
+
+    def stats(self):
+        """대분류별 최하위 분류 수와 요약 토큰 수"""
+        stats = {}
+        for category in self.roadmap_files:
+            entry = self.get(category)
+            stats[category] = {
+                "leaf_count": len(entry.leaf_names),
+                "token_count": entry.token_count,
+            }
+        return stats
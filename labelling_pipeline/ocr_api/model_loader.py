@@ -0,0 +1,243 @@
+"""
+OCR 모델 로딩 계층.
+
+- 워커(프로세스)당 한 번만 모델을 로드한다.
+- OCR_QUANTIZE=true이면 인코더/디코더의 Linear 레이어를 CPU용 int8로 동적 양자화한다.
+- 양자화된 모델은 모델 디렉토리 해시를 키로 디스크에 캐시하여 다음 기동 시 재사용한다.
+- OCR_NUM_THREADS(미지정 시 CPU 수 / 워커 수)로 torch 스레드 수를 조정한다.
+
+    python model_loader.py --model-path ./models/final_model_1 --images-dir ./test_img
+
+위처럼 실행하면 fp32 / int8 / int8(캐시) 모드별 기동 시간과 상주 메모리,
+test_img 크롭에 대한 처리 속도(crops/sec)와 fp32 대비 문자 일치도를 출력한다.
+"""
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+import torch
+from transformers import AutoTokenizer, AutoImageProcessor
+from ocr_model import (
+    ensure_preprocessor_config_if_missing,
+    load_ocr_model,
+    perform_ocr_on_cropped_images,
+)
+
+try:
+    import resource  # Windows에는 없음
+except ImportError:
+    resource = None
+
+# 양자화 여부 및 캐시/스레드 설정
+OCR_QUANTIZE = os.getenv("OCR_QUANTIZE", "false").lower() == "true"
+OCR_MODEL_CACHE_DIR = os.getenv(
+    "OCR_MODEL_CACHE_DIR", os.path.join(os.path.dirname(__file__), "model_cache")
+)
+OCR_NUM_THREADS = os.getenv("OCR_NUM_THREADS")
+
+# 프로세스당 한 번만 로드한 모델 (model_path, quantize) -> (model, tokenizer, processor)
+_loaded_components = {}
+
+
+def compute_model_dir_hash(model_dir: str) -> str:
+    """
+    모델 디렉토리의 파일 목록, 크기, 수정 시각으로 해시를 계산한다.
+    가중치 파일 전체를 읽지 않으므로 기동 시간에 거의 영향을 주지 않는다.
+    호출 전에 ensure_preprocessor_config_if_missing을 먼저 실행해야 자동 생성 파일 때문에 해시가 바뀌지 않는다.
+    """
+    digest = hashlib.sha256()
+    for root, _, files in sorted(os.walk(model_dir)):
+        for fname in sorted(files):
+            path = os.path.join(root, fname)
+            stat = os.stat(path)
+            rel_path = os.path.relpath(path, model_dir).replace(os.sep, "/")
+            digest.update(f"{rel_path}:{stat.st_size}:{int(stat.st_mtime)}\n".encode())
+    return digest.hexdigest()[:16]
+
+
+def get_resident_memory_mb() -> float:
+    """현재 프로세스의 상주 메모리(MB)를 반환한다. 확인할 수 없으면 0."""
+    try:
+        with open("/proc/self/status", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is not None:
+        # /proc이 없는 환경에서는 최대 상주 메모리로 대체 (macOS는 byte 단위)
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+    return 0.0
+
+
+def configure_torch_threads(num_threads=None) -> int:
+    """
+    워커당 torch 스레드 수를 설정한다.
+    지정하지 않으면 CPU 수를 uvicorn 워커 수(WEB_CONCURRENCY)로 나눈 값을 사용한다.
+    """
+    if num_threads is None:
+        num_threads = OCR_NUM_THREADS
+    if num_threads:
+        num_threads = int(num_threads)
+    else:
+        workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+        num_threads = max(1, (os.cpu_count() or 1) // max(1, workers))
+    torch.set_num_threads(num_threads)
+    print(f"[INFO] torch threads per worker: {num_threads}")
+    return num_threads
+
+
+def quantize_model(model):
+    """인코더/디코더의 Linear 레이어를 int8로 동적 양자화한다 (CPU 전용)."""
+    return torch.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8
+    )
+
+
+def _load_quantized_model(model_path: str, cache_dir: str):
+    """캐시된 int8 모델이 있으면 로드하고, 없으면 양자화 후 캐시에 저장한다."""
+    # 기본 preprocessor_config.json을 만든 뒤에 해시를 계산해야 첫 재시작에서 캐시가 어긋나지 않는다
+    if os.path.exists(model_path):
+        ensure_preprocessor_config_if_missing(model_path)
+    cache_path = os.path.join(
+        cache_dir, f"ocr_int8_{compute_model_dir_hash(model_path)}.pt"
+    )
+
+    if os.path.exists(cache_path):
+        try:
+            print(f"[INFO] Loading quantized OCR model from cache: {cache_path}")
+            model = torch.load(cache_path, map_location="cpu")
+            model.eval()
+            tokenizer = AutoTokenizer.from_pretrained(model_path)
+            image_processor = AutoImageProcessor.from_pretrained(model_path)
+            return model, tokenizer, image_processor
+        except Exception as e:
+            print(f"[WARN] Failed to load cached quantized model, rebuilding: {e}")
+
+    model, tokenizer, image_processor = load_ocr_model(model_path)
+    if not model:
+        return None, None, None
+
+    model = quantize_model(model)
+    model.eval()
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = cache_path + ".tmp"
+        torch.save(model, tmp_path)
+        os.replace(tmp_path, cache_path)  # 여러 워커가 동시에 저장해도 깨진 파일이 남지 않도록
+        print(f"[INFO] Saved quantized OCR model to cache: {cache_path}")
+    except Exception as e:
+        print(f"[WARN] Failed to save quantized model cache: {e}")
+
+    return model, tokenizer, image_processor
+
+
+def get_ocr_components(model_path: str, quantize=None, cache_dir=None, num_threads=None):
+    """
+    (model, tokenizer, image_processor)를 반환한다. 같은 프로세스에서는 한 번만 로드한다.
+    로드에 실패하면 (None, None, None)을 반환한다.
+    """
+    quantize = OCR_QUANTIZE if quantize is None else quantize
+    key = (model_path, quantize)
+    if key in _loaded_components:
+        return _loaded_components[key]
+
+    configure_torch_threads(num_threads)
+    start_time = time.perf_counter()
+
+    if quantize:
+        components = _load_quantized_model(model_path, cache_dir or OCR_MODEL_CACHE_DIR)
+    else:
+        components = load_ocr_model(model_path)
+
+    if components[0] is not None:
+        _loaded_components[key] = components
+        print(
+            f"[INFO] OCR model ready ({'int8' if quantize else 'fp32'}): "
+            f"{time.perf_counter() - start_time:.2f}s, RSS {get_resident_memory_mb():.0f}MB"
+        )
+    return components
+
+
+def _measure_mode(model_path: str, quantize: bool, cache_dir: str, images_dir=None) -> dict:
+    """
+    현재 프로세스에서 한 가지 모드로 모델을 로드하고 기동 시간/메모리를 측정한다.
+    images_dir가 주어지면 그 아래 크롭 이미지를 OCR하여 처리 속도와 텍스트도 기록한다.
+    """
+    start_time = time.perf_counter()
+    model, tokenizer, image_processor = get_ocr_components(
+        model_path, quantize=quantize, cache_dir=cache_dir
+    )
+    result = {
+        "loaded": model is not None,
+        "cold_start_sec": round(time.perf_counter() - start_time, 2),
+        "rss_mb": round(get_resident_memory_mb(), 1),
+    }
+    if model is not None and images_dir:
+        from ocr_benchmark import collect_folders
+
+        image_paths = [path for paths in collect_folders(images_dir).values() for path in paths]
+        start_time = time.perf_counter()
+        texts = perform_ocr_on_cropped_images(image_paths, model, tokenizer, image_processor)
+        elapsed = time.perf_counter() - start_time
+        result["crops_per_sec"] = round(len(image_paths) / elapsed, 2) if elapsed > 0 else 0.0
+        result["texts"] = texts
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR 모델 로딩 모드별 기동 시간/메모리 측정")
+    parser.add_argument("--model-path", default=os.getenv("OCR_MODEL_PATH", "./models/final_model_1"))
+    parser.add_argument("--cache-dir", default=OCR_MODEL_CACHE_DIR)
+    parser.add_argument("--images-dir", help="지정하면 크롭 OCR 속도와 fp32 대비 문자 일치도도 측정")
+    parser.add_argument("--mode", choices=["fp32", "int8"], help="(내부용) 단일 모드 측정")
+    args = parser.parse_args()
+
+    if args.mode:
+        result = _measure_mode(args.model_path, args.mode == "int8", args.cache_dir, args.images_dir)
+        print(json.dumps(result, ensure_ascii=False))
+        return
+
+    extra_args = ["--images-dir", args.images_dir] if args.images_dir else []
+    reference_texts = None
+
+    # 모드마다 새 프로세스에서 측정해야 메모리가 섞이지 않는다.
+    # int8은 두 번 실행하여 첫 번째(양자화+캐시 저장)와 두 번째(캐시 로드)를 비교한다.
+    for label, mode in (("fp32", "fp32"), ("int8 (build cache)", "int8"), ("int8 (cached)", "int8")):
+        output = subprocess.run(
+            [sys.executable, __file__, "--model-path", args.model_path,
+             "--cache-dir", args.cache_dir, "--mode", mode, *extra_args],
+            capture_output=True,
+            text=True,
+        )
+        lines = output.stdout.strip().splitlines()
+        if output.returncode != 0 or not lines:
+            print(f"[ERROR] {label}: {output.stderr.strip()}")
+            continue
+        result = json.loads(lines[-1])
+        print(
+            f"[BENCH] {label}: cold start {result['cold_start_sec']}s, "
+            f"RSS {result['rss_mb']}MB, loaded={result['loaded']}"
+        )
+        if "texts" not in result:
+            continue
+        if reference_texts is None:
+            reference_texts = result["texts"]  # fp32 결과를 기준으로 사용
+            print(f"[BENCH] {label}: {result['crops_per_sec']} crops/sec")
+            continue
+        from ocr_benchmark import char_agreement
+
+        similarity, exact = char_agreement(reference_texts, result["texts"])
+        print(
+            f"[BENCH] {label}: {result['crops_per_sec']} crops/sec, "
+            f"char similarity vs fp32 {similarity:.4f}, exact match {exact:.2%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,22 @@
+import io
 import os
 import shutil
 import json
-from fastapi import FastAPI, UploadFile, File
-from fastapi.responses import JSONResponse
-from typing import List
-from ocr_model import load_ocr_model, perform_ocr_on_cropped_images
+import threading
+import uuid
+from fastapi import FastAPI, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import List, Optional
+from PIL import Image
+from ocr_model import (
+    crop_boxes_in_memory,
+    perform_ocr_on_cropped_images,
+    perform_ocr_with_buckets,
+)
+from model_loader import OCR_QUANTIZE, compute_model_dir_hash, get_ocr_components
+from ocr_cache import OCRResultCache
+from ocr_executor import OCRExecutor, OCRQueueFullError
 
 # from yolo_api.src.config import CROPPED_IMAGES_DIR  # 크롭된 이미지 폴더 경로
 
@@ -17,8 +29,8 @@ LOCAL_MODEL_PATH = "C:/Users/boar2/Desktop/final_project/github/labelling_pipeli
 RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
 os.makedirs(RESULTS_DIR, exist_ok=True)
 
-# 1) 로컬 디렉터리에서 OCR 모델 로드
-ocr_model, ocr_tokenizer, ocr_processor = load_ocr_model(LOCAL_MODEL_PATH)
+# 1) 로컬 디렉터리에서 OCR 모델 로드 (워커당 1회, OCR_QUANTIZE=true면 int8 캐시 사용)
+ocr_model, ocr_tokenizer, ocr_processor = get_ocr_components(LOCAL_MODEL_PATH)
 if not ocr_model or not ocr_tokenizer or not ocr_processor:
     raise RuntimeError(
         f"[ERROR] OCR 모델 로드에 실패했습니다. 경로를 확인하세요: {LOCAL_MODEL_PATH}"
@@ -26,83 +38,306 @@ if not ocr_model or not ocr_tokenizer or not ocr_processor:
 
 CROPPED_IMAGES_DIR = "C:/Users/boar2/Desktop/final_project/github/labelling_pipeline/ocr_api/test_img"
 
+# 한 번의 generate 호출에 묶어 처리할 크롭 이미지 수
+OCR_BATCH_SIZE = int(os.getenv("OCR_BATCH_SIZE", "8"))
 
-@app.post("/extract_text/")
-async def extract_text_from_folders():
+# 이미지 디코딩/전처리 스레드 수 (0이면 추론 스레드에서 순차 처리)
+OCR_PREPROCESS_WORKERS = int(os.getenv("OCR_PREPROCESS_WORKERS", "2"))
+
+# 전처리 완료 후 추론을 기다리는 배치 수 상한 (메모리 사용량 제한)
+OCR_PREFETCH_BATCHES = int(os.getenv("OCR_PREFETCH_BATCHES", "2"))
+
+# 크롭을 비율/넓이로 버킷팅하여 버킷별 generate 길이를 쓸지 여부
+OCR_BUCKETING = os.getenv("OCR_BUCKETING", "false").lower() == "true"
+
+# 동시에 실행할 OCR 작업 수와 대기열 길이 (대기열이 차면 503 반환)
+OCR_MAX_CONCURRENCY = int(os.getenv("OCR_MAX_CONCURRENCY", "1"))
+OCR_MAX_QUEUE = int(os.getenv("OCR_MAX_QUEUE", "8"))
+
+# OCR 결과 캐시 (이미지 내용 해시 + 모델 버전 키, 모델 디렉토리가 바뀌면 자동 무효화)
+OCR_CACHE_ENABLED = os.getenv("OCR_CACHE_ENABLED", "true").lower() == "true"
+OCR_CACHE_PATH = os.getenv("OCR_CACHE_PATH", os.path.join(RESULTS_DIR, "ocr_cache.sqlite3"))
+OCR_CACHE_MAX_ENTRIES = int(os.getenv("OCR_CACHE_MAX_ENTRIES", "100000"))
+
+ocr_cache = None
+if OCR_CACHE_ENABLED:
+    model_version = compute_model_dir_hash(LOCAL_MODEL_PATH) + ("-int8" if OCR_QUANTIZE else "")
+    ocr_cache = OCRResultCache(OCR_CACHE_PATH, model_version, OCR_CACHE_MAX_ENTRIES)
+
+# 이벤트 루프를 막지 않도록 OCR은 전용 스레드 풀에서 실행
+ocr_executor = OCRExecutor(max_concurrency=OCR_MAX_CONCURRENCY, max_queue=OCR_MAX_QUEUE)
+
+# 동시에 실행되는 요청들이 같은 결과 파일을 갱신하므로 읽기-병합-쓰기를 직렬화한다
+results_file_lock = threading.Lock()
+
+
+def run_ocr(image_paths: List, boxes: Optional[List] = None) -> List[str]:
     """
-    여러 자식 폴더를 포함한 크롭된 이미지를 OCR 처리하고 결과를 반환
+    설정에 따라 기본 배치 경로 또는 버킷팅 경로로 OCR을 수행한다.
+    image_paths에는 파일 경로 또는 메모리의 PIL 이미지를 넣을 수 있다.
     """
-    try:
-        # 자식 폴더 확인
-        if not os.path.exists(CROPPED_IMAGES_DIR):
-            return JSONResponse(
-                content={
-                    "error": f"Cropped images directory not found: {CROPPED_IMAGES_DIR}"
-                },
-                status_code=400,
-            )
+    extra = {"boxes": boxes} if OCR_BUCKETING else {}
+    ocr_fn = perform_ocr_with_buckets if OCR_BUCKETING else perform_ocr_on_cropped_images
+    return ocr_fn(
+        image_paths=image_paths,
+        model=ocr_model,
+        tokenizer=ocr_tokenizer,
+        image_processor=ocr_processor,
+        image_size=384,
+        batch_size=OCR_BATCH_SIZE,
+        num_workers=OCR_PREPROCESS_WORKERS,
+        prefetch_batches=OCR_PREFETCH_BATCHES,
+        cache=ocr_cache,
+        **extra,
+    )
 
-        # 자식 폴더 리스트
-        subfolders = [
-            os.path.join(CROPPED_IMAGES_DIR, folder)
-            for folder in os.listdir(CROPPED_IMAGES_DIR)
-            if os.path.isdir(os.path.join(CROPPED_IMAGES_DIR, folder))
-        ]
-        if not subfolders:
-            return JSONResponse(
-                content={
-                    "error": "No subfolders found in the cropped images directory."
-                },
-                status_code=400,
-            )
 
-        # 결과 저장
-        folder_results = {}
+def list_subfolders() -> List[str]:
+    """CROPPED_IMAGES_DIR의 자식 폴더 경로를 정렬해 반환한다."""
+    return sorted(
+        os.path.join(CROPPED_IMAGES_DIR, folder)
+        for folder in os.listdir(CROPPED_IMAGES_DIR)
+        if os.path.isdir(os.path.join(CROPPED_IMAGES_DIR, folder))
+    )
 
-        for subfolder in sorted(subfolders):
-            print(f"[INFO] Processing folder: {subfolder}")
 
-            # 이미지 파일 리스트 (오름차순 정렬)
-            image_paths = [
-                os.path.join(subfolder, fname)
-                for fname in sorted(os.listdir(subfolder))
-                if fname.lower().endswith((".png", ".jpg", ".jpeg"))
-            ]
+def list_image_paths(subfolder: str) -> List[str]:
+    """폴더 내 이미지 파일 리스트 (오름차순 정렬)"""
+    return [
+        os.path.join(subfolder, fname)
+        for fname in sorted(os.listdir(subfolder))
+        if fname.lower().endswith((".png", ".jpg", ".jpeg"))
+    ]
 
-            if not image_paths:
-                print(f"[WARN] No images found in {subfolder}. Skipping...")
-                continue
 
-            # OCR 수행
-            folder_texts = perform_ocr_on_cropped_images(
-                image_paths=image_paths,
-                model=ocr_model,
-                tokenizer=ocr_tokenizer,
-                image_processor=ocr_processor,
-                image_size=384,
-            )
+def load_saved_results(output_json_path: str) -> dict:
+    """
+    이전 실행에서 저장된 폴더별 결과를 읽는다.
+    파일이 없거나 다른 CROPPED_IMAGES_DIR의 결과라면 빈 dict를 반환한다.
+    """
+    if not os.path.exists(output_json_path):
+        return {}
+    try:
+        with open(output_json_path, "r", encoding="utf-8") as json_file:
+            saved = json.load(json_file)
+    except Exception as e:
+        print(f"[WARN] Failed to read previous results, starting over: {e}")
+        return {}
+    if saved.get("cropped_images_dir") != CROPPED_IMAGES_DIR:
+        return {}
+    return saved.get("ocr_results", {})
 
-            # 폴더 이름을 키로 결과 저장
-            folder_name = os.path.basename(subfolder)
-            folder_results[folder_name] = " ".join(folder_texts).strip()
 
-        # 최종 결과 JSON 생성 및 저장
+def save_results(output_json_path: str, folder_results: dict):
+    """
+    폴더별 결과를 JSON으로 저장한다. 중간에 중단돼도 파일이 깨지지 않도록 교체 방식으로 쓴다.
+    다른 요청이 먼저 저장한 폴더를 지우지 않도록 잠금 안에서 파일을 다시 읽어 병합한 뒤 쓴다.
+    """
+    with results_file_lock:
+        merged = load_saved_results(output_json_path)
+        merged.update(folder_results)
         result = {
             "cropped_images_dir": CROPPED_IMAGES_DIR,
-            "ocr_results": folder_results,
+            "ocr_results": merged,
         }
-        output_json_path = os.path.join(RESULTS_DIR, "ocr_results.json")
-        with open(output_json_path, "w", encoding="utf-8") as json_file:
-            json.dump(result, json_file, ensure_ascii=False, indent=4)
+        tmp_path = f"{output_json_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as json_file:
+                json.dump(result, json_file, ensure_ascii=False, indent=4)
+            os.replace(tmp_path, output_json_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
 
-        print(f"[INFO] OCR results saved to: {output_json_path}")
 
+def process_folder(subfolder: str, folder_results: dict, output_json_path: str) -> dict:
+    """
+    폴더 하나를 OCR하고 결과 파일을 갱신한 뒤, 스트리밍/응답용 결과 dict를 반환한다.
+    resume 대상(folder_results에 이미 있는 폴더)은 건너뛴다. 오류는 결과 dict로 반환한다.
+    """
+    folder_name = os.path.basename(subfolder)
+
+    if folder_name in folder_results:
+        return {"folder": folder_name, "status": "skipped", "text": folder_results[folder_name]}
+
+    print(f"[INFO] Processing folder: {subfolder}")
+    try:
+        image_paths = list_image_paths(subfolder)
+        if not image_paths:
+            print(f"[WARN] No images found in {subfolder}. Skipping...")
+            return {"folder": folder_name, "status": "empty", "text": ""}
+
+        # OCR 수행 후 폴더 이름을 키로 결과 저장
+        folder_texts = run_ocr(image_paths)
+        folder_results[folder_name] = " ".join(folder_texts).strip()
+        save_results(output_json_path, folder_results)
+        return {"folder": folder_name, "status": "ok", "text": folder_results[folder_name]}
+
+    except Exception as e:
+        print(f"[ERROR] Failed to process folder {subfolder}: {e}")
+        return {"folder": folder_name, "status": "error", "error": str(e)}
+
+
+def iter_folder_results(output_json_path: str, resume: bool):
+    """
+    자식 폴더를 하나씩 OCR하여 폴더별 결과 dict를 생성(yield)한다.
+    폴더가 끝날 때마다 결과 파일을 갱신하므로, 중간에 실패하거나 타임아웃이 나도
+    완료된 폴더의 결과는 남는다. resume=True면 이미 저장된 폴더는 건너뛴다.
+    한 폴더에서 오류가 나도 나머지 폴더는 계속 처리한다.
+    """
+    folder_results = load_saved_results(output_json_path) if resume else {}
+    for subfolder in list_subfolders():
+        yield process_folder(subfolder, folder_results, output_json_path)
+
+
+def validate_cropped_images_dir():
+    """크롭 이미지 폴더를 확인하고, 문제가 있으면 에러 응답을 반환한다."""
+    if not os.path.exists(CROPPED_IMAGES_DIR):
         return JSONResponse(
             content={
-                "message": "OCR processing complete.",
-                "result_file": output_json_path,
-            }
+                "error": f"Cropped images directory not found: {CROPPED_IMAGES_DIR}"
+            },
+            status_code=400,
+        )
+    if not list_subfolders():
+        return JSONResponse(
+            content={"error": "No subfolders found in the cropped images directory."},
+            status_code=400,
         )
+    return None
+
+
+def extract_all_folders(resume: bool):
+    """모든 자식 폴더를 OCR하고 응답을 만든다 (OCR 전용 스레드에서 실행)."""
+    error_response = validate_cropped_images_dir()
+    if error_response:
+        return error_response
+
+    output_json_path = os.path.join(RESULTS_DIR, "ocr_results.json")
+    failed_folders = [
+        item["folder"]
+        for item in iter_folder_results(output_json_path, resume)
+        if item["status"] == "error"
+    ]
+
+    print(f"[INFO] OCR results saved to: {output_json_path}")
+
+    return JSONResponse(
+        content={
+            "message": "OCR processing complete.",
+            "result_file": output_json_path,
+            "failed_folders": failed_folders,
+        }
+    )
+
+
+def queue_full_response(e: Exception) -> JSONResponse:
+    print(f"[WARN] Rejecting OCR request: {e}")
+    return JSONResponse(
+        content={"error": str(e), **ocr_executor.stats()},
+        status_code=503,
+        headers={"Retry-After": "5"},
+    )
+
+
+def parse_boxes(boxes: Optional[str]) -> Optional[List[List[float]]]:
+    """
+    boxes 폼 값을 파싱한다. [[x1, y1, x2, y2], ...] 형태(또는 8개 숫자로 펼친 4점 좌표)가
+    아니면 ValueError를 발생시킨다.
+    """
+    if not boxes:
+        return None
+    parsed = json.loads(boxes)
+    if not isinstance(parsed, list):
+        raise ValueError("boxes must be a JSON list of [x1, y1, x2, y2] lists")
+    for idx, box in enumerate(parsed):
+        if (
+            not isinstance(box, list)
+            or len(box) not in (4, 8)
+            or not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in box)
+        ):
+            raise ValueError(f"boxes[{idx}] must be [x1, y1, x2, y2] (or 8 corner coordinates) of numbers: {box!r}")
+    return parsed
+
+
+def decode_image(image_bytes: bytes):
+    """업로드된 이미지 바이트를 PIL 이미지로 디코딩한다. 실패하면 None."""
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        return image.convert("RGB")
+    except Exception as e:
+        print(f"[ERROR] Failed to decode uploaded image: {e}")
+        return None
+
+
+def extract_text_from_uploads(
+    image_bytes: Optional[bytes], boxes: Optional[List], crop_bytes_list: List[bytes]
+):
+    """
+    업로드된 원본 이미지(+바운딩 박스) 또는 크롭 이미지들을 메모리에서 OCR한다.
+    크롭 결과를 디스크에 PNG로 저장하지 않는다 (OCR 전용 스레드에서 실행).
+    """
+    crop_images, crop_boxes = [], []
+
+    if image_bytes is not None:
+        image = decode_image(image_bytes)
+        if image is None:
+            return JSONResponse(
+                content={"error": "Failed to decode uploaded image."}, status_code=400
+            )
+        if boxes:
+            crop_images = crop_boxes_in_memory(image, boxes)
+            crop_boxes = list(boxes)
+        else:
+            # 박스가 없으면 이미지 전체를 하나의 크롭으로 처리
+            crop_images = [image]
+            crop_boxes = [None]
+
+    # 별도로 업로드된 크롭은 디코딩 실패 시 None으로 두어 빈 문자열로 처리된다
+    for crop_bytes in crop_bytes_list:
+        crop_images.append(decode_image(crop_bytes))
+        crop_boxes.append(None)
+
+    texts = run_ocr(crop_images, crop_boxes)
+    return JSONResponse(content={"text": " ".join(texts).strip(), "texts": texts})
+
+
+@app.post("/extract_text/")
+async def extract_text_from_folders(
+    resume: bool = False,
+    image: Optional[UploadFile] = File(None),
+    boxes: Optional[str] = Form(None),
+    crops: Optional[List[UploadFile]] = File(None),
+):
+    """
+    여러 자식 폴더를 포함한 크롭된 이미지를 OCR 처리하고 결과를 반환
+    resume=True면 ocr_results.json에 이미 있는 폴더는 다시 처리하지 않는다.
+    OCR은 전용 스레드 풀에서 실행되며, 대기열이 가득 차면 503을 반환한다.
+
+    multipart로 이미지를 보내면 폴더 대신 업로드된 이미지를 메모리에서 처리한다.
+    - image + boxes: 원본 이미지와 JSON 박스 목록 (예: "[[x1, y1, x2, y2], ...]")
+    - crops: 이미 잘라낸 크롭 이미지 여러 장
+    이 경우 {"text": 전체 텍스트, "texts": 크롭별 텍스트}를 반환한다.
+    """
+    try:
+        if image is not None or crops:
+            try:
+                parsed_boxes = parse_boxes(boxes)
+            except ValueError as e:
+                return JSONResponse(
+                    content={"error": f"Invalid boxes: {e}"}, status_code=400
+                )
+
+            image_bytes = await image.read() if image is not None else None
+            crop_bytes_list = [await crop.read() for crop in crops or []]
+            return await ocr_executor.run(
+                extract_text_from_uploads, image_bytes, parsed_boxes, crop_bytes_list
+            )
+
+        return await ocr_executor.run(extract_all_folders, resume)
+
+    except OCRQueueFullError as e:
+        return queue_full_response(e)
 
     except Exception as e:
         print(f"[ERROR] Failed to process images: {e}")
@@ -115,6 +350,62 @@ async def extract_text_from_folders():
     # print(f"[INFO] Temporary directory {CROPPED_IMAGES_DIR} has been cleaned up.")
 
 
+@app.post("/extract_text/stream")
+async def extract_text_from_folders_stream(resume: bool = True):
+    """
+    폴더별 OCR 결과를 처리되는 즉시 NDJSON(한 줄에 JSON 하나)으로 스트리밍한다.
+    결과 파일은 폴더마다 갱신되며, 재실행 시 이미 저장된 폴더는 건너뛴다 (resume=False로 끌 수 있음).
+    """
+    if ocr_executor.is_saturated():
+        return queue_full_response(OCRQueueFullError("OCR queue is full"))
+
+    error_response = await run_in_threadpool(validate_cropped_images_dir)
+    if error_response:
+        return error_response
+
+    output_json_path = os.path.join(RESULTS_DIR, "ocr_results.json")
+
+    async def _stream():
+        folder_results = (
+            await run_in_threadpool(load_saved_results, output_json_path) if resume else {}
+        )
+        for subfolder in await run_in_threadpool(list_subfolders):
+            # 이미 수락한 스트림은 거절하지 않고 폴더 단위로 대기열에 넣는다
+            item = await ocr_executor.run(
+                process_folder,
+                subfolder,
+                folder_results,
+                output_json_path,
+                reject_when_full=False,
+            )
+            yield json.dumps(item, ensure_ascii=False) + "\n"
+        yield json.dumps(
+            {"status": "done", "result_file": output_json_path}, ensure_ascii=False
+        ) + "\n"
+
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
+
+
+@app.get("/health")
+async def health():
+    """OCR 작업과 무관하게 즉시 응답하는 상태 확인"""
+    return {"status": "ok"}
+
+
+@app.get("/ocr_status")
+async def ocr_status():
+    """OCR 대기열 깊이와 실행 중인 작업 수"""
+    return ocr_executor.stats()
+
+
+@app.get("/ocr_cache/stats")
+async def ocr_cache_stats():
+    """OCR 결과 캐시의 항목 수와 hit/miss 통계"""
+    if ocr_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **(await run_in_threadpool(ocr_cache.stats))}
+
+
 # -------------------------------------------------------------------------
 # 추가: 단순 파이썬 스크립트 실행 시 동작할 로직   ＜－ 테스트 이후 삭제
 # -------------------------------------------------------------------------
@@ -158,13 +449,7 @@ if __name__ == "__main__":
                 continue
 
             # OCR 수행
-            folder_texts = perform_ocr_on_cropped_images(
-                image_paths=image_paths,
-                model=ocr_model,
-                tokenizer=ocr_tokenizer,
-                image_processor=ocr_processor,
-                image_size=384,
-            )
+            folder_texts = run_ocr(image_paths)
 
             # 폴더 이름을 키로 결과 저장
             folder_name = os.path.basename(subfolder)
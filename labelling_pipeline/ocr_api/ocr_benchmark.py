@@ -0,0 +1,121 @@
+"""
+OCR 경로별 처리 속도와 결과 일치도를 비교하는 벤치마크 스크립트.
+
+    python ocr_benchmark.py --model-path ./models/final_model_1 --images-dir ./test_img
+
+기존 경로(한 장씩, max_length=512)를 기준으로, 버킷팅 경로의
+crops/sec와 문자 단위 일치도(difflib 유사도 평균, 완전 일치 비율)를 출력한다.
+"""
+import argparse
+import os
+import time
+from difflib import SequenceMatcher
+from ocr_model import (
+    load_ocr_model,
+    perform_ocr_on_cropped_images,
+    perform_ocr_with_buckets,
+)
+
+DEFAULT_IMAGES_DIR = os.path.join(os.path.dirname(__file__), "test_img")
+
+
+def collect_folders(images_dir):
+    """test_img 하위 폴더별 이미지 경로 리스트를 반환한다."""
+    folders = {}
+    for folder in sorted(os.listdir(images_dir)):
+        folder_path = os.path.join(images_dir, folder)
+        if not os.path.isdir(folder_path):
+            continue
+        image_paths = [
+            os.path.join(folder_path, fname)
+            for fname in sorted(os.listdir(folder_path))
+            if fname.lower().endswith((".png", ".jpg", ".jpeg"))
+        ]
+        if image_paths:
+            folders[folder] = image_paths
+    return folders
+
+
+def run_path(name, ocr_fn, folders, **kwargs):
+    """모든 폴더에 대해 ocr_fn을 실행하고 (텍스트 리스트, crops/sec)를 반환한다."""
+    texts = []
+    num_crops = 0
+    start_time = time.perf_counter()
+    for image_paths in folders.values():
+        texts.extend(ocr_fn(image_paths=image_paths, **kwargs))
+        num_crops += len(image_paths)
+    elapsed = time.perf_counter() - start_time
+    crops_per_sec = num_crops / elapsed if elapsed > 0 else 0.0
+    print(f"[BENCH] {name}: {num_crops} crops in {elapsed:.2f}s ({crops_per_sec:.2f} crops/sec)")
+    return texts, crops_per_sec
+
+
+def char_agreement(reference, candidate):
+    """두 텍스트 리스트의 평균 문자 유사도와 완전 일치 비율을 계산한다."""
+    if not reference:
+        return 0.0, 0.0
+    ratios = [SequenceMatcher(None, ref, cand).ratio() for ref, cand in zip(reference, candidate)]
+    exact = sum(ref == cand for ref, cand in zip(reference, candidate))
+    return sum(ratios) / len(ratios), exact / len(reference)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR 배치/버킷팅 벤치마크")
+    parser.add_argument("--model-path", default=os.getenv("OCR_MODEL_PATH", "./models/final_model_1"))
+    parser.add_argument("--images-dir", default=DEFAULT_IMAGES_DIR)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--num-workers", type=int, default=2, help="전처리 스레드 수")
+    args = parser.parse_args()
+
+    folders = collect_folders(args.images_dir)
+    if not folders:
+        raise FileNotFoundError(f"[ERROR] No image folders found in {args.images_dir}")
+
+    model, tokenizer, image_processor = load_ocr_model(args.model_path)
+    if not model:
+        raise RuntimeError(f"[ERROR] OCR 모델 로드 실패: {args.model_path}")
+
+    common = dict(model=model, tokenizer=tokenizer, image_processor=image_processor, image_size=384)
+
+    # 기준: 기존 경로 (한 장씩, max_length=512)
+    baseline_texts, baseline_cps = run_path(
+        "baseline (batch_size=1)", perform_ocr_on_cropped_images, folders, batch_size=1, **common
+    )
+    batched_texts, batched_cps = run_path(
+        f"batched (batch_size={args.batch_size})",
+        perform_ocr_on_cropped_images,
+        folders,
+        batch_size=args.batch_size,
+        **common,
+    )
+    bucketed_texts, bucketed_cps = run_path(
+        f"bucketed (batch_size={args.batch_size})",
+        perform_ocr_with_buckets,
+        folders,
+        batch_size=args.batch_size,
+        **common,
+    )
+    pipelined_texts, pipelined_cps = run_path(
+        f"bucketed+pipelined (batch_size={args.batch_size}, workers={args.num_workers})",
+        perform_ocr_with_buckets,
+        folders,
+        batch_size=args.batch_size,
+        num_workers=args.num_workers,
+        **common,
+    )
+
+    for name, texts, cps in (
+        ("batched", batched_texts, batched_cps),
+        ("bucketed", bucketed_texts, bucketed_cps),
+        ("bucketed+pipelined", pipelined_texts, pipelined_cps),
+    ):
+        similarity, exact = char_agreement(baseline_texts, texts)
+        speedup = cps / baseline_cps if baseline_cps else 0.0
+        print(
+            f"[BENCH] {name} vs baseline: speedup x{speedup:.2f}, "
+            f"char similarity {similarity:.4f}, exact match {exact:.2%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List
+from PIL import Image
+
+
+def hash_image_file(image_path: str) -> str:
+    """이미지 파일 바이트의 sha256 해시 (파일 이름/경로와 무관하게 내용이 같으면 같은 키)"""
+    digest = hashlib.sha256()
+    with open(image_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_image_source(image_source) -> str:
+    """
+    파일 경로면 파일 바이트를, 메모리의 PIL 이미지면 모드/크기/픽셀 바이트를 해시한다.
+    """
+    if isinstance(image_source, Image.Image):
+        digest = hashlib.sha256()
+        digest.update(f"{image_source.mode}:{image_source.width}x{image_source.height}:".encode())
+        digest.update(image_source.tobytes())
+        return digest.hexdigest()
+    return hash_image_file(image_source)
+
+
+class OCRResultCache:
+    """
+    이미지 내용 해시 + 모델 버전을 키로 OCR 결과를 저장하는 SQLite 캐시.
+
+    - max_entries를 넘으면 가장 오래 사용되지 않은 항목부터 지운다 (LRU).
+    - 모델 버전이 바뀌면 생성 시점에 이전 버전의 항목을 모두 지운다.
+    - hit/miss 횟수를 stats()로 제공한다.
+    """
+
+    def __init__(self, db_path: str, model_version: str, max_entries: int = 100_000):
+        self.db_path = db_path
+        self.model_version = model_version
+        self.max_entries = max(1, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS ocr_cache (
+                image_hash TEXT NOT NULL,
+                model_version TEXT NOT NULL,
+                text TEXT NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (image_hash, model_version)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_ocr_cache_last_access ON ocr_cache (last_access)"
+        )
+        self._purge_stale_versions()
+
+    def _purge_stale_versions(self):
+        """현재 모델 버전이 아닌 항목을 삭제한다 (모델 디렉토리 변경 시 자동 무효화)."""
+        with self._lock, self._conn:
+            deleted = self._conn.execute(
+                "DELETE FROM ocr_cache WHERE model_version != ?", (self.model_version,)
+            ).rowcount
+        if deleted:
+            print(f"[INFO] OCR cache: removed {deleted} entries from previous model versions")
+
+    def get_many(self, image_hashes: List[str]) -> Dict[str, str]:
+        """해시 리스트 중 캐시에 있는 항목을 {해시: 텍스트}로 반환하고 hit/miss를 집계한다."""
+        unique_hashes = list(dict.fromkeys(image_hashes))
+        found = {}
+        with self._lock, self._conn:
+            # SQLite 변수 개수 제한을 피하기 위해 나눠서 조회
+            for start in range(0, len(unique_hashes), 500):
+                chunk = unique_hashes[start : start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT image_hash, text FROM ocr_cache "
+                    f"WHERE model_version = ? AND image_hash IN ({placeholders})",
+                    (self.model_version, *chunk),
+                ).fetchall()
+                found.update(rows)
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE ocr_cache SET last_access = ? WHERE image_hash = ? AND model_version = ?",
+                    [(now, image_hash, self.model_version) for image_hash in found],
+                )
+
+            hit_count = sum(1 for image_hash in image_hashes if image_hash in found)
+            self.hits += hit_count
+            self.misses += len(image_hashes) - hit_count
+        return found
+
+    def put_many(self, results: Dict[str, str]):
+        """{해시: 텍스트}를 저장하고, 용량을 넘으면 LRU 순서로 오래된 항목을 지운다."""
+        if not results:
+            return
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO ocr_cache (image_hash, model_version, text, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                [(image_hash, self.model_version, text, now) for image_hash, text in results.items()],
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM ocr_cache").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM ocr_cache WHERE rowid IN "
+                    "(SELECT rowid FROM ocr_cache ORDER BY last_access LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM ocr_cache").fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                "model_version": self.model_version,
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
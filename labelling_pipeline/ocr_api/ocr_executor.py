@@ -0,0 +1,93 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class OCRQueueFullError(Exception):
+    """대기열이 가득 차서 새 OCR 작업을 받을 수 없을 때 발생"""
+
+
+class OCRExecutor:
+    """
+    OCR처럼 CPU를 오래 점유하는 블로킹 작업을 이벤트 루프 밖의 전용 스레드 풀에서 실행한다.
+
+    - max_concurrency: 동시에 실행되는 작업 수 (스레드 풀 크기)
+    - max_queue: 실행을 기다릴 수 있는 작업 수. 초과하면 OCRQueueFullError를 발생시킨다.
+    """
+
+    def __init__(self, max_concurrency: int = 1, max_queue: int = 8):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="ocr"
+        )
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def is_saturated(self) -> bool:
+        """실행 슬롯과 대기열이 모두 찬 상태인지 확인한다."""
+        with self._lock:
+            return self._queued + self._in_flight >= self.max_concurrency + self.max_queue
+
+    def _reserve(self, reject_when_full: bool):
+        with self._lock:
+            if (
+                reject_when_full
+                and self._queued + self._in_flight >= self.max_concurrency + self.max_queue
+            ):
+                self._rejected += 1
+                raise OCRQueueFullError(
+                    f"OCR queue is full (in_flight={self._in_flight}, queued={self._queued})"
+                )
+            self._queued += 1
+
+    def _run_tracked(self, fn, args, kwargs):
+        # 스레드 풀에서 실제로 실행되기 시작하면 대기 -> 실행 중으로 옮긴다
+        with self._lock:
+            self._queued -= 1
+            self._in_flight += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self._completed += 1
+
+    async def run(self, fn, *args, reject_when_full: bool = True, **kwargs):
+        """
+        fn(*args, **kwargs)를 전용 스레드 풀에서 실행하고 결과를 기다린다.
+        reject_when_full=True이고 대기열이 가득 찼으면 OCRQueueFullError를 발생시킨다.
+        """
+        self._reserve(reject_when_full)
+        try:
+            concurrent_future = self._pool.submit(self._run_tracked, fn, args, kwargs)
+        except Exception:
+            with self._lock:
+                self._queued -= 1
+            raise
+        # 요청이 취소되어 실행 전에 작업이 취소되면 대기 수를 되돌린다
+        concurrent_future.add_done_callback(self._on_done)
+        return await asyncio.wrap_future(concurrent_future)
+
+    def _on_done(self, concurrent_future):
+        if concurrent_future.cancelled():
+            with self._lock:
+                self._queued -= 1
+
+    def stats(self) -> dict:
+        """대기열 깊이와 실행 중인 작업 수 등 현재 상태를 반환한다."""
+        with self._lock:
+            return {
+                "queue_depth": self._queued,
+                "in_flight": self._in_flight,
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
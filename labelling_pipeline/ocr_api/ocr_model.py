@@ -1,8 +1,23 @@
 import os
 import json
+import queue
+import threading
+import torch
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
-from transformers import VisionEncoderDecoderModel, AutoTokenizer, AutoImageProcessor
-from typing import List
+from transformers import (
+    VisionEncoderDecoderModel,
+    AutoTokenizer,
+    AutoImageProcessor,
+    StoppingCriteria,
+    StoppingCriteriaList,
+)
+from typing import Dict, List, Optional, Tuple
+from ocr_scheduler import get_box_bounds, schedule_crops
+from ocr_cache import hash_image_source
+
+# 전처리 파이프라인 종료 표시
+_PIPELINE_DONE = object()
 
 
 def ensure_preprocessor_config_if_missing(model_dir: str):
@@ -54,34 +69,381 @@ def load_ocr_model(model_path: str):
         return None, None, None
 
 
-def perform_ocr_on_cropped_images(
-    image_paths: List[str], model, tokenizer, image_processor, image_size: int = 384
-):
+def describe_image_source(image_source) -> str:
+    """로그용 이미지 이름 (파일 경로 또는 메모리 이미지 크기)"""
+    if isinstance(image_source, Image.Image):
+        return f"<in-memory {image_source.width}x{image_source.height}>"
+    return str(image_source)
+
+
+def load_and_preprocess_image(image_source, image_processor, image_size: int = 384):
     """
-    크롭된 이미지 리스트를 받아 OCR을 수행한 뒤, 각 이미지를 인식해 얻은 텍스트를 리스트로 반환한다.
+    이미지 한 장을 로드/리사이즈한 뒤 모델 입력용 pixel_values 텐서(1, C, H, W)로 변환한다.
+    image_source는 파일 경로 또는 이미 메모리에 있는 PIL 이미지다.
+    """
+    if isinstance(image_source, Image.Image):
+        img = image_source.convert("RGB")
+    else:
+        img = Image.open(image_source).convert("RGB")
+    img = img.resize((image_size, image_size))
+    return image_processor(images=img, return_tensors="pt").pixel_values
+
+
+def crop_boxes_in_memory(image: Image.Image, boxes: List) -> List[Image.Image]:
+    """
+    원본 이미지에서 박스 영역을 메모리상에서 잘라 PIL 이미지 리스트로 반환한다 (디스크 저장 없음).
+    이미지 범위를 벗어난 좌표는 잘라내며, 넓이가 0인 박스는 1px 크롭이 된다.
+    """
+    image = image.convert("RGB")
+    crops = []
+    for box in boxes:
+        x_min, y_min, x_max, y_max = get_box_bounds(box)
+        x_min = min(max(0, x_min), image.width - 1)
+        y_min = min(max(0, y_min), image.height - 1)
+        x_max = min(max(x_min + 1, x_max), image.width)
+        y_max = min(max(y_min + 1, y_max), image.height)
+        crops.append(image.crop((x_min, y_min, x_max, y_max)))
+    return crops
+
+
+def repeated_tail_start(token_ids: List[int], repeats: int, max_ngram: int = 4) -> Optional[int]:
+    """
+    token_ids 끝부분이 길이 max_ngram 이하의 같은 n-gram을 repeats번 연속 반복하면
+    두 번째 반복이 시작되는 위치를, 아니면 None을 반환한다.
+    """
+    for n in range(1, max_ngram + 1):
+        span = n * repeats
+        if len(token_ids) < span:
+            break
+        tail = token_ids[-span:]
+        if all(tail[i] == tail[i % n] for i in range(n, span)):
+            return len(token_ids) - span + n
+    return None
+
+
+class RepetitionStoppingCriteria(StoppingCriteria):
+    """
+    배치의 모든 시퀀스가 EOS를 냈거나 같은 n-gram을 repeats번 반복하고 있으면 generate를 멈춘다.
+    인식이 끝난 짧은 크롭이 EOS 대신 같은 토큰을 반복하며 max_length까지 가는 경우를 잘라낸다.
     """
-    all_texts = []
-    for image_path in image_paths:
+
+    def __init__(self, repeats: int, eos_token_id: Optional[int], max_ngram: int = 4):
+        self.repeats = repeats
+        self.eos_token_id = eos_token_id
+        self.max_ngram = max_ngram
+
+    def __call__(self, input_ids, scores, **kwargs) -> bool:
+        for row in input_ids.tolist():
+            if self.eos_token_id is not None and self.eos_token_id in row[1:]:
+                continue
+            if repeated_tail_start(row, self.repeats, self.max_ngram) is None:
+                return False
+        return True
+
+
+def generate_texts(
+    pixel_values, model, tokenizer, max_length: int = 512, repeat_stop: int = 0
+) -> List[str]:
+    """
+    (N, C, H, W) 텐서를 한 번의 generate 호출로 추론하고 N개의 텍스트를 반환한다.
+    repeat_stop > 0이면 모든 시퀀스가 EOS를 냈거나 같은 n-gram을 repeat_stop번 반복할 때
+    max_length 전에 멈추고, 반복된 꼬리는 첫 번째 것만 남긴다.
+    """
+    generate_kwargs = {"max_length": max_length}
+    if repeat_stop > 0:
+        eos_token_id = getattr(model.config, "eos_token_id", None) or tokenizer.eos_token_id
+        generate_kwargs["stopping_criteria"] = StoppingCriteriaList(
+            [RepetitionStoppingCriteria(repeat_stop, eos_token_id)]
+        )
+    with torch.no_grad():
+        output_ids = model.generate(pixel_values, **generate_kwargs)
+
+    sequences = output_ids.tolist()
+    if repeat_stop > 0:
+        for idx, row in enumerate(sequences):
+            start = repeated_tail_start(row, repeat_stop)
+            if start is not None:
+                sequences[idx] = row[:start]
+    decoded = tokenizer.batch_decode(sequences, skip_special_tokens=True)
+    return [text.strip() for text in decoded]
+
+
+def preprocess_batch(
+    image_paths: List[str],
+    indices: List[int],
+    image_processor,
+    image_size: int = 384,
+    pool: Optional[ThreadPoolExecutor] = None,
+) -> Tuple[List[int], List]:
+    """
+    indices에 해당하는 이미지를 로드/전처리하여 (성공한 인덱스, 텐서 리스트)를 반환한다.
+    pool이 주어지면 이미지 디코딩과 정규화를 스레드 풀에서 병렬로 수행한다.
+    실패한 이미지는 결과에서 제외된다.
+    """
+
+    def _load(idx):
         try:
-            # 이미지 로드 및 리사이즈
-            img = Image.open(image_path).convert("RGB")
-            img = img.resize((image_size, image_size))
+            return load_and_preprocess_image(image_paths[idx], image_processor, image_size)
+        except Exception as e:
+            print(f"[ERROR] Failed to process {describe_image_source(image_paths[idx])}: {e}")
+            return None
+
+    results = pool.map(_load, indices) if pool else map(_load, indices)
+
+    loaded, tensors = [], []
+    for idx, tensor in zip(indices, results):
+        if tensor is not None:
+            loaded.append(idx)
+            tensors.append(tensor)
+    return loaded, tensors
+
+
+def infer_batch(
+    image_paths: List[str],
+    loaded: List[int],
+    tensors: List,
+    all_texts: List[str],
+    model,
+    tokenizer,
+    budget: Optional[Dict[str, int]] = None,
+):
+    """
+    전처리된 텐서들을 한 배치로 추론하고 결과를 all_texts의 해당 인덱스에 채운다.
+    budget은 generate_texts 인자 (max_length, repeat_stop). 없으면 max_length=512.
+    """
+    budget = budget or {"max_length": 512}
+    if not tensors:
+        return
+
+    # OCR 모델 배치 추론
+    try:
+        texts = generate_texts(
+            torch.cat(tensors, dim=0), model, tokenizer, **budget
+        )
+    except Exception as e:
+        # 배치 추론 실패 시 어떤 이미지가 문제인지 알 수 있도록 한 장씩 재시도
+        print(f"[WARN] Batch inference failed, retrying one by one: {e}")
+        texts = []
+        for idx, tensor in zip(loaded, tensors):
+            try:
+                texts.append(
+                    generate_texts(tensor, model, tokenizer, **budget)[0]
+                )
+            except Exception as single_error:
+                print(
+                    f"[ERROR] Failed to process {describe_image_source(image_paths[idx])}: "
+                    f"{single_error}"
+                )
+                texts.append("")
+
+    for idx, decoded_text in zip(loaded, texts):
+        all_texts[idx] = decoded_text
+        print(f"[INFO] Processed {describe_image_source(image_paths[idx])}: {decoded_text}")
+
+
+def _run_batches(
+    image_paths: List[str],
+    batches: List[Tuple[List[int], Dict[str, int]]],
+    all_texts: List[str],
+    model,
+    tokenizer,
+    image_processor,
+    image_size: int = 384,
+    num_workers: int = 0,
+    prefetch_batches: int = 2,
+) -> None:
+    """
+    (인덱스 리스트, generate 예산) 배치 목록을 순서대로 OCR하여 all_texts에 채운다.
 
-            # 이미지 전처리
-            pixel_values = image_processor(images=img, return_tensors="pt").pixel_values
+    num_workers > 0이면 생산자/소비자 파이프라인으로 동작한다.
+    생산자 스레드가 스레드 풀로 다음 배치를 디코딩/정규화하는 동안 현재 스레드는
+    현재 배치의 generate를 수행한다. 큐 크기를 prefetch_batches로 제한하므로
+    크롭이 수천 장인 폴더에서도 메모리에 올라가는 텐서는 몇 배치 분량으로 유지된다.
+    """
+    if num_workers <= 0:
+        for indices, budget in batches:
+            loaded, tensors = preprocess_batch(
+                image_paths, indices, image_processor, image_size
+            )
+            infer_batch(
+                image_paths, loaded, tensors, all_texts, model, tokenizer, budget
+            )
+        return
 
-            # OCR 모델 추론
-            output_ids = model.generate(pixel_values, max_length=512)
-            decoded_text = tokenizer.batch_decode(output_ids, skip_special_tokens=True)[
-                0
-            ].strip()
+    batch_queue = queue.Queue(maxsize=max(1, prefetch_batches))
+    stop_event = threading.Event()
 
-            # 크롭된 이미지 각각에서 추출된 텍스트를 리스트에 추가
-            all_texts.append(decoded_text)
-            print(f"[INFO] Processed {image_path}: {decoded_text}")
+    def _put(item):
+        # 소비자가 중단되면 큐가 비워지지 않으므로 주기적으로 중단 여부를 확인한다
+        while not stop_event.is_set():
+            try:
+                batch_queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
 
+    def _produce(pool):
+        try:
+            for indices, budget in batches:
+                loaded, tensors = preprocess_batch(
+                    image_paths, indices, image_processor, image_size, pool
+                )
+                if not _put((loaded, tensors, budget)):
+                    return
         except Exception as e:
-            print(f"[ERROR] Failed to process {image_path}: {e}")
-            all_texts.append("")  # 오류 발생 시 빈 텍스트 추가
+            print(f"[ERROR] Preprocessing pipeline failed: {e}")
+        finally:
+            _put(_PIPELINE_DONE)
+
+    with ThreadPoolExecutor(max_workers=num_workers) as pool:
+        producer = threading.Thread(target=_produce, args=(pool,), daemon=True)
+        producer.start()
+        try:
+            while True:
+                item = batch_queue.get()
+                if item is _PIPELINE_DONE:
+                    break
+                loaded, tensors, budget = item
+                infer_batch(
+                    image_paths, loaded, tensors, all_texts, model, tokenizer, budget
+                )
+        finally:
+            stop_event.set()
+            producer.join()
+
+
+def run_ocr_batches(
+    image_paths: List[str],
+    batches: List[Tuple[List[int], Dict[str, int]]],
+    model,
+    tokenizer,
+    image_processor,
+    image_size: int = 384,
+    num_workers: int = 0,
+    prefetch_batches: int = 2,
+    cache=None,
+) -> List[str]:
+    """
+    (인덱스 리스트, generate 예산) 배치 목록을 OCR하고 image_paths 순서의 텍스트 리스트를 반환한다.
+    cache(OCRResultCache)가 주어지면 이미지 내용 해시로 캐시를 먼저 조회하여,
+    캐시에 없는 이미지만 generate하고 그 결과를 캐시에 저장한다.
+    """
+    all_texts = [""] * len(image_paths)
+
+    image_hashes = {}
+    if cache is not None:
+        for idx, image_path in enumerate(image_paths):
+            try:
+                image_hashes[idx] = hash_image_source(image_path)
+            except Exception as e:
+                print(f"[WARN] Failed to hash {describe_image_source(image_path)}: {e}")
+
+        cached = cache.get_many(list(image_hashes.values()))
+        hit_indices = {
+            idx for idx, image_hash in image_hashes.items() if image_hash in cached
+        }
+        for idx in hit_indices:
+            all_texts[idx] = cached[image_hashes[idx]]
+        print(f"[INFO] OCR cache hits: {len(hit_indices)}/{len(image_paths)}")
+
+        # 캐시에 있는 이미지는 배치에서 제외
+        batches = [
+            ([idx for idx in indices if idx not in hit_indices], budget)
+            for indices, budget in batches
+        ]
+        batches = [(indices, budget) for indices, budget in batches if indices]
+
+    _run_batches(
+        image_paths,
+        batches,
+        all_texts,
+        model,
+        tokenizer,
+        image_processor,
+        image_size,
+        num_workers=num_workers,
+        prefetch_batches=prefetch_batches,
+    )
+
+    if cache is not None:
+        # 실패(빈 문자열)는 캐시하지 않는다
+        cache.put_many(
+            {
+                image_hashes[idx]: all_texts[idx]
+                for indices, _ in batches
+                for idx in indices
+                if idx in image_hashes and all_texts[idx]
+            }
+        )
 
     return all_texts
+
+
+def perform_ocr_on_cropped_images(
+    image_paths: List[str],
+    model,
+    tokenizer,
+    image_processor,
+    image_size: int = 384,
+    batch_size: int = 8,
+    num_workers: int = 0,
+    prefetch_batches: int = 2,
+    cache=None,
+):
+    """
+    크롭된 이미지 리스트를 받아 OCR을 수행한 뒤, 각 이미지를 인식해 얻은 텍스트를 리스트로 반환한다.
+    image_paths에는 파일 경로 대신 메모리에서 잘라낸 PIL 이미지를 넣을 수도 있다.
+    batch_size 개씩 pixel_values를 쌓아 한 번에 generate하며, 반환 순서는 image_paths 순서와 같다.
+    로드/추론에 실패한 이미지는 빈 문자열로 채운다.
+    num_workers > 0이면 이미지 디코딩/전처리를 추론과 겹쳐서 수행한다.
+    cache가 주어지면 캐시에 있는 이미지는 generate 없이 캐시 결과를 사용한다.
+    """
+    batch_size = max(1, batch_size)
+    batches = [
+        (list(range(start, min(start + batch_size, len(image_paths)))), {"max_length": 512})
+        for start in range(0, len(image_paths), batch_size)
+    ]
+    return run_ocr_batches(
+        image_paths,
+        batches,
+        model,
+        tokenizer,
+        image_processor,
+        image_size,
+        num_workers=num_workers,
+        prefetch_batches=prefetch_batches,
+        cache=cache,
+    )
+
+
+def perform_ocr_with_buckets(
+    image_paths: List[str],
+    model,
+    tokenizer,
+    image_processor,
+    boxes: Optional[List] = None,
+    image_size: int = 384,
+    batch_size: int = 8,
+    num_workers: int = 0,
+    prefetch_batches: int = 2,
+    cache=None,
+):
+    """
+    크롭을 가로/세로 비율과 넓이로 버킷팅한 뒤, 버킷별 generate 예산(max_length, 반복 조기 종료)으로
+    배치 OCR을 수행한다.
+    boxes는 image_paths와 같은 순서의 YOLO/CRAFT 좌표 (없으면 이미지 크기 사용).
+    반환 형식과 순서는 perform_ocr_on_cropped_images와 같다.
+    """
+    batches = schedule_crops(image_paths, boxes, batch_size)
+    return run_ocr_batches(
+        image_paths,
+        batches,
+        model,
+        tokenizer,
+        image_processor,
+        image_size,
+        num_workers=num_workers,
+        prefetch_batches=prefetch_batches,
+        cache=cache,
+    )
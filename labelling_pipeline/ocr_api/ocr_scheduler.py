@@ -0,0 +1,119 @@
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+from PIL import Image
+
+# 가로/세로 비율 구간 경계 (한 줄짜리 텍스트는 비율이 클수록 글자 수가 많다)
+RATIO_EDGES = (1.5, 3.0, 6.0, 12.0)
+
+# 박스 넓이(px^2) 구간 경계 (비율이 같아도 넓이가 크면 여러 줄일 가능성이 높다)
+AREA_EDGES = (4_000, 40_000, 160_000)
+
+# 비율 구간별 generate 최대 길이 (마지막 구간은 기존 경로와 동일한 512)
+RATIO_MAX_LENGTHS = (32, 64, 128, 256, 512)
+
+# 같은 n-gram(4토큰 이하)이 이 횟수만큼 연속 반복되면 조기 종료 (짧은 예산일수록 빨리 끊는다)
+RATIO_REPEAT_STOPS = (4, 4, 5, 6, 6)
+
+
+def _bin_index(value: float, edges: Sequence[float]) -> int:
+    """value가 속하는 구간 인덱스를 반환한다."""
+    for idx, edge in enumerate(edges):
+        if value < edge:
+            return idx
+    return len(edges)
+
+
+def get_box_bounds(box) -> Tuple[int, int, int, int]:
+    """
+    YOLO/CRAFT 좌표를 감싸는 사각형 (x_min, y_min, x_max, y_max)을 계산한다.
+    [x1, y1, x2, y2], 8개 정수로 펼친 4점 좌표, [[x, y], ...] 형태를 모두 지원한다.
+    """
+    if box and isinstance(box[0], (list, tuple)):
+        xs = [point[0] for point in box]
+        ys = [point[1] for point in box]
+    elif len(box) == 4:
+        xs, ys = [box[0], box[2]], [box[1], box[3]]
+    else:
+        xs, ys = list(box[0::2]), list(box[1::2])
+    return int(min(xs)), int(min(ys)), int(max(xs)), int(max(ys))
+
+
+def get_box_size(box) -> Tuple[int, int]:
+    """YOLO/CRAFT 좌표에서 (width, height)를 계산한다."""
+    x_min, y_min, x_max, y_max = get_box_bounds(box)
+    return max(1, x_max - x_min), max(1, y_max - y_min)
+
+
+def get_image_size(image_source) -> Tuple[int, int]:
+    """이미지 헤더만 읽어 (width, height)를 반환한다. 픽셀 디코딩은 하지 않는다."""
+    if isinstance(image_source, Image.Image):
+        return image_source.size
+    with Image.open(image_source) as img:
+        return img.size
+
+
+def assign_bucket(width: int, height: int) -> Tuple[int, int]:
+    """크롭 크기를 (비율 구간, 넓이 구간) 버킷 키로 변환한다."""
+    ratio = width / max(1, height)
+    return _bin_index(ratio, RATIO_EDGES), _bin_index(width * height, AREA_EDGES)
+
+
+def generation_budget(bucket: Tuple[int, int]) -> Dict[str, object]:
+    """
+    버킷별 generate 인자를 반환한다.
+    넓이가 큰 박스는 여러 줄일 수 있으므로 한 단계 긴 max_length를 준다.
+    greedy 디코딩은 배치 내 모든 시퀀스가 EOS를 내면 바로 멈추므로,
+    짧은 크롭끼리 묶으면 긴 크롭 때문에 디코딩이 늘어지지 않는다.
+    repeat_stop은 EOS 없이 같은 토큰열을 반복하는 시퀀스를 끊는 조기 종료 기준이다
+    (ocr_model.RepetitionStoppingCriteria).
+    """
+    ratio_bin, area_bin = bucket
+    level = min(ratio_bin + max(area_bin - 1, 0), len(RATIO_MAX_LENGTHS) - 1)
+    return {"max_length": RATIO_MAX_LENGTHS[level], "repeat_stop": RATIO_REPEAT_STOPS[level]}
+
+
+def schedule_crops(
+    image_paths: List[str], boxes: Optional[List] = None, batch_size: int = 8
+) -> List[Tuple[List[int], Dict[str, object]]]:
+    """
+    크롭 이미지를 버킷별로 묶어 (원래 인덱스 리스트, generate 인자) 배치 목록을 만든다.
+    boxes가 주어지면 좌표로, 없으면 이미지 헤더로 크기를 구한다.
+    크기를 알 수 없는 이미지는 가장 긴 예산의 버킷으로 보내 기존 경로와 같게 처리한다.
+    짧은 버킷부터 반환하므로 짧은 크롭은 긴 크롭을 기다리지 않고 먼저 끝난다.
+    """
+    batch_size = max(1, batch_size)
+    fallback_bucket = (len(RATIO_EDGES), len(AREA_EDGES))
+    buckets = defaultdict(list)
+
+    for idx, image_path in enumerate(image_paths):
+        try:
+            if boxes is not None and idx < len(boxes) and boxes[idx]:
+                width, height = get_box_size(boxes[idx])
+            else:
+                width, height = get_image_size(image_path)
+            bucket = assign_bucket(width, height)
+        except Exception as e:
+            print(f"[WARN] Failed to read size of {image_path}: {e}")
+            bucket = fallback_bucket
+        buckets[bucket].append(idx)
+
+    batches = []
+    for bucket in sorted(
+        buckets, key=lambda key: generation_budget(key)["max_length"]
+    ):
+        indices = buckets[bucket]
+        budget = generation_budget(bucket)
+        for start in range(0, len(indices), batch_size):
+            batches.append((indices[start : start + batch_size], budget))
+
+    print(
+        f"[INFO] Scheduled {len(image_paths)} crops into {len(batches)} batches "
+        f"({len(buckets)} buckets)"
+    )
+    return batches
+
+
+def estimate_generation_steps(batches) -> int:
+    """스케줄된 배치들의 최대 디코딩 스텝 합 (벤치마크 보고용)."""
+    return sum(budget["max_length"] for _, budget in batches)
+
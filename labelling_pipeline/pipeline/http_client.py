@@ -1,16 +1,86 @@
+import asyncio
+import os
 import httpx
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 # 각 API의 엔드포인트 URL 설정
 # YOLO_API_URL = "http://yolo_api:8000/extract_bboxes"
-OCR_API_URL = "http://ocr_api:8001/extract_text"
-LLM_API_URL = "http://llm_api:8002/process_problem"
+# (끝의 '/'가 없으면 FastAPI가 307 리다이렉트를 보내 왕복이 한 번 더 생긴다)
+OCR_API_URL = os.getenv("OCR_API_URL", "http://ocr_api:8001/extract_text/")
+LLM_API_URL = os.getenv("LLM_API_URL", "http://llm_api:8002/process_problem")
+
+# 커넥션 풀 설정
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+
+# 단계별 타임아웃 (초). OCR/LLM은 응답이 오래 걸리므로 read 타임아웃을 길게 둔다.
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+OCR_TIMEOUT = httpx.Timeout(float(os.getenv("OCR_API_TIMEOUT", "120")), connect=HTTP_CONNECT_TIMEOUT)
+LLM_TIMEOUT = httpx.Timeout(float(os.getenv("LLM_API_TIMEOUT", "60")), connect=HTTP_CONNECT_TIMEOUT)
 
 # 로깅 설정
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 프로세스 전체에서 공유하는 클라이언트 (FastAPI lifespan에서 생성/종료)
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_available() -> bool:
+    """h2 패키지가 설치된 경우에만 HTTP/2를 사용한다 (httpx[http2])."""
+    try:
+        import h2  # noqa: F401
+
+        return True
+    except ImportError:
+        return False
+
+
+def create_client() -> httpx.AsyncClient:
+    """풀 크기와 keep-alive가 설정된 AsyncClient를 생성한다."""
+    limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+    http2 = os.getenv("HTTP2_ENABLED", "true").lower() == "true" and _http2_available()
+    logger.info(f"HTTP 클라이언트 생성 (http2={http2}, max_connections={HTTP_MAX_CONNECTIONS})")
+    return httpx.AsyncClient(
+        limits=limits,
+        http2=http2,
+        timeout=httpx.Timeout(30.0, connect=HTTP_CONNECT_TIMEOUT),
+    )
+
+
+async def init_client():
+    """공유 클라이언트를 생성한다 (앱 시작 시 호출)."""
+    global _client
+    if _client is None:
+        _client = create_client()
+
+
+async def close_client():
+    """공유 클라이언트의 커넥션을 정리한다 (앱 종료 시 호출)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """공유 클라이언트를 반환한다. lifespan 밖(스크립트 등)에서는 처음 호출 시 생성한다."""
+    global _client
+    if _client is None:
+        _client = create_client()
+    return _client
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
 
 # async def call_yolo_api(image_path: str) -> Dict[str, Any]:
 #     """YOLO API에 이미지 경로를 보내고, 객체 인식 결과를 반환"""
@@ -29,13 +99,17 @@ logger = logging.getLogger(__name__)
 async def call_ocr_api(image_path: str) -> Dict[str, Any]:
     """OCR API에 이미지를 보내고 텍스트를 반환"""
     try:
-        async with httpx.AsyncClient() as client:
-            with open(image_path, "rb") as image_file:
-                response = await client.post(OCR_API_URL, files={"image": image_file})
+        # 파일 읽기가 이벤트 루프를 막지 않도록 스레드에서 수행
+        image_bytes = await asyncio.to_thread(_read_file, image_path)
+        response = await get_client().post(
+            OCR_API_URL,
+            files={"image": (os.path.basename(image_path), image_bytes)},
+            timeout=OCR_TIMEOUT,
+        )
 
         response.raise_for_status()
         return response.json()
-    except httpx.RequestError as e:
+    except (httpx.HTTPError, OSError) as e:
         logger.error(f"OCR API 호출 실패: {e}")
         return {"error": str(e)}
 
@@ -43,12 +117,11 @@ async def call_ocr_api(image_path: str) -> Dict[str, Any]:
 async def call_llm_api(question_text: str) -> Dict[str, Any]:
     """LLM API에 질문 텍스트를 보내고, 카테고리와 라벨을 반환"""
     try:
-        async with httpx.AsyncClient() as client:
-            payload = {"question_text": question_text}
-            response = await client.post(LLM_API_URL, json=payload)
+        payload = {"question_text": question_text}
+        response = await get_client().post(LLM_API_URL, json=payload, timeout=LLM_TIMEOUT)
 
         response.raise_for_status()
         return response.json()
-    except httpx.RequestError as e:
+    except httpx.HTTPError as e:
         logger.error(f"LLM API 호출 실패: {e}")
         return {"error": str(e)}
@@ -0,0 +1,143 @@
+"""
+로컬 스텁 OCR/LLM 서비스를 띄우고 http_client의 처리량(requests/sec)을 측정하는 부하 테스트.
+
+    python load_test.py --requests 500 --concurrency 50
+
+- before: 호출마다 새 httpx.AsyncClient를 열고 파일을 동기적으로 읽는 기존 방식
+- after : 공유 커넥션 풀 + 스레드 파일 읽기를 사용하는 현재 http_client
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import threading
+import time
+
+STUB_HOST = "127.0.0.1"
+OCR_STUB_PORT = 18001
+LLM_STUB_PORT = 18002
+
+# http_client가 import 시점에 URL을 읽으므로 먼저 스텁 주소로 설정
+os.environ.setdefault("OCR_API_URL", f"http://{STUB_HOST}:{OCR_STUB_PORT}/extract_text/")
+os.environ.setdefault("LLM_API_URL", f"http://{STUB_HOST}:{LLM_STUB_PORT}/process_problem")
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from fastapi import FastAPI, File, UploadFile  # noqa: E402
+import http_client  # noqa: E402
+
+
+def create_stub_apps(latency: float):
+    """지정한 지연 시간 후 고정 응답을 돌려주는 OCR/LLM 스텁 앱"""
+    ocr_app = FastAPI()
+    llm_app = FastAPI()
+
+    @ocr_app.post("/extract_text/")
+    async def extract_text(image: UploadFile = File(None)):
+        await asyncio.sleep(latency)
+        return {"text": "스텁 문제 텍스트", "texts": ["스텁 문제 텍스트"]}
+
+    @llm_app.post("/process_problem")
+    async def process_problem(payload: dict):
+        await asyncio.sleep(latency)
+        return {"category_label": "수와 연산", "leaf_label": "세 자리 수의 덧셈"}
+
+    return ocr_app, llm_app
+
+
+def start_stub_server(app, port: int) -> uvicorn.Server:
+    """uvicorn 서버를 백그라운드 스레드에서 실행한다."""
+    server = uvicorn.Server(
+        uvicorn.Config(app, host=STUB_HOST, port=port, log_level="warning", backlog=2048)
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def legacy_call(image_path: str):
+    """기존 방식: 호출마다 클라이언트 생성, 동기 파일 읽기"""
+    async with httpx.AsyncClient() as client:
+        with open(image_path, "rb") as image_file:
+            ocr_response = await client.post(http_client.OCR_API_URL, files={"image": image_file})
+    ocr_response.raise_for_status()
+
+    async with httpx.AsyncClient() as client:
+        llm_response = await client.post(
+            http_client.LLM_API_URL, json={"question_text": ocr_response.json()["text"]}
+        )
+    llm_response.raise_for_status()
+    return llm_response.json()
+
+
+async def pooled_call(image_path: str):
+    """현재 방식: 공유 커넥션 풀 사용"""
+    ocr_result = await http_client.call_ocr_api(image_path)
+    if "error" in ocr_result:
+        raise RuntimeError(ocr_result["error"])
+    llm_result = await http_client.call_llm_api(ocr_result["text"])
+    if "error" in llm_result:
+        raise RuntimeError(llm_result["error"])
+    return llm_result
+
+
+async def run_load(name, call_fn, image_path, num_requests, concurrency):
+    """num_requests개의 (OCR -> LLM) 호출을 concurrency 개씩 동시에 실행하고 처리량을 출력한다."""
+    semaphore = asyncio.Semaphore(concurrency)
+    errors = 0
+
+    async def _one():
+        nonlocal errors
+        async with semaphore:
+            try:
+                await call_fn(image_path)
+            except Exception:
+                errors += 1
+
+    start_time = time.perf_counter()
+    await asyncio.gather(*(_one() for _ in range(num_requests)))
+    elapsed = time.perf_counter() - start_time
+    rps = num_requests / elapsed if elapsed > 0 else 0.0
+    print(f"[BENCH] {name}: {num_requests} requests in {elapsed:.2f}s ({rps:.1f} req/s, errors={errors})")
+    return rps
+
+
+async def main_async(args):
+    with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as f:
+        f.write(os.urandom(args.image_kb * 1024))
+        image_path = f.name
+
+    try:
+        before = await run_load("before (client per call)", legacy_call, image_path, args.requests, args.concurrency)
+
+        await http_client.init_client()
+        try:
+            after = await run_load("after (shared pool)", pooled_call, image_path, args.requests, args.concurrency)
+        finally:
+            await http_client.close_client()
+
+        print(f"[BENCH] speedup: x{after / before:.2f}" if before else "[BENCH] speedup: n/a")
+    finally:
+        os.remove(image_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="http_client 부하 테스트 (로컬 스텁 서비스)")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.01, help="스텁 응답 지연 (초)")
+    parser.add_argument("--image-kb", type=int, default=64, help="업로드할 더미 이미지 크기 (KB)")
+    args = parser.parse_args()
+
+    ocr_app, llm_app = create_stub_apps(args.latency)
+    servers = [start_stub_server(ocr_app, OCR_STUB_PORT), start_stub_server(llm_app, LLM_STUB_PORT)]
+    try:
+        asyncio.run(main_async(args))
+    finally:
+        for server in servers:
+            server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,26 @@
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 import httpx  # httpx를 사용하여 비동기 HTTP 요청 처리
-from http_client import call_ocr_api, call_llm_api
+from http_client import call_ocr_api, call_llm_api, init_client, close_client
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # OCR/LLM API 호출에 재사용할 커넥션 풀을 앱 수명 동안 유지
+    await init_client()
+    try:
+        yield
+    finally:
+        await close_client()
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 # 요청받을 데이터 형식 정의
@@ -13,9 +29,34 @@ class ImageRequest(BaseModel):
     image_path: str
 
 
-# 이미지 경로를 통해 문제 텍스트 추출 후 라벨링하는 API 엔드포인트
-@app.post("/process-image/")
-async def process_image(request: ImageRequest):
+# 여러 이미지를 한 번에 처리하는 배치 요청 형식
+class BatchImageRequest(BaseModel):
+    images: List[ImageRequest]
+    ocr_concurrency: Optional[int] = None  # 미지정 시 PIPELINE_OCR_CONCURRENCY
+    llm_concurrency: Optional[int] = None  # 미지정 시 PIPELINE_LLM_CONCURRENCY
+
+
+# 배치 처리 시 단계별 동시 실행 수 기본값
+PIPELINE_OCR_CONCURRENCY = int(os.getenv("PIPELINE_OCR_CONCURRENCY", "4"))
+PIPELINE_LLM_CONCURRENCY = int(os.getenv("PIPELINE_LLM_CONCURRENCY", "8"))
+
+
+class _NoLimit:
+    """세마포어를 쓰지 않는 단건 처리용 더미 컨텍스트"""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+async def label_image(request: ImageRequest, ocr_limit=None, llm_limit=None):
+    """
+    이미지 한 장을 OCR -> LLM 순서로 처리하여 라벨링 결과를 반환한다.
+    ocr_limit/llm_limit(세마포어)가 주어지면 각 단계의 동시 실행 수를 제한한다.
+    실패 시 HTTPException을 발생시킨다.
+    """
     try:
         # 1. YOLO API 호출: 이미지에서 객체 인식
         # yolo_result = await call_yolo_api(request.image_path)
@@ -25,7 +66,8 @@ async def process_image(request: ImageRequest):
         #     )
 
         # 2. OCR API 호출: 이미지에서 텍스트 추출
-        ocr_result = await call_ocr_api(request.image_path)
+        async with ocr_limit or _NoLimit():
+            ocr_result = await call_ocr_api(request.image_path)
         if "error" in ocr_result:
             raise HTTPException(
                 status_code=400, detail=f"OCR API 호출 실패: {ocr_result['error']}"
@@ -37,7 +79,8 @@ async def process_image(request: ImageRequest):
             raise HTTPException(status_code=400, detail="OCR에서 텍스트 추출 실패")
 
         # 3. LLM API 호출: 문제 텍스트로 라벨링
-        llm_result = await call_llm_api(question_text)
+        async with llm_limit or _NoLimit():
+            llm_result = await call_llm_api(question_text)
         if "error" in llm_result:
             raise HTTPException(
                 status_code=400, detail=f"LLM API 호출 실패: {llm_result['error']}"
@@ -68,3 +111,84 @@ async def process_image(request: ImageRequest):
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"내부 서버 오류: {str(e)}")
+
+
+# 이미지 경로를 통해 문제 텍스트 추출 후 라벨링하는 API 엔드포인트
+@app.post("/process-image/")
+async def process_image(request: ImageRequest):
+    return await label_image(request)
+
+
+async def _label_image_safely(index: int, request: ImageRequest, ocr_limit, llm_limit):
+    """배치용: 실패해도 예외 대신 이미지별 오류 결과를 반환한다."""
+    try:
+        result = await label_image(request, ocr_limit, llm_limit)
+    except HTTPException as e:
+        result = {
+            "file_name": request.file_name,
+            "status": "error",
+            "status_code": e.status_code,
+            "detail": e.detail,
+        }
+    return {"index": index, **result}
+
+
+# 여러 이미지를 파이프라인으로 처리하고 결과를 이미지별로 스트리밍하는 API 엔드포인트
+@app.post("/process-images/")
+async def process_images(request: BatchImageRequest):
+    """
+    이미지 목록을 OCR -> LLM 파이프라인으로 처리한다.
+    단계별 세마포어로 동시 실행 수를 따로 제한하므로, 한 이미지가 LLM 단계에 있는 동안
+    다음 이미지의 OCR이 진행된다. 동시에 떠 있는 작업은 두 한도의 합으로 제한된다.
+    결과는 끝나는 순서대로 NDJSON 한 줄씩 반환되며, 원래 순서는 index로 알 수 있다.
+    이미지별 오류는 해당 줄에 status=error로 기록되고 배치 전체를 실패시키지 않는다.
+    """
+    ocr_concurrency = max(1, request.ocr_concurrency or PIPELINE_OCR_CONCURRENCY)
+    llm_concurrency = max(1, request.llm_concurrency or PIPELINE_LLM_CONCURRENCY)
+    max_in_flight = ocr_concurrency + llm_concurrency
+
+    async def _stream():
+        ocr_limit = asyncio.Semaphore(ocr_concurrency)
+        llm_limit = asyncio.Semaphore(llm_concurrency)
+        images = iter(enumerate(request.images))
+        pending = set()
+        succeeded = failed = 0
+
+        try:
+            while True:
+                # 수천 장이 들어와도 태스크는 max_in_flight 개까지만 만든다
+                for index, image_request in images:
+                    pending.add(
+                        asyncio.create_task(
+                            _label_image_safely(index, image_request, ocr_limit, llm_limit)
+                        )
+                    )
+                    if len(pending) >= max_in_flight:
+                        break
+                if not pending:
+                    break
+
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    result = task.result()
+                    if result["status"] == "success":
+                        succeeded += 1
+                    else:
+                        failed += 1
+                    yield json.dumps(result, ensure_ascii=False) + "\n"
+
+            summary = {
+                "status": "done",
+                "total": len(request.images),
+                "succeeded": succeeded,
+                "failed": failed,
+            }
+            yield json.dumps(summary, ensure_ascii=False) + "\n"
+        finally:
+            # 클라이언트 연결이 끊기면 남은 작업을 취소
+            for task in pending:
+                task.cancel()
+
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
@@ -1,27 +1,34 @@
 # src/api.py
-from typing import List
+from typing import List, Optional
 from fastapi import FastAPI, HTTPException, Query, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import asyncio
 import os
+import time
+import numpy as np
 from contextlib import asynccontextmanager
 from config import (
-    S3_BUCKET_NAME,
     YOLO_MODEL_PATH,
     LOCAL_YOLO_MODEL_PATH,
     CROPPED_IMAGES_DIR,
-    DOWNLOADS_DIR,
+    BATCH_PREFETCH_CONCURRENCY,
+    BATCH_MAX_IMAGES,
+    YOLO_BATCH_SIZE,
+    DETECTION_DB_PATH,
+    DETECTION_BATCH_SIZE,
+    DETECTION_FLUSH_INTERVAL,
 )
-from s3_utils import create_s3_client
 from ocr_utils import save_cropped_image_path
+from image_fetcher import create_image_fetcher
+from detection import craft_boxes, yolo_detect_batch, craft_within_yolo_boxes
+from path_router import PathRouter, CRAFT, CRAFT_FALLBACK, YOLO_DIRECT
+from detection_store import DetectionStore
 from yolo_model import (
-    download_image_from_s3,
     process_image_with_craft,
     process_image_with_yolo_and_craft,
     convert_numpy_to_python,
     flatten,
-    save_coordinates,
-    save_failed_boxes,
 )
 from model_manager import model_manager  # 추가
 from webhook_handler import router as webhook_router  # 추가
@@ -43,6 +50,15 @@ class CoordinatesResponse(BaseModel):
     coordinates: List[List[int]]
     cropped_image_paths: List[str]
 
+class BatchExtractRequest(BaseModel):
+    image_paths: List[str]  # S3에 저장된 이미지 경로 목록
+    batch_size: int = YOLO_BATCH_SIZE  # YOLO 미니배치 크기
+
+class BatchItemResponse(BaseModel):
+    image_path: str
+    result: Optional[CoordinatesResponse] = None
+    error: Optional[str] = None
+
 class ModelUpdateRequest(BaseModel):
     s3_key: str  # S3에 저장된 새로운 모델의 키
 
@@ -51,6 +67,15 @@ API_KEY = os.getenv("API_KEY")
 API_KEY_NAME = "access_token"
 api_key_header = APIKeyHeader(name=API_KEY_NAME, auto_error=True)
 
+# S3(또는 로컬/MinIO) 이미지를 메모리로 가져오는 fetcher (ETag 디스크 LRU 캐시 포함)
+image_fetcher = create_image_fetcher()
+
+# CRAFT 우선 / YOLO+CRAFT 직행 경로 선택 및 경로별 지연 시간 집계
+path_router = PathRouter()
+
+# 이미지별 검출 결과 저장소 (배치 커밋)
+detection_store = DetectionStore(DETECTION_DB_PATH, DETECTION_BATCH_SIZE, DETECTION_FLUSH_INTERVAL)
+
 def get_api_key(api_key: str = Security(api_key_header)):
     if api_key == API_KEY:
         return api_key
@@ -60,6 +85,7 @@ def get_api_key(api_key: str = Security(api_key_header)):
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("서버 시작 중...")
+    detection_store.start()
 
     try:
         # 모델 초기화는 model_manager에서 처리됨
@@ -69,6 +95,7 @@ async def lifespan(app: FastAPI):
         logger.error(f"Error during model download or load: {e}")
 
     finally:
+        detection_store.close()
         logger.info("서버 종료 중...")
 
 app = FastAPI(lifespan=lifespan, title="YOLO+CRAFT Image Processing API")
@@ -84,19 +111,22 @@ async def extract_bboxes_from_image(
     """
     이미지의 S3 경로를 받아 이미지를 다운로드하고, YOLO 모델을 사용하여 바운딩 박스를 추출합니다.
     크롭된 이미지를 저장하고, 해당 경로를 반환합니다.
+    이미지는 디스크에 저장하지 않고 메모리에서 한 번만 디코딩하여 CRAFT와 YOLO가 함께 사용합니다.
     """
     try:
-        # S3에서 이미지 다운로드
-        local_image_path = os.path.join(DOWNLOADS_DIR, os.path.basename(image_path))
-        os.makedirs(os.path.dirname(local_image_path), exist_ok=True)
-        image = download_image_from_s3(S3_BUCKET_NAME, image_path, local_image_path)
+        # S3에서 이미지를 메모리로 가져와 디코딩 (ETag가 같으면 디스크 캐시 사용)
+        image = await asyncio.to_thread(image_fetcher.fetch_image, image_path)
         if image is None:
             raise HTTPException(status_code=400, detail="S3에서 이미지 로드 실패")
 
         image_name = os.path.splitext(os.path.basename(image_path))[0]
 
-        # CRAFT 또는 YOLO+CRAFT 결과 얻기
-        craft_result = process_image_with_craft(local_image_path)
+        # 썸네일 특징으로 경로를 고른 뒤 CRAFT 또는 YOLO+CRAFT 결과 얻기
+        start_time = time.perf_counter()
+        route = path_router.route(image)
+        routing_time = time.perf_counter() - start_time
+        # CRAFT/YOLO 추론은 이벤트 루프를 막지 않도록 스레드에서 실행
+        craft_result = await asyncio.to_thread(process_image_with_craft, image) if route == CRAFT else None
         coordinates = []
         cropped_image_paths = []
 
@@ -107,24 +137,30 @@ async def extract_bboxes_from_image(
                 for box in craft_result["boxes"]
                 if box is not None and len(box) > 0
             ]
-            save_coordinates(coordinates, "coordinates.txt")
             # CRAFT 사용 시 크롭된 이미지를 저장하지 않음 (필요 시 추가 가능)
+            failed_boxes = []
+            path = CRAFT
         else:
+            path = CRAFT_FALLBACK if route == CRAFT else YOLO_DIRECT
             # YOLO+CRAFT로 텍스트 영역 감지 및 크롭
-            all_text_boxes, failed_boxes, cropped_image_paths = process_image_with_yolo_and_craft(
+            all_text_boxes, failed_boxes, cropped_image_paths = await asyncio.to_thread(
+                process_image_with_yolo_and_craft,
                 yolo_model=model_manager.yolo_model,  # model_manager에서 yolo_model 사용
                 image=image,
-                image_name=image_name
+                image_name=image_name,
             )
             coordinates = [convert_numpy_to_python(coord) for coord in all_text_boxes]
             coordinates = flatten(coordinates)
-            save_coordinates(coordinates, "coordinates.txt")
-            if failed_boxes:
-                save_failed_boxes(failed_boxes, "failed_boxes.txt")
+            failed_boxes = [convert_numpy_to_python(box) for box in failed_boxes]
 
             # 크롭된 이미지를 저장 (OCR API는 별도로 처리)
             # 현재는 cropped_image_paths에 경로만 저장
 
+        path_router.record(path, time.perf_counter() - start_time, routing_time)
+        detection_store.add(
+            image_path, coordinates, failed_boxes, path=path, model=model_manager.current_model_s3_key
+        )
+
         # OCR API는 별도의 서비스에서 처리하므로, 경로만 반환
         return CoordinatesResponse(
             message="텍스트 감지 완료",
@@ -137,15 +173,176 @@ async def extract_bboxes_from_image(
         logger.error(f"API 처리 중 오류: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/update_model/", summary="YOLO 모델 업데이트")
-async def update_model(request: ModelUpdateRequest, api_key: str = Depends(get_api_key)):
+def _batch_line(image_path, result=None, error=None):
+    item = BatchItemResponse(image_path=image_path, result=result, error=error)
+    # pydantic v2는 model_dump_json, v1은 json
+    return (item.model_dump_json() if hasattr(item, "model_dump_json") else item.json()) + "\n"
+
+def _run_yolo_batch(pending):
     """
-    새로운 모델을 S3에서 다운로드하여 현재 서빙 중인 모델을 교체합니다.
+    YOLO 대기 이미지들을 한 번에 미니배치로 실행하고 이미지별 응답 줄을 반환한다.
+    pending 항목은 (이미지 경로, 이미지, 경로 이름, 이전 단계 소요 시간, 라우팅 시간)이다.
     """
+    lines = []
+    start_time = time.perf_counter()
+    yolo_boxes = yolo_detect_batch(
+        model_manager.yolo_model, [item[1] for item in pending], batch_size=len(pending)
+    )
+    batch_share = (time.perf_counter() - start_time) / len(pending)
+    for (image_path, image, path, elapsed, routing_time), boxes in zip(pending, yolo_boxes):
+        crop_start = time.perf_counter()
+        image_name = os.path.splitext(os.path.basename(image_path))[0]
+        text_boxes, failed_boxes, cropped_image_paths = craft_within_yolo_boxes(image, boxes, image_name)
+        coordinates = [convert_numpy_to_python(box.reshape(-1)) for box in text_boxes]
+        detection_store.add(
+            image_path, coordinates, failed_boxes, path=path, model=model_manager.current_model_s3_key
+        )
+        path_router.record(
+            path, elapsed + batch_share + time.perf_counter() - crop_start, routing_time
+        )
+        lines.append(
+            _batch_line(
+                image_path,
+                CoordinatesResponse(
+                    message="텍스트 감지 완료",
+                    coordinates=coordinates,
+                    cropped_image_paths=cropped_image_paths,
+                ),
+            )
+        )
+    return lines
+
+async def _yolo_batch_lines(pending):
     try:
-        new_model_s3_key = request.s3_key
-        model_manager.update_model(new_model_s3_key)
-        return {"message": "모델 업데이트 성공", "new_model_path": model_manager.current_model_path}
+        return await asyncio.to_thread(_run_yolo_batch, pending)
     except Exception as e:
-        logger.error(f"모델 업데이트 실패: {e}")
-        raise HTTPException(status_code=500, detail="모델 업데이트 실패")
+        logger.error(f"YOLO 배치 처리 중 오류: {e}")
+        return [_batch_line(item[0], error=str(e)) for item in pending]
+
+async def _stream_batch(image_paths, batch_size):
+    """
+    이미지를 동시에 prefetch하면서 도착 순서대로 CRAFT를 실행하고,
+    CRAFT가 박스를 못 찾았거나 라우팅이 직행으로 보낸 이미지는 batch_size개씩 모아 YOLO 미니배치로 처리한다.
+    끝난 이미지부터 한 줄씩(NDJSON) 내보낸다.
+    """
+    async def fetch(image_path):
+        try:
+            return image_path, await asyncio.to_thread(image_fetcher.fetch_image, image_path), None
+        except Exception as e:
+            return image_path, None, str(e)
+
+    paths = iter(image_paths)
+    in_flight = set()
+    pending = []
+    try:
+        while True:
+            # prefetch 태스크는 BATCH_PREFETCH_CONCURRENCY개까지만 만든다
+            for image_path in paths:
+                in_flight.add(asyncio.create_task(fetch(image_path)))
+                if len(in_flight) >= BATCH_PREFETCH_CONCURRENCY:
+                    break
+            if not in_flight:
+                break
+
+            done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                image_path, image, error = task.result()
+                if image is None:
+                    yield _batch_line(image_path, error=error or "S3에서 이미지 로드 실패")
+                    continue
+                try:
+                    start_time = time.perf_counter()
+                    route = path_router.route(image)
+                    routing_time = time.perf_counter() - start_time
+                    boxes = await asyncio.to_thread(craft_boxes, image) if route == CRAFT else []
+                    elapsed = time.perf_counter() - start_time
+                except Exception as e:
+                    logger.error(f"CRAFT 처리 중 오류 ({image_path}): {e}")
+                    yield _batch_line(image_path, error=str(e))
+                    continue
+                if boxes:
+                    coordinates = [convert_numpy_to_python(box.reshape(-1)) for box in boxes]
+                    detection_store.add(image_path, coordinates, path=CRAFT, model=model_manager.current_model_s3_key)
+                    path_router.record(CRAFT, elapsed, routing_time)
+                    yield _batch_line(
+                        image_path,
+                        CoordinatesResponse(message="텍스트 감지 완료", coordinates=coordinates, cropped_image_paths=[]),
+                    )
+                    continue
+                path = CRAFT_FALLBACK if route == CRAFT else YOLO_DIRECT
+                pending.append((image_path, image, path, elapsed, routing_time))
+                if len(pending) >= batch_size:
+                    batch, pending = pending, []
+                    for line in await _yolo_batch_lines(batch):
+                        yield line
+
+        if pending:
+            for line in await _yolo_batch_lines(pending):
+                yield line
+    finally:
+        # 클라이언트 연결이 끊기면 남은 prefetch 태스크를 취소
+        for task in in_flight:
+            task.cancel()
+
+@app.post("/extract_bboxes/batch", summary="여러 이미지에서 바운딩 박스 추출 (NDJSON 스트리밍)")
+async def extract_bboxes_batch(request: BatchExtractRequest):
+    """
+    여러 S3 이미지 경로를 받아 동시에 가져오고, YOLO는 패딩된 미니배치로 실행합니다.
+    응답은 이미지마다 한 줄의 JSON(BatchItemResponse)이며 처리가 끝난 순서대로 전송됩니다.
+    """
+    if not request.image_paths:
+        raise HTTPException(status_code=400, detail="image_paths가 비어 있습니다.")
+    if len(request.image_paths) > BATCH_MAX_IMAGES:
+        raise HTTPException(status_code=400, detail=f"한 번에 최대 {BATCH_MAX_IMAGES}개까지 처리할 수 있습니다.")
+    return StreamingResponse(
+        _stream_batch(request.image_paths, max(1, request.batch_size)),
+        media_type="application/x-ndjson",
+    )
+
+@app.get("/detections", summary="최근 검출한 이미지 목록")
+async def list_detections(limit: int = Query(100, ge=1, le=1000), offset: int = Query(0, ge=0)):
+    return await asyncio.to_thread(detection_store.list_images, limit, offset)
+
+@app.get("/detections/{image_id:path}", summary="이미지별 검출 박스 조회")
+async def get_detections(image_id: str, all_runs: bool = False):
+    """이미지의 최신 검출 결과(all_runs=true면 전체 이력)를 반환합니다."""
+    detections = await asyncio.to_thread(detection_store.get_detections, image_id, all_runs)
+    if not detections:
+        raise HTTPException(status_code=404, detail=f"검출 결과가 없습니다: {image_id}")
+    return detections if all_runs else detections[0]
+
+@app.get("/detection_store/stats", summary="검출 결과 저장소 통계")
+async def detection_store_stats():
+    return detection_store.stats()
+
+@app.get("/routing/stats", summary="경로별 지연 시간과 fallback 비율")
+async def routing_stats():
+    return path_router.stats()
+
+@app.get("/image_cache/stats", summary="이미지 디스크 캐시 통계")
+async def image_cache_stats():
+    if image_fetcher.cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **image_fetcher.cache.stats()}
+
+@app.post("/update_model/", status_code=202, summary="YOLO 모델 업데이트")
+async def update_model(request: ModelUpdateRequest, api_key: str = Depends(get_api_key)):
+    """
+    새로운 모델을 S3에서 백그라운드로 다운로드하고 warm-up한 뒤 현재 서빙 중인 모델과 교체합니다.
+    진행 상황은 /model/status에서 확인합니다.
+    """
+    if not model_manager.start_update(request.s3_key):
+        raise HTTPException(status_code=409, detail="이미 모델 업데이트가 진행 중입니다.")
+    return {"message": "모델 업데이트 시작", "s3_key": request.s3_key}
+
+@app.post("/rollback_model/", summary="이전 YOLO 모델로 롤백")
+async def rollback_model(api_key: str = Depends(get_api_key)):
+    try:
+        model_manager.rollback_model()
+        return {"message": "모델 롤백 성공", "active": model_manager.status()["active"]}
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/model/status", summary="모델 슬롯 및 업데이트 상태")
+async def model_status():
+    return model_manager.status()
@@ -1,4 +1,42 @@
+import os
+
 # ocr이 필요한 크롭 이미지 경로 빼고 다 삭제함 -ocr 쥔장-
 
 CROPPED_IMAGES_DIR = "C:/Users/user/Desktop/final_project/github/labelling_pipeline/yolo_api/src/cropped_images"
 
+# 이미지가 저장된 S3 버킷과 다운로드 디렉토리
+S3_BUCKET_NAME = os.getenv("S3_BUCKET_NAME", "big9-project-02-training-bucket")
+DOWNLOADS_DIR = os.getenv("DOWNLOADS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "downloads"))
+
+# YOLO 모델: S3 키와 로컬 경로 (Dockerfile이 models/를 src와 같은 위치에 복사)
+YOLO_MODEL_PATH = os.getenv("YOLO_MODEL_PATH", "models/best.pt")
+LOCAL_YOLO_MODEL_PATH = os.getenv(
+    "LOCAL_YOLO_MODEL_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models", "best.pt"),
+)
+
+# 이미지 저장소: 비어 있으면 S3, "local:/경로"면 로컬 디렉토리를 S3 대신 사용 (테스트용)
+# MinIO 등 S3 호환 서버는 S3_ENDPOINT_URL로 지정
+IMAGE_STORE = os.getenv("IMAGE_STORE", "")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL") or None
+
+# ETag 기준 원본 이미지 디스크 LRU 캐시
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", os.path.join(DOWNLOADS_DIR, "blob_cache"))
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_MB", "1024")) * 1024 * 1024
+
+# /extract_bboxes/batch 설정: 동시 prefetch 수, YOLO 미니배치 크기, 입력 크기(정사각 패딩)
+BATCH_PREFETCH_CONCURRENCY = int(os.getenv("BATCH_PREFETCH_CONCURRENCY", "8"))
+BATCH_MAX_IMAGES = int(os.getenv("BATCH_MAX_IMAGES", "64"))
+YOLO_BATCH_SIZE = int(os.getenv("YOLO_BATCH_SIZE", "8"))
+YOLO_IMGSZ = int(os.getenv("YOLO_IMGSZ", "640"))
+
+# CRAFT / YOLO+CRAFT 경로 라우팅: "off"(항상 CRAFT 먼저) 또는 "heuristic"(썸네일 에지 밀도로 직행 판단)
+ROUTING_MODE = os.getenv("ROUTING_MODE", "off")
+ROUTE_THUMBNAIL_SIZE = int(os.getenv("ROUTE_THUMBNAIL_SIZE", "256"))
+# route_calibration.py로 보정 (기본값은 보정 전 임시값)
+ROUTE_MIN_EDGE_DENSITY = float(os.getenv("ROUTE_MIN_EDGE_DENSITY", "0.01"))
+
+# 검출 결과 저장소 (SQLite WAL, coordinates.txt / failed_boxes.txt 대체)
+DETECTION_DB_PATH = os.getenv("DETECTION_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "detections", "detections.db"))
+DETECTION_BATCH_SIZE = int(os.getenv("DETECTION_BATCH_SIZE", "100"))
+DETECTION_FLUSH_INTERVAL = float(os.getenv("DETECTION_FLUSH_INTERVAL", "1.0"))
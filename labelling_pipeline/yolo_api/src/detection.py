@@ -0,0 +1,55 @@
+# src/detection.py
+import os
+import cv2
+import numpy as np
+from config import CROPPED_IMAGES_DIR, YOLO_BATCH_SIZE, YOLO_IMGSZ
+from yolo_model import process_image_with_craft
+
+
+def craft_boxes(image):
+    """CRAFT로 찾은 텍스트 박스(int numpy 배열) 목록. 못 찾으면 빈 목록."""
+    craft_result = process_image_with_craft(image)
+    if craft_result is None:
+        return []
+    return [
+        np.array(box).astype(int)
+        for box in craft_result["boxes"]
+        if box is not None and len(box) > 0
+    ]
+
+
+def yolo_detect_batch(yolo_model, images, batch_size=YOLO_BATCH_SIZE, imgsz=YOLO_IMGSZ, device=None):
+    """
+    이미지 목록을 batch_size개씩 묶어 YOLO를 실행하고 이미지별 [x1, y1, x2, y2] 박스 배열을 반환한다.
+    크기가 다른 이미지는 ultralytics가 imgsz 정사각형으로 letterbox 패딩해 한 번의 forward로 처리하며,
+    박스 좌표는 원본 이미지 기준으로 되돌려진다.
+    """
+    boxes = []
+    for start in range(0, len(images), batch_size):
+        results = yolo_model.predict(
+            images[start:start + batch_size], imgsz=imgsz, device=device, verbose=False
+        )
+        boxes.extend(result.boxes.xyxy.cpu().numpy().astype(int) for result in results)
+    return boxes
+
+
+def craft_within_yolo_boxes(image, yolo_boxes, image_name):
+    """
+    YOLO 박스 영역마다 CRAFT를 실행한다 (process_image_with_yolo_and_craft의 YOLO 이후 단계).
+
+    Returns:
+    - tuple: (원본 좌표로 옮긴 텍스트 박스 목록, 텍스트를 찾지 못한 YOLO 박스 목록, 크롭 이미지 경로 목록)
+    """
+    text_boxes, failed_boxes, cropped_image_paths = [], [], []
+    os.makedirs(CROPPED_IMAGES_DIR, exist_ok=True)
+    for index, (x1, y1, x2, y2) in enumerate(yolo_boxes):
+        crop = image[max(0, y1):y2, max(0, x1):x2]
+        found = craft_boxes(crop) if crop.size else []
+        if not found:
+            failed_boxes.append([int(x1), int(y1), int(x2), int(y2)])
+            continue
+        text_boxes.extend(box + np.array([max(0, x1), max(0, y1)]) for box in found)
+        cropped_image_path = os.path.join(CROPPED_IMAGES_DIR, f"{image_name}_{index}.png")
+        cv2.imwrite(cropped_image_path, crop)
+        cropped_image_paths.append(cropped_image_path)
+    return text_boxes, failed_boxes, cropped_image_paths
@@ -0,0 +1,282 @@
+# src/detection_store.py
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+class DetectionStore:
+    """
+    이미지별 검출 결과를 저장하는 추가 전용(append-only) SQLite(WAL) 저장소.
+    coordinates.txt / failed_boxes.txt를 대신한다.
+
+    - 요청마다 실행(run) 하나를 추가하고, 같은 이미지를 다시 처리하면 새 실행이 쌓인다 (덮어쓰지 않음).
+    - add()는 메모리 버퍼에만 넣고, 백그라운드 스레드가 batch_size개가 모이거나 flush_interval초가 지나면
+      한 트랜잭션으로 저장한다 (요청 경로에서 파일 I/O 대기 없음).
+    - 저장에 실패한 실행은 버퍼 앞쪽에 되돌려 다시 시도하고, max_attempts번 실패하면 버린다.
+    - get_detections()/list_images()는 읽기 전용 커넥션으로 저장된 결과를 조회하고,
+      아직 저장되지 않은 실행(버퍼 + 저장 중)은 메모리에서 합친다 (조회가 저장을 기다리거나 저장 실패로 실패하지 않음).
+    """
+
+    # sqlite 변수 개수 제한(SQLITE_MAX_VARIABLE_NUMBER)보다 작게 IN 절을 나눔
+    _IN_CHUNK = 500
+
+    def __init__(self, db_path, batch_size=100, flush_interval=1.0, max_attempts=3):
+        self.db_path = db_path
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_attempts = max(1, max_attempts)
+        self._buffer = []
+        self._flushing = []  # 저장 중인 실행 (커밋 전까지 조회에 포함)
+        self._lock = threading.Lock()  # 버퍼
+        self._db_lock = threading.Lock()  # 쓰기 커넥션
+        self._read_lock = threading.Lock()  # 읽기 커넥션
+        self._stop = threading.Event()
+        self._wake = threading.Event()  # batch_size가 차면 백그라운드 스레드를 깨움
+        self._thread = None
+        self.runs_written = 0
+        self.failed = 0
+        self.retried = 0
+        self.boxes_written = 0
+        self.batches = 0
+        self.flush_seconds = 0.0
+        self.created_at = time.time()
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS detection_runs (
+                run_id TEXT PRIMARY KEY,
+                image_id TEXT NOT NULL,
+                path TEXT,
+                model TEXT,
+                num_boxes INTEGER NOT NULL,
+                num_failed INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS detection_boxes (
+                run_id TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                box_index INTEGER NOT NULL,
+                coords TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_detection_runs_image ON detection_runs (image_id, created_at);
+            CREATE INDEX IF NOT EXISTS idx_detection_boxes_run ON detection_boxes (run_id);
+            """
+        )
+        # WAL이라 읽기 커넥션은 쓰기 트랜잭션과 동시에 커밋된 데이터를 읽을 수 있음
+        self._read_conn = sqlite3.connect(db_path, check_same_thread=False)
+
+    def start(self):
+        """
+        버퍼를 비우는 백그라운드 스레드를 시작한다.
+        batch_size가 차면 바로, 아니면 flush_interval마다 저장한다 (0 이하면 batch_size가 찰 때만).
+        """
+        with self._lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="detection-store", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        timeout = self.flush_interval if self.flush_interval > 0 else None
+        while not self._stop.is_set():
+            self._wake.wait(timeout)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"검출 결과 주기적 저장 실패: {e}")
+
+    def add(self, image_id, coordinates, failed_boxes=(), path=None, model=None):
+        """검출 결과 한 건을 버퍼에 추가하고 run_id를 반환한다. 저장은 백그라운드 스레드가 한다."""
+        run_id = uuid.uuid4().hex
+        # 마지막 값은 저장 시도 횟수
+        row = (run_id, image_id, path, model, list(coordinates), list(failed_boxes), time.time(), 0)
+        with self._lock:
+            self._buffer.append(row)
+            if len(self._buffer) >= self.batch_size:
+                self._wake.set()
+        return run_id
+
+    def flush(self):
+        """버퍼의 실행을 한 트랜잭션으로 저장하고 저장한 실행 수를 반환한다."""
+        with self._db_lock:
+            with self._lock:
+                rows, self._buffer = self._buffer, []
+                self._flushing = rows
+            if not rows:
+                return 0
+            start_time = time.perf_counter()
+            runs, boxes = [], []
+            for run_id, image_id, path, model, coordinates, failed_boxes, created_at, _ in rows:
+                runs.append((run_id, image_id, path, model, len(coordinates), len(failed_boxes), created_at))
+                boxes.extend((run_id, "text", idx, json.dumps(box)) for idx, box in enumerate(coordinates))
+                boxes.extend((run_id, "failed", idx, json.dumps(box)) for idx, box in enumerate(failed_boxes))
+            try:
+                with self._conn:
+                    self._conn.executemany(
+                        "INSERT INTO detection_runs (run_id, image_id, path, model, num_boxes, num_failed, created_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        runs,
+                    )
+                    self._conn.executemany(
+                        "INSERT INTO detection_boxes (run_id, kind, box_index, coords) VALUES (?, ?, ?, ?)",
+                        boxes,
+                    )
+            except Exception:
+                self._requeue(rows)
+                raise
+            with self._lock:
+                self._flushing = []
+            self.runs_written += len(runs)
+            self.boxes_written += len(boxes)
+            self.batches += 1
+            self.flush_seconds += time.perf_counter() - start_time
+            return len(runs)
+
+    def _requeue(self, rows):
+        """저장에 실패한 실행을 버퍼 앞쪽에 되돌린다. max_attempts번 실패한 실행은 버린다."""
+        retry = [row[:-1] + (row[-1] + 1,) for row in rows if row[-1] + 1 < self.max_attempts]
+        dropped = len(rows) - len(retry)
+        with self._lock:
+            self._buffer[:0] = retry
+            self._flushing = []
+        self.retried += len(retry)
+        self.failed += dropped
+        if dropped:
+            logger.error(f"검출 결과 {dropped}건을 {self.max_attempts}번 저장하지 못해 버립니다")
+
+    def _pending_rows(self):
+        """아직 커밋되지 않은 실행 (저장 중 + 버퍼)"""
+        with self._lock:
+            return self._flushing + self._buffer
+
+    def _select_in(self, sql, values):
+        """sql의 {}를 IN 절 자리표시자로 채워 values를 _IN_CHUNK개씩 나누어 조회한다 (_read_lock 안에서 호출)."""
+        values = list(values)
+        rows = []
+        for start in range(0, len(values), self._IN_CHUNK):
+            chunk = values[start : start + self._IN_CHUNK]
+            rows.extend(self._read_conn.execute(sql.format(",".join("?" * len(chunk))), chunk).fetchall())
+        return rows
+
+    def get_detections(self, image_id, all_runs=False):
+        """
+        이미지의 검출 결과 목록 (최신 실행부터).
+        각 항목은 {run_id, image_id, path, model, created_at, coordinates, failed_boxes}이며
+        all_runs가 False면 최신 실행 하나만 담는다. 아직 저장되지 않은 결과도 포함한다.
+        """
+        results = {
+            run_id: {
+                "run_id": run_id,
+                "image_id": image_id,
+                "path": path,
+                "model": model,
+                "created_at": created_at,
+                "coordinates": list(coordinates),
+                "failed_boxes": list(failed_boxes),
+            }
+            for run_id, row_image_id, path, model, coordinates, failed_boxes, created_at, _ in self._pending_rows()
+            if row_image_id == image_id
+        }
+        with self._read_lock:
+            runs = self._read_conn.execute(
+                "SELECT run_id, image_id, path, model, created_at FROM detection_runs "
+                "WHERE image_id = ? ORDER BY created_at DESC" + ("" if all_runs else " LIMIT 1"),
+                (image_id,),
+            ).fetchall()
+            for run_id, image_id, path, model, created_at in runs:
+                if run_id in results:
+                    continue  # 조회 사이에 커밋된 실행
+                detection = {
+                    "run_id": run_id,
+                    "image_id": image_id,
+                    "path": path,
+                    "model": model,
+                    "created_at": created_at,
+                    "coordinates": [],
+                    "failed_boxes": [],
+                }
+                for kind, coords in self._read_conn.execute(
+                    "SELECT kind, coords FROM detection_boxes WHERE run_id = ? ORDER BY kind, box_index",
+                    (run_id,),
+                ):
+                    key = "coordinates" if kind == "text" else "failed_boxes"
+                    detection[key].append(json.loads(coords))
+                results[run_id] = detection
+        detections = sorted(results.values(), key=lambda d: d["created_at"], reverse=True)
+        return detections if all_runs else detections[:1]
+
+    def list_images(self, limit=100, offset=0):
+        """최근 처리한 순서의 이미지별 요약 [{image_id, runs, last_created_at}]. 아직 저장되지 않은 결과도 포함한다."""
+        pending = self._pending_rows()
+        with self._read_lock:
+            # 아직 저장되지 않은 실행이 순서를 바꿀 수 있으므로 offset 없이 limit + offset개를 읽어 합친다
+            rows = self._read_conn.execute(
+                "SELECT image_id, COUNT(*), MAX(created_at) FROM detection_runs "
+                "GROUP BY image_id ORDER BY MAX(created_at) DESC LIMIT ?",
+                (limit + offset,),
+            ).fetchall()
+            if pending:
+                committed = {
+                    run_id
+                    for (run_id,) in self._select_in(
+                        "SELECT run_id FROM detection_runs WHERE run_id IN ({})", (row[0] for row in pending)
+                    )
+                }
+                pending = [row for row in pending if row[0] not in committed]
+                rows.extend(
+                    self._select_in(
+                        "SELECT image_id, COUNT(*), MAX(created_at) FROM detection_runs "
+                        "WHERE image_id IN ({}) GROUP BY image_id",
+                        {row[1] for row in pending},
+                    )
+                )
+        summary = {image_id: [runs, last] for image_id, runs, last in rows}
+        for row in pending:
+            image_summary = summary.setdefault(row[1], [0, 0.0])
+            image_summary[0] += 1
+            image_summary[1] = max(image_summary[1], row[6])
+        ordered = sorted(summary.items(), key=lambda item: item[1][1], reverse=True)[offset : offset + limit]
+        return [{"image_id": image_id, "runs": runs, "last_created_at": last} for image_id, (runs, last) in ordered]
+
+    def close(self):
+        """백그라운드 스레드를 멈추고 남은 결과를 저장한 뒤 커넥션을 닫는다."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        try:
+            self.flush()
+        finally:
+            self._conn.close()
+            self._read_conn.close()
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._buffer)
+        elapsed = time.time() - self.created_at
+        return {
+            "runs_written": self.runs_written,
+            "boxes_written": self.boxes_written,
+            "failed": self.failed,
+            "retried": self.retried,
+            "pending": pending,
+            "batches": self.batches,
+            # 생성 이후 벽시계 기준 처리량
+            "runs_per_sec": round(self.runs_written / elapsed, 2) if elapsed > 0 else 0.0,
+            # DB에서 보낸 시간 기준 처리량 (flush 한 번의 비용 비교용)
+            "runs_per_flush_sec": round(self.runs_written / self.flush_seconds, 1) if self.flush_seconds else 0.0,
+        }
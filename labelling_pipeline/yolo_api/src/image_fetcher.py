@@ -0,0 +1,221 @@
+# src/image_fetcher.py
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+import cv2
+import numpy as np
+from config import (
+    S3_BUCKET_NAME,
+    IMAGE_STORE,
+    IMAGE_CACHE_DIR,
+    IMAGE_CACHE_MAX_BYTES,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class S3BlobStore:
+    """S3(또는 MinIO 등 S3 호환 서버) 객체를 디스크를 거치지 않고 메모리로 읽는다."""
+
+    def __init__(self, s3_client, bucket_name=S3_BUCKET_NAME):
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+
+    def read(self, key, if_none_match=None):
+        """
+        (내용 bytes, ETag). if_none_match의 ETag와 같으면 본문 없이 (None, ETag)를 반환한다
+        (조건부 GET, 304 Not Modified).
+        """
+        params = {"Bucket": self.bucket_name, "Key": key}
+        if if_none_match:
+            params["IfNoneMatch"] = f'"{if_none_match}"'
+        try:
+            response = self.s3_client.get_object(**params)
+        except self.s3_client.exceptions.ClientError as e:
+            if if_none_match and e.response.get("ResponseMetadata", {}).get("HTTPStatusCode") == 304:
+                return None, if_none_match
+            raise
+        return response["Body"].read(), response["ETag"].strip('"')
+
+
+class LocalDirBlobStore:
+    """로컬 디렉토리를 S3 대신 사용하는 저장소 (테스트/오프라인용). ETag는 크기와 수정 시각으로 만든다."""
+
+    def __init__(self, root_dir):
+        self.root_dir = os.path.realpath(root_dir)
+
+    def _path(self, key):
+        path = os.path.realpath(os.path.join(self.root_dir, key.lstrip("/")))
+        if os.path.commonpath([self.root_dir, path]) != self.root_dir:
+            raise ValueError(f"저장소 디렉토리 밖의 경로입니다: {key}")
+        return path
+
+    def read(self, key, if_none_match=None):
+        path = self._path(key)
+        stat = os.stat(path)
+        etag = hashlib.md5(f"{key}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()
+        if etag == if_none_match:
+            return None, etag
+        with open(path, "rb") as f:
+            return f.read(), etag
+
+
+class BlobCache:
+    """
+    ETag를 키로 원본 이미지 bytes를 저장하는 크기 제한 디스크 LRU 캐시.
+    같은 ETag는 내용이 같으므로 무효화가 필요 없고, max_bytes를 넘으면 오래 안 쓴 파일부터 지운다.
+    """
+
+    def __init__(self, cache_dir=IMAGE_CACHE_DIR, max_bytes=IMAGE_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # etag -> 크기 (앞쪽이 오래 안 쓴 항목)
+        self._total_bytes = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+        # 재시작 시 디스크에 남은 파일로 색인 복원 (접근 시각 순)
+        files = []
+        for name in os.listdir(cache_dir):
+            path = os.path.join(cache_dir, name)
+            if name.endswith(".tmp") or not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            files.append((stat.st_atime, name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self._total_bytes += size
+        self._evict()
+
+    def _path(self, etag):
+        return os.path.join(self.cache_dir, etag)
+
+    def __contains__(self, etag):
+        with self._lock:
+            return etag in self._entries
+
+    def record_miss(self):
+        """get()을 거치지 않고 저장소에서 바로 받은 경우 (처음 보는 키)"""
+        with self._lock:
+            self.misses += 1
+
+    def get(self, etag):
+        with self._lock:
+            if etag not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(etag)
+            self.hits += 1
+        try:
+            with open(self._path(etag), "rb") as f:
+                return f.read()
+        except OSError:
+            with self._lock:
+                self._total_bytes -= self._entries.pop(etag, 0)
+            return None
+
+    def put(self, etag, data):
+        if len(data) > self.max_bytes:
+            return
+        tmp_path = f"{self._path(etag)}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, self._path(etag))
+        with self._lock:
+            self._total_bytes += len(data) - self._entries.pop(etag, 0)
+            self._entries[etag] = len(data)
+            self._evict()
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and self._entries:
+            etag, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self._path(etag))
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+class ImageFetcher:
+    """
+    저장소에서 이미지를 메모리로 가져와 한 번만 디코딩한다.
+    캐시가 있으면 키별 마지막 ETag를 기억해 두고 조건부 GET(If-None-Match)으로 한 번만 요청한다.
+    바뀌지 않았으면(304) 본문 없이 캐시를 쓰고, 처음 보는 키는 바로 GET 한다.
+    """
+
+    def __init__(self, store, cache=None, max_keys=100000):
+        self.store = store
+        self.cache = cache
+        self.max_keys = max_keys
+        self._etags = OrderedDict()  # key -> 마지막으로 받은 ETag
+        self._lock = threading.Lock()
+
+    def _remember(self, key, etag):
+        with self._lock:
+            self._etags[key] = etag
+            self._etags.move_to_end(key)
+            while len(self._etags) > self.max_keys:
+                self._etags.popitem(last=False)
+
+    def fetch_bytes(self, key):
+        if self.cache is None:
+            return self.store.read(key)[0]
+
+        with self._lock:
+            known_etag = self._etags.get(key)
+        if known_etag is not None and known_etag in self.cache:
+            data, etag = self.store.read(key, if_none_match=known_etag)
+            if data is None:
+                data = self.cache.get(etag)
+                if data is not None:
+                    return data
+                data, etag = self.store.read(key)  # 그 사이 캐시에서 지워짐 (get()이 miss로 셈)
+            else:
+                self.cache.record_miss()  # 객체가 바뀜
+        else:
+            self.cache.record_miss()
+            data, etag = self.store.read(key)
+        self.cache.put(etag, data)
+        self._remember(key, etag)
+        return data
+
+    def fetch_image(self, key):
+        """BGR numpy 배열 (디코딩 실패 시 None). CRAFT와 YOLO가 이 배열을 함께 사용한다."""
+        data = self.fetch_bytes(key)
+        return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+def create_image_fetcher():
+    """
+    config 설정으로 ImageFetcher를 만든다.
+    IMAGE_STORE가 "local:/경로"면 로컬 디렉토리, 아니면 S3 (S3_ENDPOINT_URL이 있으면 MinIO 등).
+    IMAGE_CACHE_MAX_BYTES가 0이면 디스크 캐시를 쓰지 않는다.
+    """
+    if IMAGE_STORE.startswith("local:"):
+        store = LocalDirBlobStore(IMAGE_STORE[len("local:"):])
+    else:
+        from s3_utils import create_s3_client
+
+        store = S3BlobStore(create_s3_client())
+    cache = BlobCache() if IMAGE_CACHE_MAX_BYTES > 0 else None
+    logger.info(f"이미지 저장소: {type(store).__name__}, 디스크 캐시: {cache.cache_dir if cache else '사용 안 함'}")
+    return ImageFetcher(store, cache)
@@ -1,24 +1,62 @@
 # src/model_manager.py
 import os
 import logging
+import shutil
+import threading
+import numpy as np
+from ultralytics import YOLO
 from yolo_model import initialize_models
 from s3_utils import create_s3_client
-from config import S3_BUCKET_NAME, YOLO_MODEL_PATH, LOCAL_YOLO_MODEL_PATH, CROPPED_IMAGES_DIR
-import shutil
+from config import S3_BUCKET_NAME, YOLO_MODEL_PATH, LOCAL_YOLO_MODEL_PATH, CROPPED_IMAGES_DIR, YOLO_IMGSZ
 import time
 
 logger = logging.getLogger(__name__)
 
+
+class ModelSlot:
+    """메모리에 올라와 있는 YOLO 모델 하나와 그 출처"""
+
+    def __init__(self, model, path, s3_key=None):
+        self.model = model
+        self.path = path
+        self.s3_key = s3_key
+        self.loaded_at = time.time()
+
+    def info(self):
+        return {"path": self.path, "s3_key": self.s3_key, "loaded_at": self.loaded_at}
+
+
 class ModelManager:
+    """
+    YOLO 모델을 두 슬롯(active / previous)으로 관리한다.
+
+    새 모델은 백그라운드 스레드에서 다운로드 -> 로드 -> warm-up 추론까지 마친 뒤에만
+    active 참조를 한 번에 바꾼다. 요청은 시작할 때 yolo_model 참조를 한 번 읽으므로
+    교체 중에 들어온 요청도 이전 모델로 끝까지 처리된다.
+    이전 모델은 previous 슬롯에 남겨 두어 rollback_model()은 디스크에서 다시 읽지 않고 바로 되돌린다.
+    """
+
     def __init__(self):
         self.s3_client = create_s3_client()
         self.current_model_path = LOCAL_YOLO_MODEL_PATH
+        self.current_model_s3_key = YOLO_MODEL_PATH
+        self.active = None
+        self.previous = None
+        self.state = "idle"  # idle / downloading / warming_up / failed
+        self.last_error = None
+        self._update_lock = threading.Lock()  # 동시에 하나의 업데이트만 진행
+        self._swap_lock = threading.Lock()
         self.initialize_current_model()
 
+    @property
+    def yolo_model(self):
+        return self.active.model
+
     def initialize_current_model(self):
         """현재 모델을 초기화합니다."""
         if os.path.exists(self.current_model_path):
             initialize_models(self.current_model_path)
+            self.active = self.load_and_warm_up(self.current_model_path, self.current_model_s3_key)
             logger.info(f"현재 모델 초기화 완료: {self.current_model_path}")
         else:
             logger.error(f"현재 모델 파일이 존재하지 않습니다: {self.current_model_path}")
@@ -34,49 +72,127 @@ class ModelManager:
             logger.error(f"모델 다운로드 실패: {e}")
             raise
 
-    def update_model(self, new_model_s3_key, retries=3, delay=5):
-            """새로운 모델로 교체합니다. 리트라이 로직 포함."""
-            temp_model_path = self.current_model_path + ".tmp"
-            attempt = 0
-            while attempt < retries:
-                try:
-                    # S3에서 새로운 모델 다운로드
-                    self.download_latest_model(new_model_s3_key, temp_model_path)
+    @staticmethod
+    def load_and_warm_up(model_path, s3_key=None):
+        """모델을 로드하고 빈 이미지로 한 번 추론해 본 뒤 ModelSlot을 반환합니다. 실패하면 예외."""
+        model = YOLO(model_path)
+        blank = np.zeros((YOLO_IMGSZ, YOLO_IMGSZ, 3), dtype=np.uint8)
+        results = model.predict(blank, imgsz=YOLO_IMGSZ, verbose=False)
+        if len(results) != 1:
+            raise RuntimeError(f"warm-up 추론 결과가 올바르지 않습니다: {len(results)}개")
+        return ModelSlot(model, model_path, s3_key)
 
-                    # 새로운 모델을 로드
-                    initialize_models(temp_model_path)
+    def start_update(self, new_model_s3_key, retries=3, delay=5):
+        """
+        백그라운드 스레드에서 update_model을 시작합니다.
+        이미 업데이트가 진행 중이면 False를 반환합니다.
+        """
+        if not self._update_lock.acquire(blocking=False):
+            return False
 
-                    # 기존 모델을 백업하고, 새 모델로 교체
-                    backup_path = self.current_model_path + ".bak"
-                    if os.path.exists(backup_path):
-                        os.remove(backup_path)
-                    os.rename(self.current_model_path, backup_path)
-                    os.rename(temp_model_path, self.current_model_path)
-                    logger.info(f"모델 교체 완료: {self.current_model_path}")
+        def run():
+            try:
+                self.update_model(new_model_s3_key, retries, delay)
+            except Exception:
+                pass  # update_model에서 상태와 로그를 남김
+            finally:
+                self._update_lock.release()
 
-                    # 현재 모델의 S3 키 업데이트
-                    self.current_model_s3_key = new_model_s3_key
+        threading.Thread(target=run, name="model-update", daemon=True).start()
+        return True
 
-                    return
-                except Exception as e:
-                    logger.error(f"모델 교체 시도 {attempt + 1}/{retries} 실패: {e}")
-                    attempt += 1
-                    time.sleep(delay)
+    def _set_state(self, state, last_error=None):
+        with self._swap_lock:
+            self.state = state
+            self.last_error = last_error
+
+    def update_model(self, new_model_s3_key, retries=3, delay=5):
+        """새로운 모델로 교체합니다. 리트라이 로직 포함. (백그라운드 스레드에서 호출)"""
+        temp_model_path = self.current_model_path + ".tmp"
+        attempt = 0
+        last_error = None
+        while attempt < retries:
+            try:
+                # S3에서 새로운 모델 다운로드
+                self._set_state("downloading", last_error)
+                self.download_latest_model(new_model_s3_key, temp_model_path)
 
+                # 두 번째 슬롯에 새로운 모델을 로드하고 warm-up
+                self._set_state("warming_up", last_error)
+                slot = self.load_and_warm_up(temp_model_path, new_model_s3_key)
+                break
+            except Exception as e:
+                logger.error(f"모델 교체 시도 {attempt + 1}/{retries} 실패: {e}")
+                last_error = str(e)
+                attempt += 1
+                if attempt < retries:
+                    time.sleep(delay)
+        else:
+            # 실패한 다운로드 파일 정리
+            if os.path.exists(temp_model_path):
+                os.remove(temp_model_path)
+            self._set_state("failed", last_error)
             logger.error("모델 교체가 모두 실패했습니다.")
             raise Exception("모델 교체 실패")
 
-    def rollback_model(self):
-        """백업된 모델로 롤백합니다."""
+        with self._swap_lock:
+            # 메모리의 모델 참조를 먼저 한 번에 교체 (진행 중인 요청은 이전 모델로 끝남)
+            self.previous, self.active = self.active, slot
+            self.current_model_s3_key = new_model_s3_key
+            self.state = "idle"
+            self.last_error = None
+            # 재시작 시 새 모델을 읽도록 파일 승격은 한 번만 (실패해도 메모리 교체는 유지)
+            self._promote_model_file(temp_model_path)
+        logger.info(f"모델 교체 완료: {new_model_s3_key}")
+
+    def _promote_model_file(self, temp_model_path):
+        """
+        현재 모델 파일을 .bak으로 복사한 뒤 os.replace로 .tmp를 현재 모델 파일로 올립니다.
+        현재 모델 파일은 언제나 존재하고, .bak은 완성된 복사본으로만 덮어씁니다. (_swap_lock 안에서 호출)
+        """
         backup_path = self.current_model_path + ".bak"
-        if os.path.exists(backup_path):
-            os.rename(self.current_model_path, self.current_model_path + ".tmp")
-            os.rename(backup_path, self.current_model_path)
-            initialize_models(self.current_model_path)
-            logger.info(f"모델 롤백 완료: {self.current_model_path}")
-        else:
-            logger.error("백업된 모델이 존재하지 않습니다.")
-            raise FileNotFoundError("백업된 모델이 없습니다.")
+        try:
+            shutil.copy2(self.current_model_path, backup_path + ".tmp")
+            os.replace(backup_path + ".tmp", backup_path)
+            os.replace(temp_model_path, self.current_model_path)
+        except Exception as e:
+            logger.error(f"모델 파일 승격 실패 (메모리의 모델은 교체됨, 재시작 시 이전 파일을 읽음): {e}")
+            return
+        self.active.path = self.current_model_path
+        self.previous.path = backup_path
+
+    def rollback_model(self):
+        """previous 슬롯의 모델로 즉시 롤백합니다 (디스크에서 다시 로드하지 않음)."""
+        with self._swap_lock:
+            if self.previous is None:
+                logger.error("백업된 모델이 존재하지 않습니다.")
+                raise FileNotFoundError("백업된 모델이 없습니다.")
+            self.active, self.previous = self.previous, self.active
+            self.current_model_s3_key = self.active.s3_key
+
+            # 재시작 시에도 롤백된 모델을 읽도록 파일도 맞바꿈 (파일 승격이 실패했으면 이미 현재 파일이 롤백된 모델)
+            backup_path = self.current_model_path + ".bak"
+            if self.active.path == backup_path:
+                swap_path = self.current_model_path + ".swap"
+                try:
+                    shutil.copy2(self.current_model_path, swap_path)
+                    os.replace(backup_path, self.current_model_path)
+                    os.replace(swap_path, backup_path)
+                    self.active.path, self.previous.path = self.current_model_path, backup_path
+                except Exception as e:
+                    # 메모리의 롤백은 유지하고 성공으로 처리
+                    logger.error(f"롤백 모델 파일 교체 실패 (메모리의 모델은 롤백됨): {e}")
+        logger.info(f"모델 롤백 완료: {self.current_model_s3_key}")
+
+    def status(self):
+        with self._swap_lock:
+            return {
+                "state": self.state,
+                "updating": self._update_lock.locked(),
+                "last_error": self.last_error,
+                "active": self.active.info() if self.active else None,
+                "previous": self.previous.info() if self.previous else None,
+            }
 
 # 전역 인스턴스
-model_manager = ModelManager()
\ No newline at end of file
+model_manager = ModelManager()
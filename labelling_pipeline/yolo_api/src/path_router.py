@@ -0,0 +1,95 @@
+# src/path_router.py
+import logging
+import threading
+from collections import deque
+import cv2
+import numpy as np
+from config import ROUTING_MODE, ROUTE_THUMBNAIL_SIZE, ROUTE_MIN_EDGE_DENSITY
+
+logger = logging.getLogger(__name__)
+
+# 처리 경로 이름
+CRAFT = "craft"  # CRAFT만으로 끝남
+CRAFT_FALLBACK = "craft_then_yolo"  # CRAFT가 박스를 못 찾아 YOLO+CRAFT까지 실행
+YOLO_DIRECT = "yolo_direct"  # 라우팅으로 CRAFT 전체 실행을 건너뛰고 바로 YOLO+CRAFT
+PATHS = (CRAFT, CRAFT_FALLBACK, YOLO_DIRECT)
+
+
+def edge_density(image, size=ROUTE_THUMBNAIL_SIZE):
+    """긴 변을 size로 줄인 흑백 썸네일의 Canny 에지 픽셀 비율 (글자가 많을수록 높음)"""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    scale = size / max(gray.shape[:2])
+    if scale < 1:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    edges = cv2.Canny(gray, 100, 200)
+    return float(np.count_nonzero(edges)) / edges.size
+
+
+class PathRouter:
+    """
+    이미지마다 CRAFT 우선 경로와 YOLO+CRAFT 직행 경로 중 하나를 고른다.
+
+    mode="heuristic"이면 썸네일 에지 밀도가 min_edge_density 미만인 이미지(글자 신호가 약해
+    CRAFT가 박스를 못 찾을 가능성이 높은 이미지)는 CRAFT 전체 실행을 건너뛴다.
+    mode="off"이면 항상 기존처럼 CRAFT를 먼저 실행한다.
+    min_edge_density는 route_calibration.py로 실제 fallback 여부와 비교해 정한다.
+    경로별 지연 시간과 fallback 비율을 stats()로 제공한다.
+    """
+
+    def __init__(self, mode=ROUTING_MODE, min_edge_density=ROUTE_MIN_EDGE_DENSITY, window=1000):
+        self.mode = mode
+        self.min_edge_density = min_edge_density
+        self._lock = threading.Lock()
+        self._counts = {path: 0 for path in PATHS}
+        self._latencies = {path: deque(maxlen=window) for path in PATHS}
+        self._routing_time = 0.0
+
+    def route(self, image):
+        """CRAFT 또는 YOLO_DIRECT"""
+        if self.mode != "heuristic":
+            return CRAFT
+        return YOLO_DIRECT if edge_density(image) < self.min_edge_density else CRAFT
+
+    def record(self, path, latency, routing_time=0.0):
+        """최종 처리 경로와 전체 지연 시간(초)을 기록한다."""
+        with self._lock:
+            self._counts[path] += 1
+            self._latencies[path].append(latency)
+            self._routing_time += routing_time
+
+    @staticmethod
+    def _percentile(values, q):
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+    def stats(self):
+        with self._lock:
+            total = sum(self._counts.values())
+            craft_first = self._counts[CRAFT] + self._counts[CRAFT_FALLBACK]
+            paths = {
+                path: {
+                    "count": self._counts[path],
+                    "mean": round(sum(values) / len(values), 4) if values else 0.0,
+                    "p50": round(self._percentile(values, 50), 4),
+                    "p95": round(self._percentile(values, 95), 4),
+                }
+                for path, values in self._latencies.items()
+            }
+            return {
+                "mode": self.mode,
+                "min_edge_density": self.min_edge_density,
+                "total": total,
+                # CRAFT를 먼저 실행한 이미지 중 YOLO+CRAFT까지 간 비율
+                "fallback_rate": round(self._counts[CRAFT_FALLBACK] / craft_first, 4) if craft_first else 0.0,
+                "direct_rate": round(self._counts[YOLO_DIRECT] / total, 4) if total else 0.0,
+                "mean_routing_time": round(self._routing_time / total, 5) if total else 0.0,
+                # 직행한 이미지가 절약한 시간 추정: (fallback 평균 - 직행 평균) x 직행 수
+                "estimated_saved_seconds": round(
+                    max(0.0, paths[CRAFT_FALLBACK]["mean"] - paths[YOLO_DIRECT]["mean"])
+                    * self._counts[YOLO_DIRECT],
+                    2,
+                ) if self._counts[CRAFT_FALLBACK] else None,
+                "paths": paths,
+            }
@@ -0,0 +1,94 @@
+"""
+라우팅 임계값(ROUTE_MIN_EDGE_DENSITY)을 실제 CRAFT 결과로 보정하는 스크립트.
+
+    python route_calibration.py --images-dir ./test_img --min-precision 0.95
+
+이미지마다 썸네일 에지 밀도를 계산하고 CRAFT 전체 실행으로 실제 fallback 여부(박스 없음)를 기록한 뒤,
+임계값별로 YOLO_DIRECT 판정의 precision(직행한 이미지 중 실제 fallback 비율)과
+recall(실제 fallback 중 직행으로 잡은 비율), 절약되는 CRAFT 시간을 출력한다.
+precision이 --min-precision 이상인 임계값 중 recall이 가장 높은 값을 추천한다.
+"""
+import argparse
+import os
+import time
+import cv2
+from config import ROUTE_MIN_EDGE_DENSITY
+from detection import craft_boxes
+from path_router import edge_density
+
+
+def load_image_paths(images_dir, limit):
+    return [
+        os.path.join(images_dir, fname)
+        for fname in sorted(os.listdir(images_dir))
+        if fname.lower().endswith((".png", ".jpg", ".jpeg"))
+    ][:limit]
+
+
+def measure(image_paths):
+    """[(에지 밀도, 실제 fallback 여부, CRAFT 전체 실행 시간), ...]"""
+    samples = []
+    for path in image_paths:
+        image = cv2.imread(path)
+        if image is None:
+            print(f"[WARN] 이미지 읽기 실패: {path}")
+            continue
+        density = edge_density(image)
+        start_time = time.perf_counter()
+        found = craft_boxes(image)
+        samples.append((density, not found, time.perf_counter() - start_time))
+    return samples
+
+
+def evaluate(samples, threshold):
+    """임계값 하나의 (precision, recall, 직행 수, 절약한 CRAFT 시간)"""
+    direct = [(fallback, craft_time) for density, fallback, craft_time in samples if density < threshold]
+    true_positive = sum(1 for fallback, _ in direct if fallback)
+    actual = sum(1 for _, fallback, _ in samples if fallback)
+    precision = true_positive / len(direct) if direct else 1.0
+    recall = true_positive / actual if actual else 0.0
+    # 실제 fallback을 직행시키면 헛도는 CRAFT 전체 실행을 아낀다 (잘못 직행한 이미지는 YOLO 비용이 추가됨)
+    saved = sum(craft_time for fallback, craft_time in direct if fallback)
+    return precision, recall, len(direct), saved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="라우팅 에지 밀도 임계값 보정")
+    parser.add_argument("--images-dir", required=True)
+    parser.add_argument("--limit", type=int, default=500, help="사용할 이미지 수")
+    parser.add_argument(
+        "--thresholds",
+        default="0.002,0.005,0.01,0.015,0.02,0.03,0.05",
+        help="비교할 에지 밀도 임계값 (쉼표 구분)",
+    )
+    parser.add_argument("--min-precision", type=float, default=0.95)
+    args = parser.parse_args()
+
+    samples = measure(load_image_paths(args.images_dir, args.limit))
+    if not samples:
+        print(f"[ERROR] 이미지가 없습니다: {args.images_dir}")
+        return
+    fallbacks = sum(1 for _, fallback, _ in samples if fallback)
+    print(
+        f"[INFO] {len(samples)}개 이미지, 실제 fallback {fallbacks}개 ({fallbacks / len(samples):.2%}), "
+        f"현재 ROUTE_MIN_EDGE_DENSITY={ROUTE_MIN_EDGE_DENSITY}"
+    )
+
+    best = None
+    for threshold in map(float, args.thresholds.split(",")):
+        precision, recall, direct, saved = evaluate(samples, threshold)
+        print(
+            f"[CALIB] threshold {threshold:.4f}: precision {precision:.2%}, recall {recall:.2%}, "
+            f"direct {direct}, saved CRAFT {saved:.2f}s"
+        )
+        if direct and precision >= args.min_precision and (best is None or recall > best[1]):
+            best = (threshold, recall)
+
+    if best is None:
+        print(f"[CALIB] precision {args.min_precision:.0%} 이상인 임계값이 없습니다 (ROUTING_MODE=off 유지 권장)")
+    else:
+        print(f"[CALIB] 추천 ROUTE_MIN_EDGE_DENSITY={best[0]} (recall {best[1]:.2%})")
+
+
+if __name__ == "__main__":
+    main()
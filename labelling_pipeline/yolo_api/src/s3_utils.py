@@ -1,7 +1,7 @@
 # src/s3_utils.py
 import boto3
 import os
-from config import S3_BUCKET_NAME
+from config import S3_BUCKET_NAME, S3_ENDPOINT_URL
 import logging
 
 logger = logging.getLogger(__name__)
@@ -14,6 +14,7 @@ def create_s3_client():
             aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
             aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
             region_name=os.getenv("AWS_REGION"),
+            endpoint_url=S3_ENDPOINT_URL,  # MinIO 등 S3 호환 서버 (없으면 AWS)
         )
         logger.info("S3 클라이언트 생성 완료.")
         return s3_client
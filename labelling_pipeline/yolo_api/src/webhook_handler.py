@@ -23,8 +23,9 @@ async def handle_model_update(event: ModelUpdateEvent):
         if event.status.lower() == "ready":
             # 새로운 모델 버전이 준비되었을 때
             new_model_s3_key = event.source  # S3 키 또는 모델 경로
-            model_manager.update_model(new_model_s3_key)
-            return {"message": "모델 업데이트 성공"}
+            if not model_manager.start_update(new_model_s3_key):
+                return {"message": "이미 모델 업데이트가 진행 중입니다."}
+            return {"message": "모델 업데이트 시작"}
         else:
             logger.info(f"모델 업데이트 이벤트 상태: {event.status}")
             return {"message": f"모델 상태: {event.status}"}
@@ -0,0 +1,62 @@
+"""
+YOLO 미니배치 크기별 처리 속도(images/sec)를 측정하는 벤치마크 스크립트.
+
+    python yolo_batch_benchmark.py --images-dir ./test_img --device cpu --batch-sizes 1,4,8,16
+
+이미지는 미리 메모리에 디코딩해 두고 yolo_detect_batch만 측정한다 (S3/CRAFT 제외).
+배치 크기마다 한 번 warm-up 후 --repeat회 반복한 평균을 출력한다.
+"""
+import argparse
+import os
+import time
+import cv2
+from ultralytics import YOLO
+from config import LOCAL_YOLO_MODEL_PATH, YOLO_IMGSZ
+from detection import yolo_detect_batch
+
+
+def load_images(images_dir, limit):
+    image_paths = [
+        os.path.join(images_dir, fname)
+        for fname in sorted(os.listdir(images_dir))
+        if fname.lower().endswith((".png", ".jpg", ".jpeg"))
+    ][:limit]
+    images = [cv2.imread(path) for path in image_paths]
+    return [image for image in images if image is not None]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="YOLO 미니배치 처리 속도 측정")
+    parser.add_argument("--model-path", default=LOCAL_YOLO_MODEL_PATH)
+    parser.add_argument("--images-dir", required=True)
+    parser.add_argument("--limit", type=int, default=64, help="사용할 이미지 수")
+    parser.add_argument("--batch-sizes", default="1,4,8,16")
+    parser.add_argument("--imgsz", type=int, default=YOLO_IMGSZ)
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    images = load_images(args.images_dir, args.limit)
+    if not images:
+        print(f"[ERROR] 이미지가 없습니다: {args.images_dir}")
+        return
+    model = YOLO(args.model_path)
+    print(f"[INFO] {len(images)}개 이미지, imgsz={args.imgsz}, device={args.device}")
+
+    baseline = None
+    for batch_size in map(int, args.batch_sizes.split(",")):
+        yolo_detect_batch(model, images[:batch_size], batch_size, args.imgsz, args.device)  # warm-up
+        start_time = time.perf_counter()
+        for _ in range(args.repeat):
+            yolo_detect_batch(model, images, batch_size, args.imgsz, args.device)
+        elapsed = time.perf_counter() - start_time
+        images_per_sec = len(images) * args.repeat / elapsed
+        baseline = baseline or images_per_sec
+        print(
+            f"[BENCH] batch {batch_size:2d}: {images_per_sec:.2f} images/sec "
+            f"({images_per_sec / baseline:.2f}x vs batch {args.batch_sizes.split(',')[0]})"
+        )
+
+
+if __name__ == "__main__":
+    main()